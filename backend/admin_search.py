@@ -0,0 +1,148 @@
+"""
+Indexed text search for the admin donor filter.
+
+Names and cities are matched through pg_trgm GIN indexes, which serve
+substring ILIKE patterns without a sequential scan, and ranked by trigram
+similarity. Phone numbers are matched on phone_digits, a generated
+digits-only copy of phone_number, by prefix ("2547...") or suffix ("...1234")
+through two B-tree indexes.
+
+Without pg_trgm names and cities fall back to prefix matches on
+lower(first_name) / lower(city) B-tree indexes, ranked exact matches first.
+
+phone_digits is added by the one-off migrate_phone_digits.py, not at
+startup: adding a stored generated column rewrites public.blood under an
+ACCESS EXCLUSIVE lock. Until it has run, phone numbers are matched on the
+same expression computed per row, which scans the table.
+"""
+
+import re
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+from queries import NamedQuery, register
+from search_engines import installed_extensions
+
+# Shorter digit strings would match most of the table
+MIN_PHONE_DIGITS = 3
+
+# What phone_digits stores; the fallback when the column has not been added yet
+PHONE_DIGITS_EXPRESSION = "regexp_replace(phone_number, '[^0-9]', '', 'g')"
+
+# Admin donor rows, optionally filtered by blood type; also the base of the keyset listing in main.py
+ADMIN_DONOR_QUERY = """
+    SELECT id, first_name, phone_number, blood_type, city, latitude, longitude,
+           is_verified, is_available, created_at
+    FROM public.blood
+    WHERE (CAST(:blood_type AS varchar) IS NULL OR blood_type = :blood_type)
+"""
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class AdminDonorSearch:
+    def __init__(self, trigram_schema: Optional[str] = None, has_phone_digits: bool = False):
+        # Schema pg_trgm is installed in, or None when it is not available
+        self.trigram_schema = trigram_schema
+        # Whether public.blood has the phone_digits column (see migrate_phone_digits.py)
+        self.has_phone_digits = has_phone_digits
+        self.phone_digits = "phone_digits" if has_phone_digits else PHONE_DIGITS_EXPRESSION
+        # The search statement without and with a phone number match, registered once
+        self.queries: Dict[bool, NamedQuery] = {
+            phone: register(f"search_admin_donors_{self.name}" + ("_phone" if phone else ""), self._sql(phone))
+            for phone in (False, True)
+        }
+
+    @property
+    def name(self) -> str:
+        return ("trigram" if self.trigram_schema else "prefix") + ("" if self.has_phone_digits else "_phone_scan")
+
+    def create_indexes(self, conn):
+        """Create the name and city indexes the search relies on"""
+        if self.trigram_schema:
+            ops = f"{self.trigram_schema}.gin_trgm_ops"
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_blood_first_name_trgm ON public.blood USING GIN (first_name {ops})"))
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_blood_city_trgm ON public.blood USING GIN (city {ops})"))
+        else:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_blood_first_name_lower ON public.blood (lower(first_name) text_pattern_ops)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_blood_city_lower ON public.blood (lower(city) text_pattern_ops)"))
+
+    def _sql(self, phone: bool) -> str:
+        """Best matches first (ranked higher is better), with or without the phone number match"""
+        if self.trigram_schema:
+            conditions = ["first_name ILIKE :search_pattern", "city ILIKE :search_pattern"]
+            similarity = f"{self.trigram_schema}.similarity"
+            rank = [
+                f"{similarity}(first_name, :search)",
+                f"{similarity}(COALESCE(city, ''), :search)",
+            ]
+        else:
+            conditions = ["lower(first_name) LIKE :search_pattern", "lower(city) LIKE :search_pattern"]
+            rank = [
+                "CASE WHEN lower(first_name) = :search_exact OR lower(city) = :search_exact THEN 1.0 "
+                "WHEN lower(first_name) LIKE :search_pattern OR lower(city) LIKE :search_pattern THEN 0.5 ELSE 0 END"
+            ]
+
+        if phone:
+            column = self.phone_digits
+            phone_match = f"{column} LIKE :phone_prefix OR reverse({column}) LIKE :phone_suffix"
+            conditions.append(phone_match)
+            rank.append(f"CASE WHEN {column} = :phone_digits THEN 1.0 WHEN {phone_match} THEN 0.9 ELSE 0 END")
+
+        rank_sql = rank[0] if len(rank) == 1 else f"GREATEST({', '.join(rank)})"
+        return (ADMIN_DONOR_QUERY + f" AND ({' OR '.join(conditions)})"
+                f" ORDER BY {rank_sql} DESC, created_at DESC, id DESC LIMIT :limit")
+
+    def query(self, search: str, params: Dict[str, object]) -> NamedQuery:
+        """The search statement for a search string, adding its parameters to params"""
+        search = search.strip()
+        if self.trigram_schema:
+            params["search"] = search
+            params["search_pattern"] = f"%{escape_like(search)}%"
+        else:
+            params["search_exact"] = search.lower()
+            params["search_pattern"] = f"{escape_like(search.lower())}%"
+
+        digits = re.sub(r"\D", "", search)
+        phone = len(digits) >= MIN_PHONE_DIGITS
+        if phone:
+            params["phone_digits"] = digits
+            params["phone_prefix"] = f"{digits}%"
+            # A local number ("0712...") is the suffix of its international form ("254712...")
+            suffix = digits[1:] if digits.startswith("0") and len(digits) > MIN_PHONE_DIGITS else digits
+            params["phone_suffix"] = f"{suffix[::-1]}%"
+        return self.queries[phone]
+
+
+def has_phone_digits(conn) -> bool:
+    result = conn.execute(text("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'blood' AND column_name = 'phone_digits'
+    """))
+    return result.fetchone() is not None
+
+
+def select_admin_search(conn) -> AdminDonorSearch:
+    """Use trigram search when pg_trgm is (or can be) installed, and create its indexes"""
+    try:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.commit()
+    except Exception as e:
+        print(f"⚠️  pg_trgm not available, admin search will use prefix matching: {e}")
+        conn.rollback()
+
+    admin_search = AdminDonorSearch(installed_extensions(conn).get("pg_trgm"), has_phone_digits(conn))
+    if not admin_search.has_phone_digits:
+        print("⚠️  public.blood has no phone_digits column, phone searches will scan the table "
+              "(run migrate_phone_digits.py)")
+    try:
+        admin_search.create_indexes(conn)
+        conn.commit()
+    except Exception as e:
+        # The search still works, just without its indexes (e.g. lock timeout, no privilege)
+        print(f"⚠️  Could not create admin search indexes: {e}")
+        conn.rollback()
+    return admin_search
@@ -0,0 +1,196 @@
+"""
+Counters behind /api/v1/admin/stats.
+
+The dashboard numbers are kept in memory and adjusted as donors are created,
+updated or deleted and as search log batches are written, so a dashboard
+refresh doesn't scan public.blood or public.search_logs. A periodic
+reconciliation recomputes everything from the database to correct drift,
+including changes made by other workers.
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+RECENT_DONORS = 5
+TOP_CITIES = 5
+
+
+class AdminStats:
+    def __init__(self, cache_seconds: float = 5):
+        self.cache_seconds = cache_seconds
+        self.ready = False
+        self.total_donors = 0
+        self.search_count = 0
+        self.today_registrations = 0
+        # Midnight of the database's current day; registrations after it count as today's
+        self.today_start: Optional[datetime] = None
+        self.blood_type_counts: Dict[str, int] = {}
+        self.city_counts: Dict[str, int] = {}
+        # Newest donors first, as dicts of id, first_name, blood_type, city, latitude, longitude, created_at
+        self.recent_donors: List[dict] = []
+        self._snapshot: Optional[dict] = None
+        self._snapshot_at = 0.0
+
+    def _changed(self):
+        self._snapshot = None
+
+    def invalidate(self):
+        """Recompute everything from the database on the next request"""
+        self.ready = False
+        self._changed()
+
+    @staticmethod
+    def _adjust(counts: Dict[str, int], key: Optional[str], delta: int):
+        if key is None:
+            return
+        count = counts.get(key, 0) + delta
+        if count > 0:
+            counts[key] = count
+        else:
+            counts.pop(key, None)
+
+    async def reconcile(self, conn):
+        """Recompute every counter from the database"""
+        total_donors = (await conn.execute(text("SELECT COUNT(*) FROM public.blood"))).scalar()
+
+        blood_type_rows = (await conn.execute(text("""
+            SELECT blood_type, COUNT(*) AS count
+            FROM public.blood
+            GROUP BY blood_type
+        """))).fetchall()
+
+        city_rows = (await conn.execute(text("""
+            SELECT city, COUNT(*) AS count
+            FROM public.blood
+            WHERE city IS NOT NULL
+            GROUP BY city
+        """))).fetchall()
+
+        recent_rows = (await conn.execute(text("""
+            SELECT id, first_name, blood_type, city, latitude, longitude, created_at
+            FROM public.blood
+            ORDER BY created_at DESC, id DESC
+            LIMIT :limit
+        """), {"limit": RECENT_DONORS})).fetchall()
+
+        today_row = (await conn.execute(text("""
+            SELECT CURRENT_DATE::timestamptz, COUNT(*)
+            FROM public.blood
+            WHERE created_at >= CURRENT_DATE
+        """))).fetchone()
+
+        try:
+            search_count = (await conn.execute(text("SELECT COUNT(*) FROM public.search_logs"))).scalar()
+        except Exception as search_error:
+            print(f"⚠️ Search logs table doesn't exist yet: {search_error}")
+            await conn.rollback()
+            search_count = 0
+
+        self.total_donors = total_donors
+        self.blood_type_counts = {row[0]: row[1] for row in blood_type_rows}
+        self.city_counts = {row[0]: row[1] for row in city_rows}
+        self.recent_donors = [
+            {
+                "id": str(row[0]),
+                "first_name": row[1],
+                "blood_type": row[2],
+                "city": row[3],
+                "latitude": row[4],
+                "longitude": row[5],
+                "created_at": row[6]
+            } for row in recent_rows
+        ]
+        self.today_start = today_row[0]
+        self.today_registrations = today_row[1]
+        self.search_count = search_count
+        self.ready = True
+        self._changed()
+
+    def needs_reconcile(self) -> bool:
+        """True when the counters were never loaded or the day rolled over"""
+        if not self.ready:
+            return True
+        return self.today_start is not None and datetime.now(self.today_start.tzinfo) >= self.today_start + timedelta(days=1)
+
+    def donor_added(self, donor_id: str, first_name: str, blood_type: str, city: Optional[str],
+                    latitude: float, longitude: float, created_at: datetime):
+        self.total_donors += 1
+        self._adjust(self.blood_type_counts, blood_type, 1)
+        self._adjust(self.city_counts, city, 1)
+        if self.today_start is not None and created_at >= self.today_start:
+            self.today_registrations += 1
+        self.recent_donors.insert(0, {
+            "id": donor_id,
+            "first_name": first_name,
+            "blood_type": blood_type,
+            "city": city,
+            "latitude": latitude,
+            "longitude": longitude,
+            "created_at": created_at
+        })
+        del self.recent_donors[RECENT_DONORS:]
+        self._changed()
+
+    def donor_changed(self, donor_id: str, old_blood_type: Optional[str], old_city: Optional[str],
+                      first_name: str, blood_type: str, city: Optional[str], latitude: float, longitude: float):
+        if old_blood_type is None:
+            # The previous row wasn't visible to the writer (a concurrent registration), so recount
+            self.invalidate()
+            return
+        self._adjust(self.blood_type_counts, old_blood_type, -1)
+        self._adjust(self.blood_type_counts, blood_type, 1)
+        self._adjust(self.city_counts, old_city, -1)
+        self._adjust(self.city_counts, city, 1)
+        for donor in self.recent_donors:
+            if donor["id"] == donor_id:
+                donor.update(first_name=first_name, blood_type=blood_type, city=city,
+                             latitude=latitude, longitude=longitude)
+        self._changed()
+
+    def donor_removed(self, donor_id: str, blood_type: str, city: Optional[str], created_at: datetime):
+        self.total_donors = max(self.total_donors - 1, 0)
+        self._adjust(self.blood_type_counts, blood_type, -1)
+        self._adjust(self.city_counts, city, -1)
+        if self.today_start is not None and created_at >= self.today_start:
+            self.today_registrations = max(self.today_registrations - 1, 0)
+        recent_donors = [donor for donor in self.recent_donors if donor["id"] != donor_id]
+        if len(recent_donors) < len(self.recent_donors):
+            # Only the database knows which older donor moves into the list
+            self.invalidate()
+        self.recent_donors = recent_donors
+        self._changed()
+
+    def searches_logged(self, count: int):
+        self.search_count += count
+        self._changed()
+
+    def snapshot(self) -> dict:
+        """Dashboard payload, rebuilt from the counters at most every cache_seconds"""
+        if self._snapshot is not None and time.monotonic() - self._snapshot_at < self.cache_seconds:
+            return self._snapshot
+
+        top_cities = sorted(self.city_counts.items(), key=lambda item: item[1], reverse=True)[:TOP_CITIES]
+        self._snapshot = {
+            "totalDonors": self.total_donors,
+            "donorsByBloodType": [
+                {"blood_type": blood_type, "count": count}
+                for blood_type, count in sorted(self.blood_type_counts.items())
+            ],
+            "recentDonors": [
+                {
+                    "id": donor["id"],
+                    "first_name": donor["first_name"],
+                    "blood_type": donor["blood_type"],
+                    "location": donor["city"] or f"{donor['latitude']}, {donor['longitude']}",
+                    "created_at": donor["created_at"].isoformat()
+                } for donor in self.recent_donors
+            ],
+            "searchCount": self.search_count,
+            "todayRegistrations": self.today_registrations,
+            "topCities": [{"city": city, "count": count} for city, count in top_cities]
+        }
+        self._snapshot_at = time.monotonic()
+        return self._snapshot
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-row serialization cost of the donor listings on 10k-row pages.
+
+Seeds donors (deleted again afterwards) and compares, per listing:
+- before:   the previous path (Pydantic models / dicts with str() and
+            isoformat(), response_model validation and the default JSON encoder)
+- python:   plain row dicts rendered by FastJSONResponse (orjson)
+- json_agg: the page built by Postgres, timed including the query
+The before/python timings exclude the query, which is reported separately.
+
+Usage: DATABASE_URL=... python benchmark_serialization.py [rows]
+"""
+
+import asyncio
+import sys
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import text
+
+from database import async_engine
+from main import ADMIN_DONOR_LISTING, DONOR_LISTING, admin_donor, donor_json
+from queries import execute
+from schemas import DonorResponse
+from serialization import FastJSONResponse
+
+# Reserved for benchmark donors, so cleanup never touches real registrations
+# (donor_generator.py and load_test.py use +25592 to +25594)
+PHONE_PREFIX = "+25595"
+
+SEED_QUERY = text("""
+    INSERT INTO public.blood (first_name, phone_number, blood_type, latitude, longitude, city)
+    SELECT
+        'Benchmark ' || g,
+        :phone_prefix || lpad(g::text, 8, '0'),
+        (ARRAY['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-'])[1 + g % 8],
+        -4.7 + random() * 9.2,
+        33.9 + random() * 8.0,
+        CASE WHEN g % 4 = 0 THEN NULL ELSE 'Nairobi' END
+    FROM generate_series(1, :count) AS g
+""")
+
+DELETE_QUERY = text("DELETE FROM public.blood WHERE phone_number LIKE :phone_pattern")
+
+REPEATS = 5
+
+def legacy_donor_response(row) -> DonorResponse:
+    return DonorResponse(
+        id=str(row[0]),
+        first_name=row[1],
+        phone_number=row[2],
+        blood_type=row[3],
+        latitude=float(row[4]),
+        longitude=float(row[5]),
+        address=row[6],
+        city=row[7],
+        country=row[8],
+        is_verified=row[9],
+        is_available=row[10],
+        created_at=row[11].isoformat()
+    )
+
+def legacy_admin_donor(row) -> dict:
+    return {
+        "id": str(row[0]),
+        "first_name": row[1],
+        "phone": row[2],
+        "blood_type": row[3],
+        "location": row[4] or f"{row[5]}, {row[6]}",
+        "is_verified": row[7],
+        "is_available": row[8],
+        "created_at": row[9].isoformat()
+    }
+
+DONOR_LIST_FIELD = create_response_field(name="donors", type_=List[DonorResponse])
+
+async def before_donors(rows) -> bytes:
+    # Models per row, then response_model validation and the default encoder
+    content = await serialize_response(field=DONOR_LIST_FIELD, response_content=[legacy_donor_response(row) for row in rows])
+    return JSONResponse(content).body
+
+async def before_admin(rows) -> bytes:
+    # No response_model: jsonable_encoder walks the dicts before the default encoder
+    return JSONResponse(jsonable_encoder([legacy_admin_donor(row) for row in rows])).body
+
+async def timed(function, *args) -> float:
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        await function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+async def benchmark(listing, to_dict, before, count: int, params: dict):
+    async with async_engine.connect() as conn:
+        async def fetch_rows():
+            page_params = dict(params)
+            return (await execute(conn, listing.select(page_params, None, count), page_params)).fetchall()
+
+        async def json_agg_page():
+            page_params = dict(params)
+            return (await execute(conn, listing.select_json(page_params, None, count), page_params)).fetchone().page
+
+        async def python_page(rows):
+            return FastJSONResponse([to_dict(row) for row in rows]).body
+
+        rows = (await fetch_rows())[:count]
+        query = await timed(fetch_rows)
+        return {
+            "query": query,
+            "before": await timed(before, rows),
+            "python": await timed(python_page, rows),
+            "json_agg": await timed(json_agg_page) - query,
+            "rows": len(rows)
+        }
+
+async def run(count: int):
+    async with async_engine.begin() as conn:
+        # Leftovers of an interrupted run would collide with the new phone numbers
+        await conn.execute(DELETE_QUERY, {"phone_pattern": PHONE_PREFIX + "%"})
+        await conn.execute(SEED_QUERY, {"count": count, "phone_prefix": PHONE_PREFIX})
+    try:
+        results = {
+            "/api/v1/donors": await benchmark(DONOR_LISTING, donor_json, before_donors, count, {}),
+            "/api/v1/admin/donors": await benchmark(ADMIN_DONOR_LISTING, admin_donor, before_admin, count, {"blood_type": None}),
+        }
+    finally:
+        async with async_engine.begin() as conn:
+            await conn.execute(DELETE_QUERY, {"phone_pattern": PHONE_PREFIX + "%"})
+    await async_engine.dispose()
+    return results
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print(f"🧪 Serializing {count} donor rows per page (best of {REPEATS})...")
+    print("-" * 60)
+    for path, result in asyncio.run(run(count)).items():
+        per_row = {key: value / result["rows"] * 1e6 for key, value in result.items() if key != "rows"}
+        print(f"{path} ({result['rows']} rows)")
+        print(f"   query:                {per_row['query']:7.2f} µs/row")
+        print(f"   before (serialize):   {per_row['before']:7.2f} µs/row")
+        print(f"   python + orjson:      {per_row['python']:7.2f} µs/row  ({per_row['before'] / per_row['python']:.1f}x faster)")
+        print(f"   json_agg (over query): {per_row['json_agg']:6.2f} µs/row")
@@ -0,0 +1,47 @@
+"""
+Red cell compatibility between recipient and donor blood types.
+
+Each blood type is one bit; COMPATIBLE_DONOR_MASKS[recipient] has the bits of
+every type that recipient can receive from. The masks are precomputed once
+from the ABO/RhD rules, so a compatibility search is a single lookup and one
+index probe or query over all compatible types.
+"""
+
+from typing import Dict, Tuple
+
+from schemas import BLOOD_TYPES
+
+BLOOD_TYPE_BITS: Dict[str, int] = {blood_type: 1 << i for i, blood_type in enumerate(BLOOD_TYPES)}
+
+
+def _antigens(blood_type: str) -> set:
+    abo, rh = blood_type[:-1], blood_type[-1]
+    antigens = set() if abo == "O" else set(abo)
+    if rh == "+":
+        antigens.add("D")
+    return antigens
+
+
+def _can_receive(recipient: str, donor: str) -> bool:
+    # Donor red cells must not carry an antigen the recipient lacks
+    return _antigens(donor) <= _antigens(recipient)
+
+
+COMPATIBLE_DONOR_MASKS: Dict[str, int] = {
+    recipient: sum(BLOOD_TYPE_BITS[donor] for donor in BLOOD_TYPES if _can_receive(recipient, donor))
+    for recipient in BLOOD_TYPES
+}
+
+COMPATIBLE_DONOR_TYPES: Dict[str, Tuple[str, ...]] = {
+    recipient: tuple(donor for donor in BLOOD_TYPES if mask & BLOOD_TYPE_BITS[donor])
+    for recipient, mask in COMPATIBLE_DONOR_MASKS.items()
+}
+
+
+def compatible_donor_types(recipient: str) -> Tuple[str, ...]:
+    """Donor blood types a recipient can receive; raises KeyError for unknown types"""
+    return COMPATIBLE_DONOR_TYPES[recipient]
+
+
+def is_compatible(recipient: str, donor: str) -> bool:
+    return bool(COMPATIBLE_DONOR_MASKS.get(recipient, 0) & BLOOD_TYPE_BITS.get(donor, 0))
@@ -0,0 +1,246 @@
+"""
+WebSocket connections and broadcast fan-out.
+
+Every socket gets a bounded outbound queue drained by its own writer task,
+so a broadcast only puts the (already serialized) message on each queue and
+returns immediately. Sockets send in parallel and a slow mobile client only
+ever delays itself. When a socket's queue is full the slow-consumer policy
+decides what happens:
+
+- drop_oldest: discard the oldest queued message to make room (default)
+- drop_new:    discard the message being broadcast
+- disconnect:  close the socket
+
+Subscriptions are indexed both ways: each connection's Subscriber holds the
+set of topics (blood types) it follows and blood_type_subscriptions maps a
+topic to the set of its Subscribers, so subscribing, unsubscribing and
+disconnecting cost O(topics of that connection) however many sockets are
+connected.
+
+A subscription can also carry a geofence (latitude, longitude, radius).
+Geofenced subscribers are indexed per topic on a lat/lon grid under every
+cell their circle overlaps, so an event with a location only looks at the
+subscribers registered in its own cell and checks their exact distance.
+Messages go to the topic's unfenced subscribers plus the geofences that
+contain the event.
+"""
+
+import asyncio
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import WebSocket
+
+from geo import covering_cells, grid_cell, haversine_km
+
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "drop_new", "disconnect")
+
+
+class Geofence:
+    __slots__ = ("latitude", "longitude", "radius_km", "cells")
+
+    def __init__(self, latitude: float, longitude: float, radius_km: float, cell_degrees: float):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius_km = radius_km
+        self.cells = covering_cells(latitude, longitude, radius_km, cell_degrees)
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        return haversine_km(self.latitude, self.longitude, latitude, longitude) <= self.radius_km
+
+
+class Subscriber:
+    """Per-connection state: outbound queue, writer task and subscribed topics"""
+
+    __slots__ = ("websocket", "queue", "task", "topics")
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
+        # topic -> geofence, or None for every event on the topic
+        self.topics: Dict[str, Optional[Geofence]] = {}
+
+
+class ConnectionManager:
+    def __init__(self, queue_size: int = 100, slow_consumer_policy: str = "drop_oldest", send_timeout: float = 10,
+                 geofence_cell_degrees: float = 0.5):
+        if slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy '{slow_consumer_policy}'")
+        self.queue_size = queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.send_timeout = send_timeout
+        self.geofence_cell_degrees = geofence_cell_degrees
+        # socket -> connection state (including its topics), and topic -> unfenced subscribers
+        self.subscribers: Dict[WebSocket, Subscriber] = {}
+        self.blood_type_subscriptions: Dict[str, Set[Subscriber]] = {}
+        # topic -> grid cell -> geofenced subscribers overlapping the cell
+        self.geofence_index: Dict[str, Dict[Tuple[int, int], Set[Subscriber]]] = {}
+
+        self.sent = 0
+        self.dropped = 0
+        self.slow_disconnects = 0
+        self.send_failures = 0
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        subscriber = Subscriber(websocket, self.queue_size)
+        subscriber.task = asyncio.create_task(self._write(subscriber))
+        self.subscribers[websocket] = subscriber
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.subscribers)
+
+    def disconnect(self, websocket: WebSocket):
+        subscriber = self.subscribers.pop(websocket, None)
+        if subscriber is None:
+            return
+        self._unsubscribe(subscriber, list(subscriber.topics))
+        if subscriber.task is not None and subscriber.task is not asyncio.current_task():
+            subscriber.task.cancel()
+
+    def subscribe(self, websocket: WebSocket, blood_types: Iterable[str],
+                  geofence: Optional[Tuple[float, float, float]] = None) -> Set[str]:
+        """Add topics to a connection, optionally limited to a (latitude, longitude, radius_km)
+        geofence; returns everything it is now subscribed to"""
+        subscriber = self.subscribers.get(websocket)
+        if subscriber is None:
+            return set()
+        fence = Geofence(*geofence, self.geofence_cell_degrees) if geofence is not None else None
+        for blood_type in blood_types:
+            # Re-subscribing replaces the previous geofence for the topic
+            self._unsubscribe(subscriber, [blood_type])
+            subscriber.topics[blood_type] = fence
+            if fence is None:
+                self.blood_type_subscriptions.setdefault(blood_type, set()).add(subscriber)
+            else:
+                grid = self.geofence_index.setdefault(blood_type, {})
+                for cell in fence.cells:
+                    grid.setdefault(cell, set()).add(subscriber)
+        return set(subscriber.topics)
+
+    def unsubscribe(self, websocket: WebSocket, blood_types: Iterable[str]) -> Set[str]:
+        """Remove topics from a connection; returns what it is still subscribed to"""
+        subscriber = self.subscribers.get(websocket)
+        if subscriber is None:
+            return set()
+        self._unsubscribe(subscriber, blood_types)
+        return set(subscriber.topics)
+
+    def _unsubscribe(self, subscriber: Subscriber, blood_types: Iterable[str]):
+        for blood_type in blood_types:
+            if blood_type not in subscriber.topics:
+                continue
+            fence = subscriber.topics.pop(blood_type)
+            if fence is None:
+                self._discard(self.blood_type_subscriptions, blood_type, subscriber)
+                continue
+            grid = self.geofence_index.get(blood_type, {})
+            for cell in fence.cells:
+                self._discard(grid, cell, subscriber)
+            if not grid:
+                self.geofence_index.pop(blood_type, None)
+
+    @staticmethod
+    def _discard(index: dict, key, subscriber: Subscriber):
+        subscribers = index.get(key)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del index[key]
+
+    def send_personal_message(self, message: str, websocket: WebSocket):
+        subscriber = self.subscribers.get(websocket)
+        if subscriber is not None:
+            self._enqueue(subscriber, message)
+
+    def broadcast_to_blood_type(self, blood_type: str, message: str,
+                                location: Optional[Tuple[float, float]] = None) -> int:
+        """Queue a message for subscribers of a blood type whose geofence (if any) contains
+        location; returns the number queued. Events without a location reach every subscriber."""
+        # Copy: the disconnect policy can remove subscribers while we iterate
+        subscribers = list(self.blood_type_subscriptions.get(blood_type, ()))
+        grid = self.geofence_index.get(blood_type)
+        if grid:
+            if location is None:
+                subscribers.extend({subscriber for cell in grid.values() for subscriber in cell})
+            else:
+                latitude, longitude = location
+                cell = grid.get(grid_cell(latitude, longitude, self.geofence_cell_degrees), ())
+                subscribers.extend(
+                    subscriber for subscriber in list(cell)
+                    if subscriber.topics.get(blood_type) is not None
+                    and subscriber.topics[blood_type].contains(latitude, longitude)
+                )
+        return sum(self._enqueue(subscriber, message) for subscriber in subscribers)
+
+    def broadcast_to_all(self, message: str) -> int:
+        return sum(self._enqueue(subscriber, message) for subscriber in list(self.subscribers.values()))
+
+    def _enqueue(self, subscriber: Subscriber, message: str) -> bool:
+        try:
+            subscriber.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.slow_consumer_policy == "drop_oldest":
+            subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(message)
+            self.dropped += 1
+            return True
+        if self.slow_consumer_policy == "drop_new":
+            self.dropped += 1
+            return False
+
+        self.slow_disconnects += 1
+        self.disconnect(subscriber.websocket)
+        asyncio.create_task(self._close(subscriber.websocket, "Too slow to keep up with broadcasts"))
+        return False
+
+    async def _write(self, subscriber: Subscriber):
+        websocket = subscriber.websocket
+        while True:
+            message = await subscriber.queue.get()
+            try:
+                await asyncio.wait_for(websocket.send_text(message), self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Dead, or stalled past send_timeout: stop writing to it
+                self.send_failures += 1
+                self.disconnect(websocket)
+                await self._close(websocket, "Send failed")
+                return
+            self.sent += 1
+
+    @staticmethod
+    async def _close(websocket: WebSocket, reason: str):
+        try:
+            await websocket.close(code=1008, reason=reason)
+        except Exception:
+            pass
+
+    async def close_all(self):
+        """Stop every writer task (server shutdown)"""
+        tasks = [subscriber.task for subscriber in self.subscribers.values() if subscriber.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.subscribers.clear()
+        self.blood_type_subscriptions.clear()
+        self.geofence_index.clear()
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self.subscribers),
+            "subscriptions": sum(len(subscriber.topics) for subscriber in self.subscribers.values()),
+            "geofencedSubscriptions": sum(
+                fence is not None for subscriber in self.subscribers.values() for fence in subscriber.topics.values()
+            ),
+            "queued": sum(subscriber.queue.qsize() for subscriber in self.subscribers.values()),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "slowDisconnects": self.slow_disconnects,
+            "sendFailures": self.send_failures
+        }
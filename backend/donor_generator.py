@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Synthetic donor populations for scale testing.
+
+    python donor_generator.py postgres --donors 5000000
+    python donor_generator.py csv --donors 1000000 --output donors.csv
+    python donor_generator.py parquet --donors 1000000 --output donors.parquet
+    python donor_generator.py cleanup
+
+Donors cluster around Kenya's towns in proportion to their size, with the
+rest spread over the countryside, and blood types follow the Kenyan
+distribution. Registrations (created_at) grow over the --years before
+--end, about a third of donors have a last donation date, and donors who
+gave in the last 56 days are unavailable.
+
+The output is a pure function of --seed, --end and the row number: rows are
+generated in fixed chunks, each from its own random stream, so any slice of
+a fixture can be regenerated on its own. Phone numbers are --phone-prefix
+followed by the zero-padded row number, which keeps them unique and lets a
+fixture be replaced or removed as a whole.
+
+postgres streams the rows into public.blood with binary COPY, one
+transaction per chunk, after deleting any earlier fixture with the same
+prefix. Maintaining the table's indexes dominates the load time, so for
+multi-million row fixtures on a test database pass --rebuild-indexes to
+build them once at the end instead. Restart the server (or wait for its index reload and stats
+reconcile) to see the new donors. csv writes the columns the import
+endpoint accepts plus id, last_donation_date and created_at. parquet needs
+pyarrow.
+"""
+
+import argparse
+import asyncio
+import bisect
+import csv
+import itertools
+import math
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterator, List, Optional, Tuple
+
+# Towns: (name, latitude, longitude, share of donors, spread in degrees)
+TOWNS = (
+    ("Nairobi", -1.2864, 36.8172, 0.36, 0.10),
+    ("Mombasa", -4.0435, 39.6682, 0.10, 0.06),
+    ("Kisumu", -0.0917, 34.7680, 0.05, 0.05),
+    ("Nakuru", -0.3031, 36.0800, 0.05, 0.05),
+    ("Eldoret", 0.5143, 35.2698, 0.04, 0.05),
+    ("Thika", -1.0333, 37.0693, 0.03, 0.04),
+    ("Machakos", -1.5177, 37.2634, 0.03, 0.04),
+    ("Meru", 0.0471, 37.6498, 0.03, 0.04),
+    ("Kakamega", 0.2827, 34.7519, 0.03, 0.04),
+    ("Kisii", -0.6817, 34.7667, 0.03, 0.04),
+    ("Nyeri", -0.4201, 36.9476, 0.02, 0.04),
+    ("Malindi", -3.2192, 40.1169, 0.02, 0.03),
+    ("Garissa", -0.4532, 39.6461, 0.02, 0.03),
+    ("Kitale", 1.0157, 35.0062, 0.02, 0.03),
+)
+# Everyone else lives somewhere in the countryside (Kenya's bounding box)
+RURAL_SHARE = 1 - sum(town[3] for town in TOWNS)
+KENYA_BOUNDS = (-4.7, 4.6, 33.9, 41.9)
+
+# Approximate share of each blood type among Kenyan donors
+BLOOD_TYPE_SHARES = {
+    "O+": 0.456, "A+": 0.252, "B+": 0.213, "AB+": 0.044,
+    "O-": 0.016, "A-": 0.009, "B-": 0.007, "AB-": 0.003,
+}
+
+FIRST_NAMES = (
+    "Wanjiku", "Kamau", "Otieno", "Achieng", "Mutua", "Njeri", "Kiprop", "Chebet",
+    "Omondi", "Wambui", "Mwangi", "Akinyi", "Kipchoge", "Nduta", "Barasa", "Auma",
+    "Kibet", "Atieno", "Mugo", "Wairimu", "Odhiambo", "Jepkosgei", "Musyoka", "Nyambura",
+)
+
+# Columns of public.blood written by the generator, in row order
+COLUMNS = (
+    "id", "first_name", "phone_number", "blood_type", "latitude", "longitude", "city", "country",
+    "is_verified", "is_available", "last_donation_date", "created_at", "updated_at"
+)
+
+# Rows per random stream and per COPY transaction
+CHUNK_SIZE = 100000
+# Share of donors who have given blood in the last year
+DONATED_SHARE = 0.35
+# Donors can give whole blood again this many days after donating
+DEFERRAL_DAYS = 56
+AVAILABLE_SHARE = 0.9
+VERIFIED_SHARE = 0.3
+PHONE_NUMBER_LENGTH = 13
+DEFAULT_PHONE_PREFIX = "+25592"
+
+_TOWN_WEIGHTS = list(itertools.accumulate([town[3] for town in TOWNS] + [RURAL_SHARE]))
+_BLOOD_TYPES = list(BLOOD_TYPE_SHARES)
+_BLOOD_TYPE_WEIGHTS = list(itertools.accumulate(BLOOD_TYPE_SHARES.values()))
+# Version 4 / RFC 4122 variant bits of a random UUID
+_UUID_MASK = ~((0xf000 << 64) | (0xc000 << 48))
+_UUID_V4_BITS = (0x4000 << 64) | (0x8000 << 48)
+TAU = 2 * math.pi
+
+
+def random_location(rng: random.Random) -> Tuple[float, float, Optional[str]]:
+    """(latitude, longitude, town) where a donor or a searcher might be"""
+    index = bisect.bisect(_TOWN_WEIGHTS, rng.random() * _TOWN_WEIGHTS[-1])
+    if index < len(TOWNS):
+        name, latitude, longitude, _, spread = TOWNS[index]
+        return latitude + rng.gauss(0, spread), longitude + rng.gauss(0, spread), name
+    min_lat, max_lat, min_lon, max_lon = KENYA_BOUNDS
+    return rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon), None
+
+
+def random_blood_type(rng: random.Random) -> str:
+    return _BLOOD_TYPES[bisect.bisect(_BLOOD_TYPE_WEIGHTS, rng.random() * _BLOOD_TYPE_WEIGHTS[-1])]
+
+
+def synthetic_donor(rng: random.Random, phone_number: str, blood_type: Optional[str] = None) -> dict:
+    """A DonorCreate payload for registering a synthetic donor through the API"""
+    latitude, longitude, town = random_location(rng)
+    return {
+        "first_name": rng.choice(FIRST_NAMES),
+        "phone_number": phone_number,
+        "blood_type": blood_type or random_blood_type(rng),
+        "latitude": round(latitude, 6),
+        "longitude": round(longitude, 6),
+        "city": town,
+        "is_verified": rng.random() < VERIFIED_SHARE,
+        "is_available": rng.random() < AVAILABLE_SHARE,
+    }
+
+
+class DonorGenerator:
+    def __init__(self, seed: int = 42, end: Optional[date] = None, years: float = 3.0,
+                 phone_prefix: str = DEFAULT_PHONE_PREFIX):
+        self.seed = seed
+        self.end = end or datetime.now(timezone.utc).date()
+        self.years = years
+        self.phone_prefix = phone_prefix
+        self.phone_digits = PHONE_NUMBER_LENGTH - len(phone_prefix)
+        if self.phone_digits < 1:
+            raise ValueError(f"Phone prefix must be shorter than {PHONE_NUMBER_LENGTH} characters")
+        self.capacity = 10 ** self.phone_digits
+
+    def chunk(self, index: int, count: int = CHUNK_SIZE) -> List[tuple]:
+        """The first count rows (in COLUMNS order) of chunk index"""
+        first = index * CHUNK_SIZE
+        if first + count > self.capacity:
+            raise ValueError(f"Phone prefix {self.phone_prefix} only has room for {self.capacity} donors")
+
+        rng = random.Random(f"{self.seed}:{index}")
+        random_value, uniform, getrandbits = rng.random, rng.uniform, rng.getrandbits
+        end = datetime(self.end.year, self.end.month, self.end.day, tzinfo=timezone.utc)
+        span_seconds = self.years * 365.25 * 86400
+        start_timestamp = end.timestamp() - span_seconds
+        # Day offsets are looked up rather than building a timedelta per row
+        donation_dates = [self.end - timedelta(days=days) for days in range(366)]
+        min_lat, max_lat, min_lon, max_lon = KENYA_BOUNDS
+        towns = TOWNS + ((None, 0, 0, 0, 0),)
+        town_total, blood_type_total = _TOWN_WEIGHTS[-1], _BLOOD_TYPE_WEIGHTS[-1]
+        first_names, name_count = FIRST_NAMES, len(FIRST_NAMES)
+        phone_format = f"{self.phone_prefix}%0{self.phone_digits}d"
+        from_timestamp, utc = datetime.fromtimestamp, timezone.utc
+        sqrt, log, cos, sin = math.sqrt, math.log, math.cos, math.sin
+
+        rows = []
+        for number in range(first, first + count):
+            name, latitude, longitude, _, spread = towns[bisect.bisect(_TOWN_WEIGHTS, random_value() * town_total)]
+            if name is None:
+                latitude, longitude = uniform(min_lat, max_lat), uniform(min_lon, max_lon)
+            else:
+                # Box-Muller: one normal pair for both offsets, cheaper than two rng.gauss() calls
+                distance = spread * sqrt(-2 * log(1 - random_value()))
+                angle = TAU * random_value()
+                latitude, longitude = latitude + distance * cos(angle), longitude + distance * sin(angle)
+
+            # Registrations grow linearly over time, so the share registered by t is t squared
+            created_at = from_timestamp(start_timestamp + span_seconds * random_value() ** 0.5, utc)
+            last_donation = None
+            is_available = random_value() < AVAILABLE_SHARE
+            if random_value() < DONATED_SHARE:
+                days = int(random_value() * 366)
+                last_donation = donation_dates[days]
+                if days < DEFERRAL_DAYS:
+                    is_available = False
+
+            rows.append((
+                "%032x" % (getrandbits(128) & _UUID_MASK | _UUID_V4_BITS),
+                first_names[int(random_value() * name_count)],
+                phone_format % number,
+                _BLOOD_TYPES[bisect.bisect(_BLOOD_TYPE_WEIGHTS, random_value() * blood_type_total)],
+                latitude,
+                longitude,
+                name,
+                "Kenya",
+                random_value() < VERIFIED_SHARE,
+                is_available,
+                last_donation,
+                created_at,
+                created_at,
+            ))
+        return rows
+
+    def chunks(self, count: int) -> Iterator[List[tuple]]:
+        """Rows for donors 0..count-1, a chunk at a time"""
+        for index in range((count + CHUNK_SIZE - 1) // CHUNK_SIZE):
+            yield self.chunk(index, min(CHUNK_SIZE, count - index * CHUNK_SIZE))
+
+    def rows(self, count: int) -> Iterator[tuple]:
+        for chunk in self.chunks(count):
+            yield from chunk
+
+
+# Outputs
+
+# Secondary indexes of public.blood (not the ones backing the id and phone_number constraints)
+SECONDARY_INDEXES_QUERY = """
+    SELECT i.indexname, i.indexdef
+    FROM pg_indexes i
+    WHERE i.schemaname = 'public' AND i.tablename = 'blood'
+      AND NOT EXISTS (
+          SELECT 1 FROM pg_constraint c
+          WHERE c.conindid = to_regclass(quote_ident(i.schemaname) || '.' || quote_ident(i.indexname))
+      )
+"""
+
+
+async def copy_to_postgres(engine, generator: DonorGenerator, count: int, rebuild_indexes: bool = False,
+                           progress=print) -> int:
+    """Replace the generator's fixture in public.blood with count donors
+
+    With rebuild_indexes the secondary indexes are dropped for the load and
+    built again afterwards, which is several times faster for large fixtures
+    but blocks other queries on the table while it runs.
+    """
+    from sqlalchemy import text
+
+    removed = await delete_fixture(engine, generator.phone_prefix)
+    if removed:
+        progress(f"   Removed {removed} donors of the previous {generator.phone_prefix} fixture")
+
+    indexes = []
+    if rebuild_indexes:
+        async with engine.begin() as conn:
+            indexes = (await conn.execute(text(SECONDARY_INDEXES_QUERY))).fetchall()
+            for name, _ in indexes:
+                await conn.exec_driver_sql(f'DROP INDEX public."{name}"')
+        progress(f"   Dropped {len(indexes)} secondary indexes for the load")
+
+    written = 0
+    started = time.perf_counter()
+    try:
+        for rows in generator.chunks(count):
+            async with engine.begin() as conn:
+                raw_connection = await conn.get_raw_connection()
+                await raw_connection.driver_connection.copy_records_to_table(
+                    "blood", schema_name="public", records=rows, columns=COLUMNS
+                )
+            written += len(rows)
+            progress(f"   {written}/{count} donors ({time.perf_counter() - started:.1f}s)")
+    finally:
+        if indexes:
+            progress(f"   Rebuilding {len(indexes)} indexes...")
+            async with engine.begin() as conn:
+                await conn.exec_driver_sql("SET LOCAL maintenance_work_mem = '256MB'")
+                for _, definition in indexes:
+                    await conn.exec_driver_sql(definition)
+            progress(f"   Indexes rebuilt ({time.perf_counter() - started:.1f}s)")
+
+    # Fresh planner statistics for the new row count and distributions
+    async with engine.begin() as conn:
+        await conn.execute(text("ANALYZE public.blood"))
+    return written
+
+
+async def delete_fixture(engine, phone_prefix: str) -> int:
+    from sqlalchemy import text
+
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            text("DELETE FROM public.blood WHERE phone_number LIKE :prefix"), {"prefix": f"{phone_prefix}%"}
+        )
+        return result.rowcount
+
+
+def _csv_value(value):
+    return "" if value is None else value
+
+
+def write_csv(output, generator: DonorGenerator, count: int):
+    writer = csv.writer(output)
+    writer.writerow(COLUMNS)
+    for rows in generator.chunks(count):
+        writer.writerows(tuple(_csv_value(value) for value in row) for row in rows)
+
+
+def write_parquet(path: str, generator: DonorGenerator, count: int):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([
+        ("id", pa.string()), ("first_name", pa.string()), ("phone_number", pa.string()),
+        ("blood_type", pa.string()), ("latitude", pa.float64()), ("longitude", pa.float64()),
+        ("city", pa.string()), ("country", pa.string()), ("is_verified", pa.bool_()),
+        ("is_available", pa.bool_()), ("last_donation_date", pa.date32()),
+        ("created_at", pa.timestamp("us", tz="UTC")), ("updated_at", pa.timestamp("us", tz="UTC")),
+    ])
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in generator.chunks(count):
+            writer.write_table(pa.table([list(column) for column in zip(*rows)], schema=schema))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic donor population")
+    parser.add_argument("target", choices=("postgres", "csv", "parquet", "cleanup"))
+    parser.add_argument("--donors", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end", type=date.fromisoformat, help="last registration date (default: today)")
+    parser.add_argument("--years", type=float, default=3.0, help="registrations span this many years")
+    parser.add_argument("--phone-prefix", default=DEFAULT_PHONE_PREFIX)
+    parser.add_argument("--rebuild-indexes", action="store_true",
+                        help="postgres: drop the secondary indexes for the load and rebuild them after")
+    parser.add_argument("--output", help="file for csv/parquet (csv default: stdout)")
+    args = parser.parse_args()
+
+    generator = DonorGenerator(args.seed, args.end, args.years, args.phone_prefix)
+    started = time.perf_counter()
+
+    if args.target in ("postgres", "cleanup"):
+        from database import async_engine
+
+        async def run():
+            try:
+                if args.target == "cleanup":
+                    return await delete_fixture(async_engine, args.phone_prefix)
+                return await copy_to_postgres(async_engine, generator, args.donors, args.rebuild_indexes)
+            finally:
+                await async_engine.dispose()
+
+        if args.target == "postgres":
+            print(f"🌱 Writing {args.donors} donors (seed {args.seed}) to Postgres...")
+            count = asyncio.run(run())
+            print(f"✅ {count} donors in {time.perf_counter() - started:.1f}s")
+        else:
+            print(f"🧹 Deleted {asyncio.run(run())} {args.phone_prefix} donors")
+        return
+
+    if args.target == "parquet":
+        if not args.output:
+            parser.error("parquet needs --output")
+        write_parquet(args.output, generator, args.donors)
+    elif args.output:
+        with open(args.output, "w", newline="") as output:
+            write_csv(output, generator, args.donors)
+    else:
+        write_csv(sys.stdout, generator, args.donors)
+    print(f"✅ {args.donors} donors in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
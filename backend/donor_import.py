@@ -0,0 +1,244 @@
+"""
+Bulk donor import from CSV or NDJSON.
+
+The upload is parsed as it streams in. Every row is validated with the
+DonorCreate rules plus the limits of the public.blood columns, and valid
+rows are fed straight into a binary COPY into a temporary staging table. A
+single INSERT ... ON CONFLICT then merges the staging table into
+public.blood with the same upsert semantics as registration (the last row
+wins when a phone number appears more than once). Everything happens in one
+transaction; rows that fail validation are skipped and reported by line.
+
+Merged rows are stamped with clock_timestamp() rather than the transaction
+start, so a long upload does not commit rows that look older than what
+other workers' incremental donor index refresh has already seen. A merge
+that itself outlasts their refresh window can still slip past it, so
+callers publish DONOR_INDEX_RELOAD_TOPIC on the event bus afterwards to
+make every worker reload its index.
+"""
+
+import csv
+import json
+from typing import AsyncIterator, Dict, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import text
+
+from schemas import BLOOD_TYPES, DonorCreate
+
+IMPORT_COLUMNS = (
+    "line", "first_name", "phone_number", "blood_type", "latitude", "longitude",
+    "address", "city", "country", "is_verified", "is_available"
+)
+
+# Lengths of the VARCHAR columns in public.blood
+COLUMN_LENGTHS = {"first_name": 100, "phone_number": 20, "city": 100, "country": 100}
+
+# Event bus topic asking every worker to fully reload its donor index
+DONOR_INDEX_RELOAD_TOPIC = "donor_index_reload"
+
+CREATE_STAGING_TABLE = text("""
+    CREATE TEMPORARY TABLE donor_import (
+        line INTEGER NOT NULL,
+        first_name TEXT NOT NULL,
+        phone_number TEXT NOT NULL,
+        blood_type TEXT NOT NULL,
+        latitude DOUBLE PRECISION NOT NULL,
+        longitude DOUBLE PRECISION NOT NULL,
+        address TEXT,
+        city TEXT,
+        country TEXT NOT NULL,
+        is_verified BOOLEAN NOT NULL,
+        is_available BOOLEAN NOT NULL
+    ) ON COMMIT DROP
+""")
+
+# Registration semantics: an existing donor keeps its verification status
+MERGE_STAGING_TABLE = text("""
+    WITH merged AS (
+        INSERT INTO public.blood (
+            first_name, phone_number, blood_type, latitude, longitude,
+            address, city, country, is_verified, is_available, updated_at
+        )
+        SELECT DISTINCT ON (phone_number)
+            first_name, phone_number, blood_type, latitude, longitude,
+            address, city, country, is_verified, is_available, clock_timestamp()
+        FROM donor_import
+        ORDER BY phone_number, line DESC
+        ON CONFLICT (phone_number) DO UPDATE SET
+            first_name = EXCLUDED.first_name,
+            blood_type = EXCLUDED.blood_type,
+            latitude = EXCLUDED.latitude,
+            longitude = EXCLUDED.longitude,
+            address = EXCLUDED.address,
+            city = EXCLUDED.city,
+            country = EXCLUDED.country,
+            is_available = EXCLUDED.is_available,
+            updated_at = EXCLUDED.updated_at
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT
+        COUNT(*) FILTER (WHERE inserted),
+        COUNT(*) FILTER (WHERE NOT inserted),
+        transaction_timestamp()
+    FROM merged
+""")
+
+
+class DonorImport:
+    def __init__(self, max_errors: int = 1000):
+        self.max_errors = max_errors
+        self.received = 0
+        self.valid = 0
+        self.inserted = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors: List[dict] = []
+        # Database time the import transaction started; every merged row has updated_at >= it
+        self.started_at = None
+
+    def error(self, line: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": message})
+
+    def validate(self, line: int, fields: Dict[str, object]) -> Optional[tuple]:
+        """Staging table record for a parsed row, or None if the row is invalid"""
+        # Blank cells fall back to the DonorCreate defaults
+        fields = {key: value for key, value in fields.items() if value not in ("", None)}
+        try:
+            donor = DonorCreate.model_validate(fields)
+        except ValidationError as e:
+            self.error(line, "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            ))
+            return None
+
+        if donor.blood_type not in BLOOD_TYPES:
+            self.error(line, f"blood_type: must be one of {', '.join(BLOOD_TYPES)}")
+            return None
+        if not -90 <= donor.latitude <= 90 or not -180 <= donor.longitude <= 180:
+            self.error(line, "latitude/longitude: out of range")
+            return None
+        for column, length in COLUMN_LENGTHS.items():
+            value = getattr(donor, column)
+            if value is not None and len(value) > length:
+                self.error(line, f"{column}: longer than {length} characters")
+                return None
+
+        return (
+            line, donor.first_name, donor.phone_number, donor.blood_type, donor.latitude, donor.longitude,
+            donor.address, donor.city, donor.country, donor.is_verified, donor.is_available
+        )
+
+    async def records(self, rows: AsyncIterator[tuple]) -> AsyncIterator[tuple]:
+        """Validated staging records for (line, fields) pairs; fields is None for unparseable lines"""
+        async for line, fields in rows:
+            self.received += 1
+            if fields is None:
+                continue
+            record = self.validate(line, fields)
+            if record is not None:
+                self.valid += 1
+                yield record
+
+    async def run(self, conn, rows: AsyncIterator[tuple]):
+        """COPY the rows into the staging table and merge them, inside conn's transaction"""
+        await conn.execute(CREATE_STAGING_TABLE)
+        raw_connection = await conn.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            "donor_import", records=self.records(rows), columns=IMPORT_COLUMNS
+        )
+        inserted, updated, started_at = (await conn.execute(MERGE_STAGING_TABLE)).fetchone()
+        self.inserted = inserted
+        self.updated = updated
+        self.started_at = started_at
+
+    def report(self) -> dict:
+        return {
+            "received": self.received,
+            "valid": self.valid,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            # Rows replaced by a later row with the same phone number
+            "duplicates": self.valid - self.inserted - self.updated,
+            "errorCount": self.error_count,
+            "errors": self.errors
+        }
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into text lines without reading it all into memory"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8-sig").rstrip("\r")
+
+
+async def parse_ndjson(chunks: AsyncIterator[bytes], report: DonorImport) -> AsyncIterator[tuple]:
+    line_number = 0
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            fields = json.loads(line)
+            if not isinstance(fields, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            report.error(line_number, f"invalid JSON: {e}")
+            fields = None
+        yield line_number, fields
+
+
+async def parse_csv(chunks: AsyncIterator[bytes], report: DonorImport) -> AsyncIterator[tuple]:
+    """CSV with a header row; quoted fields may span lines"""
+    header = None
+    line_number = 0
+    record_start = 0
+    pending: List[str] = []
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if not pending:
+            record_start = line_number
+        pending.append(line)
+        # An odd number of quotes so far means a quoted field continues on the next line
+        if sum(part.count('"') for part in pending) % 2:
+            continue
+        record, pending = "\n".join(pending), []
+        if not record.strip():
+            continue
+
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            report.error(record_start, f"expected {len(header)} columns, got {len(values)}")
+            yield record_start, None
+            continue
+        yield record_start, dict(zip(header, values))
+
+    if pending:
+        report.error(record_start, "unterminated quoted field")
+        yield record_start, None
+
+
+PARSERS = {
+    "csv": parse_csv,
+    "ndjson": parse_ndjson,
+}
+
+
+async def import_donors(engine, chunks: AsyncIterator[bytes], file_format: str, max_errors: int = 1000) -> DonorImport:
+    """Import a CSV or NDJSON byte stream in one transaction"""
+    if file_format not in PARSERS:
+        raise ValueError(f"Unsupported import format '{file_format}', expected one of {', '.join(PARSERS)}")
+    donor_import = DonorImport(max_errors=max_errors)
+    async with engine.begin() as conn:
+        await donor_import.run(conn, PARSERS[file_format](chunks, donor_import))
+    return donor_import
@@ -0,0 +1,324 @@
+"""
+Pub/sub bus for donor events, so every worker and replica can push them to
+its own WebSocket subscribers.
+
+publish() never waits: events are collected and flushed in batches every
+flush_interval (or as soon as batch_size is reached). Within a batch, events
+with the same key are coalesced so only the latest one is sent. Each flushed
+batch is handed to the local handlers and sent to the other processes;
+batches a process sent itself are ignored when they come back, and event ids
+already seen are skipped in case a transport delivers twice.
+
+The flush loop runs even when the transport cannot connect (at boot or
+after a restart of Postgres/Redis): local subscribers keep getting events
+while the connection is retried in the background every reconnect_interval.
+
+Backends:
+- InProcessEventBus: single process only (the default)
+- PostgresEventBus:  LISTEN/NOTIFY on the application database, no extra service
+- RedisEventBus:     Redis PUBLISH/SUBSCRIBE with any Redis-compatible asyncio
+                     client (redis.asyncio, fakeredis.aioredis for local tests)
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_PAYLOAD_LIMIT = 7900
+# Event ids remembered for de-duplication
+SEEN_EVENT_IDS = 10000
+
+
+class EventBus:
+    def __init__(self, batch_size: int = 100, flush_interval: float = 0.05, reconnect_interval: float = 5.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.reconnect_interval = reconnect_interval
+        # Identifies batches this process published
+        self.origin = uuid.uuid4().hex
+        self.handlers: List[Callable[[str, str, Optional[Tuple[float, float]]], None]] = []
+        # key -> event; a newer event with the same key replaces the pending one
+        self._pending: "OrderedDict[str, dict]" = OrderedDict()
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reconnecting: Optional[asyncio.Task] = None
+        self._retry_at = 0.0
+
+        self.published = 0
+        self.coalesced = 0
+        self.delivered = 0
+        self.received_batches = 0
+        self.duplicates = 0
+        self.send_failures = 0
+        self.reconnect_failures = 0
+
+    def subscribe(self, handler: Callable[[str, str, Optional[Tuple[float, float]]], None]):
+        """Call handler(topic, message, location) for every event, local or remote"""
+        self.handlers.append(handler)
+
+    def publish(self, topic: str, message: str, key: Optional[str] = None,
+                location: Optional[Tuple[float, float]] = None):
+        """Queue an already-serialized message for a topic without waiting.
+
+        location is the (latitude, longitude) the event happened at, for geofenced subscribers.
+        """
+        event_id = uuid.uuid4().hex
+        key = f"{topic}:{key}" if key is not None else event_id
+        if key in self._pending:
+            del self._pending[key]
+            self.coalesced += 1
+        self._pending[key] = {"id": event_id, "topic": topic, "message": message, "location": location}
+        self.published += 1
+        if self._wakeup is not None and len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def start(self):
+        """Start flushing and connect the transport.
+
+        Raises if the transport cannot connect; events are still delivered to
+        local subscribers and the connection is retried in the background.
+        """
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            try:
+                await self.connect()
+            except Exception:
+                self._retry_at = time.monotonic() + self.reconnect_interval
+                raise
+
+    async def stop(self):
+        for task in (self._task, self._reconnecting):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._reconnecting = None
+        await self.flush()
+        await self.close()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+            # Reconnect off the flush path so a slow connect does not hold up local delivery
+            if (self._reconnecting is None or self._reconnecting.done()) and time.monotonic() >= self._retry_at:
+                self._reconnecting = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        try:
+            await self.check_connection()
+        except Exception as e:
+            self.reconnect_failures += 1
+            self._retry_at = time.monotonic() + self.reconnect_interval
+            print(f"⚠️  Warning: Donor event bus reconnect failed: {e}")
+
+    async def flush(self):
+        while self._pending:
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                batch.append(self._pending.popitem(last=False)[1])
+            self._deliver(batch)
+            try:
+                await self.send(batch)
+            except Exception as e:
+                # Remote workers miss this batch; local subscribers already have it
+                self.send_failures += 1
+                print(f"⚠️  Warning: Could not publish {len(batch)} donor events: {e}")
+
+    def _deliver(self, events: List[dict]):
+        for event in events:
+            if event["id"] in self._seen:
+                self.duplicates += 1
+                continue
+            self._seen[event["id"]] = None
+            if len(self._seen) > SEEN_EVENT_IDS:
+                self._seen.popitem(last=False)
+            for handler in self.handlers:
+                try:
+                    location = event.get("location")
+                    handler(event["topic"], event["message"], tuple(location) if location else None)
+                except Exception as e:
+                    print(f"⚠️  Warning: Donor event handler failed: {e}")
+            self.delivered += 1
+
+    def encode(self, events: List[dict]) -> str:
+        return json.dumps({"origin": self.origin, "events": events})
+
+    def receive(self, payload: str):
+        """Handle a batch published by any process (our own are ignored)"""
+        try:
+            batch = json.loads(payload)
+        except ValueError:
+            print("⚠️  Warning: Ignoring malformed donor event batch")
+            return
+        if batch.get("origin") == self.origin:
+            return
+        self.received_batches += 1
+        self._deliver(batch.get("events", []))
+
+    # Transport hooks
+    async def connect(self):
+        pass
+
+    async def check_connection(self):
+        """Re-establish a dropped or never established subscription; called after every flush"""
+        pass
+
+    async def close(self):
+        pass
+
+    async def send(self, events: List[dict]):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "pending": len(self._pending),
+            "published": self.published,
+            "coalesced": self.coalesced,
+            "delivered": self.delivered,
+            "receivedBatches": self.received_batches,
+            "duplicates": self.duplicates,
+            "sendFailures": self.send_failures,
+            "reconnectFailures": self.reconnect_failures
+        }
+
+
+class InProcessEventBus(EventBus):
+    name = "memory"
+
+
+class PostgresEventBus(EventBus):
+    """LISTEN/NOTIFY over a dedicated asyncpg connection"""
+    name = "postgres"
+
+    def __init__(self, dsn: str, channel: str = "donor_events", **kwargs):
+        super().__init__(**kwargs)
+        self.dsn = dsn
+        self.channel = channel
+        self._connection = None
+
+    async def connect(self):
+        import asyncpg
+        self._connection = await asyncpg.connect(self.dsn)
+        await self._connection.add_listener(self.channel, self._on_notify)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self.receive(payload)
+
+    async def close(self):
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def check_connection(self):
+        if self._connection is None or self._connection.is_closed():
+            # Listener connection dropped (database restart): reconnect
+            await self.connect()
+
+    async def send(self, events: List[dict]):
+        if self._connection is None or self._connection.is_closed():
+            # The flush loop reconnects; until then only local subscribers get events
+            raise ConnectionError("not connected to Postgres")
+        for payload in self._payloads(events):
+            await self._connection.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+
+    def _payloads(self, events: List[dict]):
+        """Split a batch into NOTIFY-sized payloads"""
+        overhead = len(self.encode([]))
+        chunk: List[dict] = []
+        size = overhead
+        for event in events:
+            event_size = len(json.dumps(event).encode()) + 2
+            if overhead + event_size > NOTIFY_PAYLOAD_LIMIT:
+                print(f"⚠️  Warning: Donor event too large for NOTIFY ({event_size} bytes), not sent to other workers")
+                continue
+            if size + event_size > NOTIFY_PAYLOAD_LIMIT:
+                yield self.encode(chunk)
+                chunk, size = [], overhead
+            chunk.append(event)
+            size += event_size
+        if chunk:
+            yield self.encode(chunk)
+
+
+class RedisEventBus(EventBus):
+    name = "redis"
+
+    def __init__(self, client, channel: str = "donor_events", **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.channel = channel
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_url(cls, url: str, channel: str = "donor_events", **kwargs):
+        import redis.asyncio as redis
+        return cls(redis.from_url(url), channel=channel, **kwargs)
+
+    async def connect(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.channel)
+        self._pubsub = pubsub
+        self._listener = asyncio.create_task(self._listen())
+
+    async def check_connection(self):
+        # redis-py re-subscribes dropped connections itself; only a failed first subscribe is retried here
+        if self._pubsub is None:
+            await self.connect()
+
+    async def _listen(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Warning: Donor event subscription failed: {e}")
+                await asyncio.sleep(1)
+                continue
+            if message is not None and message.get("type") == "message":
+                data = message["data"]
+                self.receive(data.decode() if isinstance(data, bytes) else data)
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self.channel)
+            # redis-py renamed close() to aclose() in 5.0.1
+            close = getattr(self._pubsub, "aclose", None) or self._pubsub.close
+            await close()
+            self._pubsub = None
+
+    async def send(self, events: List[dict]):
+        await self.client.publish(self.channel, self.encode(events))
+
+
+def create_event_bus(backend: str, database_url: Optional[str] = None, redis_url: Optional[str] = None,
+                     channel: str = "donor_events", **kwargs) -> EventBus:
+    if backend == "postgres":
+        return PostgresEventBus(database_url, channel=channel, **kwargs)
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("EVENT_BUS=redis requires REDIS_URL")
+        return RedisEventBus.from_url(redis_url, channel=channel, **kwargs)
+    return InProcessEventBus(**kwargs)
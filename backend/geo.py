@@ -0,0 +1,71 @@
+"""
+Geographic helpers shared by the donor search code
+"""
+
+import math
+from typing import List, Tuple
+
+# Same Earth radius as the Haversine SQL in main.py
+EARTH_RADIUS_KM = 6371
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude: float, longitude: float,
+                 radius_km: float) -> Tuple[float, float, List[Tuple[float, float]]]:
+    """Return (min_lat, max_lat, lon_ranges) enclosing a search circle.
+
+    Every point within radius_km of (latitude, longitude) is inside the box,
+    so it can be used as a cheap prefilter before the exact distance check.
+    lon_ranges holds one (min_lon, max_lon) range within -180..180, or two
+    when the box crosses the antimeridian and continues on the other side.
+    """
+    angular_radius = radius_km / EARTH_RADIUS_KM
+    lat = math.radians(latitude)
+    min_lat = lat - angular_radius
+    max_lat = lat + angular_radius
+
+    if min_lat <= -math.pi / 2 or max_lat >= math.pi / 2:
+        # The circle contains a pole, so every longitude is in range
+        return (
+            math.degrees(max(min_lat, -math.pi / 2)),
+            math.degrees(min(max_lat, math.pi / 2)),
+            [(-180.0, 180.0)],
+        )
+
+    delta_lon = math.degrees(math.asin(min(1.0, math.sin(angular_radius) / math.cos(lat))))
+    longitude = (longitude + 180) % 360 - 180
+    min_lon, max_lon = longitude - delta_lon, longitude + delta_lon
+    if max_lon > 180:
+        lon_ranges = [(min_lon, 180.0), (-180.0, max_lon - 360)]
+    elif min_lon < -180:
+        lon_ranges = [(-180.0, max_lon), (min_lon + 360, 180.0)]
+    else:
+        lon_ranges = [(min_lon, max_lon)]
+    return math.degrees(min_lat), math.degrees(max_lat), lon_ranges
+
+
+def grid_cell(latitude: float, longitude: float, cell_degrees: float) -> Tuple[int, int]:
+    """Grid cell containing a point for a grid of cell_degrees x cell_degrees"""
+    return (math.floor(latitude / cell_degrees), math.floor(longitude / cell_degrees))
+
+
+def covering_cells(latitude: float, longitude: float, radius_km: float, cell_degrees: float) -> List[Tuple[int, int]]:
+    """Every grid cell overlapping the bounding box of a circle, on both sides of the antimeridian"""
+    min_lat, max_lat, lon_ranges = bounding_box(latitude, longitude, radius_km)
+    lat_lo = math.floor(min_lat / cell_degrees)
+    lat_hi = math.floor(max_lat / cell_degrees)
+    return [
+        (cell_lat, cell_lon)
+        for min_lon, max_lon in lon_ranges
+        for cell_lat in range(lat_lo, lat_hi + 1)
+        for cell_lon in range(math.floor(min_lon / cell_degrees), math.floor(max_lon / cell_degrees) + 1)
+    ]
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Bulk import donors from a CSV or NDJSON file straight into the database.
+
+    python import_donors.py donors.csv
+    python import_donors.py donors.ndjson
+    cat donors.csv | python import_donors.py - --format csv
+
+CSV files need a header row naming the DonorCreate fields (first_name,
+phone_number, blood_type, latitude, longitude, address, city, country,
+is_verified, is_available). Existing donors are updated by phone number.
+
+Afterwards a reload is published on the configured event bus (EVENT_BUS), so
+running servers rebuild their donor search index. With the default
+in-process bus the servers cannot be reached: they see the new donors at
+their next incremental refresh if the merge was quicker than
+DONOR_INDEX_REFRESH_SECONDS, and otherwise at their next full reload
+(DONOR_INDEX_RELOAD_SECONDS).
+"""
+
+import argparse
+import asyncio
+import sys
+
+import config
+from database import DATABASE_URL, async_engine
+from donor_import import DONOR_INDEX_RELOAD_TOPIC, import_donors
+from event_bus import create_event_bus
+
+CHUNK_SIZE = 64 * 1024
+
+
+async def read_chunks(stream):
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        yield chunk
+
+
+async def run(path: str, file_format: str) -> dict:
+    stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+    try:
+        donor_import = await import_donors(
+            async_engine, read_chunks(stream), file_format, max_errors=config.DONOR_IMPORT_MAX_ERRORS
+        )
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+        await async_engine.dispose()
+    if donor_import.inserted or donor_import.updated:
+        await request_index_reload()
+    return donor_import.report()
+
+
+async def request_index_reload():
+    """Ask running servers to reload their donor index, when they share an event bus with us"""
+    if config.EVENT_BUS == "memory":
+        print("⚠️  EVENT_BUS is in-process, running servers pick the donors up at their next index refresh")
+        return
+    event_bus = create_event_bus(
+        config.EVENT_BUS, database_url=DATABASE_URL, redis_url=config.REDIS_URL, channel=config.EVENT_BUS_CHANNEL
+    )
+    try:
+        await event_bus.start()
+        event_bus.publish(DONOR_INDEX_RELOAD_TOPIC, "", key="reload")
+    except Exception as e:
+        print(f"⚠️  Warning: Could not ask running servers to reload their donor index: {e}")
+    finally:
+        await event_bus.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import donors from CSV or NDJSON")
+    parser.add_argument("path", help="file to import, or - for stdin")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="defaults to the file extension")
+    args = parser.parse_args()
+
+    file_format = args.format
+    if file_format is None:
+        extension = args.path.rsplit(".", 1)[-1].lower()
+        file_format = {"csv": "csv", "ndjson": "ndjson", "jsonl": "ndjson"}.get(extension)
+    if file_format is None:
+        parser.error("could not tell the format from the file name, pass --format")
+
+    print(f"📥 Importing donors from {args.path} ({file_format})...")
+    report = asyncio.run(run(args.path, file_format))
+    print(f"✅ {report['inserted']} new, {report['updated']} updated, {report['duplicates']} duplicates, "
+          f"{report['errorCount']} rejected out of {report['received']} rows")
+    for error in report["errors"]:
+        print(f"   line {error['line']}: {error['error']}")
+    if report["errorCount"] > len(report["errors"]):
+        print(f"   ... and {report['errorCount'] - len(report['errors'])} more")
+    if report["errorCount"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Reproducible load test and benchmark for the backend API.
+
+    python load_test.py seed --donors 100000
+    python load_test.py run --output results.json
+    python load_test.py run --compare benchmarks/baseline-10k.json
+    python load_test.py cleanup
+
+seed writes a synthetic donor population (10k to 5M rows) from
+donor_generator straight into DATABASE_URL, replacing any earlier seed.
+Start the server after seeding (or wait for its index reload) so the
+in-memory search index sees every donor.
+
+run drives a running server at --base-url with --concurrency virtual users
+per scenario, each sending requests back to back until --requests have
+been sent:
+- search:        POST /api/v1/donors/search around a random populated place
+- register:      POST /api/v1/donors with new phone numbers
+- admin_stats:   GET /api/v1/admin/stats
+- admin_donors:  GET /api/v1/admin/donors (first page)
+- admin_search:  GET /api/v1/admin/donors?search=<name>
+- ws_fanout:     --ws-clients sockets subscribed to AB- while AB- donors
+                 register; latency is from sending the registration to
+                 each socket receiving the event
+Searches come from a pool of client addresses (X-Forwarded-For), but the
+server still needs a search rate limit (and register limit, if one is
+set) above the load, e.g. RATE_LIMITS="search=1000000/hour".
+
+The report is JSON with requests, errors, status codes, throughput and
+p50/p95/p99 latency (ms) per scenario. With --compare, the run fails (exit
+status 1) when a scenario's p95 latency grows, or its throughput drops, by
+more than --threshold relative to the baseline report.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from donor_generator import (
+    FIRST_NAMES, DonorGenerator, copy_to_postgres, random_blood_type, random_location, synthetic_donor
+)
+
+# Seeded donors and donors registered by the run, removed by cleanup
+SEED_PHONE_PREFIX = "+25593"
+REGISTER_PHONE_PREFIX = "+25594"
+
+SCENARIOS = ("search", "register", "admin_stats", "admin_donors", "admin_search", "ws_fanout")
+
+
+# Seeding
+
+async def seed(donors: int, seed_value: int) -> int:
+    from database import async_engine
+
+    try:
+        return await copy_to_postgres(async_engine, DonorGenerator(seed_value, phone_prefix=SEED_PHONE_PREFIX), donors)
+    finally:
+        await async_engine.dispose()
+
+
+async def cleanup() -> int:
+    from sqlalchemy import text
+    from database import async_engine
+
+    try:
+        async with async_engine.begin() as conn:
+            result = await conn.execute(
+                text("DELETE FROM public.blood WHERE phone_number LIKE :seeded OR phone_number LIKE :registered"),
+                {"seeded": f"{SEED_PHONE_PREFIX}%", "registered": f"{REGISTER_PHONE_PREFIX}%"}
+            )
+            return result.rowcount
+    finally:
+        await async_engine.dispose()
+
+
+# Measurement
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class ScenarioResult:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.status_codes: Counter = Counter()
+        self.errors = 0
+        self.elapsed = 0.0
+        self.extra: Dict[str, object] = {}
+
+    def record(self, seconds: float, status):
+        self.latencies.append(seconds)
+        self.status_codes[str(status)] += 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors += 1
+
+    def report(self) -> dict:
+        latencies = sorted(self.latencies)
+        milliseconds = lambda seconds: round(seconds * 1000, 3)
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "errorRate": round(self.errors / len(latencies), 4) if latencies else 0.0,
+            "statusCodes": dict(self.status_codes),
+            "elapsedSeconds": round(self.elapsed, 3),
+            "throughputRps": round(len(latencies) / self.elapsed, 2) if self.elapsed else 0.0,
+            "latencyMs": {
+                "p50": milliseconds(percentile(latencies, 50)),
+                "p95": milliseconds(percentile(latencies, 95)),
+                "p99": milliseconds(percentile(latencies, 99)),
+                "max": milliseconds(latencies[-1]) if latencies else 0.0,
+                "mean": milliseconds(sum(latencies) / len(latencies)) if latencies else 0.0
+            },
+            **self.extra
+        }
+
+
+async def drive(name: str, request: Callable[[random.Random], Awaitable[object]], concurrency: int,
+                requests: int, seed_value: int) -> ScenarioResult:
+    """Closed loop: concurrency users each send their next request as soon as the last one finished"""
+    result = ScenarioResult(name)
+    sent = itertools.count()
+
+    async def user(user_id: int):
+        rng = random.Random(f"{seed_value}:{name}:{user_id}")
+        while next(sent) < requests:
+            start = time.perf_counter()
+            try:
+                status = await request(rng)
+            except Exception as e:
+                status = type(e).__name__
+            result.record(time.perf_counter() - start, status)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(user_id) for user_id in range(concurrency)))
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+# Scenarios
+
+def http_scenarios(client: httpx.AsyncClient, run_id: str) -> Dict[str, Callable[[random.Random], Awaitable[int]]]:
+    registrations = itertools.count()
+
+    async def search(rng: random.Random) -> int:
+        latitude, longitude, _ = random_location(rng)
+        response = await client.post("/api/v1/donors/search", json={
+            "blood_type": "ANY" if rng.random() < 0.1 else random_blood_type(rng),
+            "latitude": latitude,
+            "longitude": longitude,
+            "radius_km": rng.choice((10, 20, 30, 50))
+        }, headers={"X-Forwarded-For": f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"})
+        return response.status_code
+
+    async def register(rng: random.Random) -> int:
+        phone_number = f"{REGISTER_PHONE_PREFIX}{run_id}{next(registrations):04d}"
+        response = await client.post("/api/v1/donors", json=synthetic_donor(rng, phone_number))
+        return response.status_code
+
+    async def admin_stats(rng: random.Random) -> int:
+        return (await client.get("/api/v1/admin/stats")).status_code
+
+    async def admin_donors(rng: random.Random) -> int:
+        params = {"limit": 100}
+        if rng.random() < 0.5:
+            params["blood_type"] = random_blood_type(rng)
+        return (await client.get("/api/v1/admin/donors", params=params)).status_code
+
+    async def admin_search(rng: random.Random) -> int:
+        search = rng.choice(FIRST_NAMES)[:rng.randint(3, 6)]
+        return (await client.get("/api/v1/admin/donors", params={"search": search, "limit": 50})).status_code
+
+    return {
+        "search": search,
+        "register": register,
+        "admin_stats": admin_stats,
+        "admin_donors": admin_donors,
+        "admin_search": admin_search,
+    }
+
+
+async def ws_fanout(client: httpx.AsyncClient, base_url: str, clients: int, events: int, run_id: str,
+                    seed_value: int) -> ScenarioResult:
+    """Registration-to-delivery latency of donor events at clients subscribed sockets"""
+    import websockets
+
+    ws_url = base_url.replace("http", "ws", 1).rstrip("/") + "/ws"
+    result = ScenarioResult("ws_fanout")
+    sent_at: Dict[str, float] = {}
+    delivered = Counter()
+    done = asyncio.Event()
+
+    async def listen(websocket):
+        async for raw in websocket:
+            message = json.loads(raw)
+            first_name = message.get("donor", {}).get("first_name", "") if message.get("type") == "new_donor" else ""
+            if first_name in sent_at:
+                result.record(time.perf_counter() - sent_at[first_name], 200)
+                delivered[first_name] += 1
+                if len(result.latencies) >= clients * events:
+                    done.set()
+
+    sockets = []
+    try:
+        for _ in range(clients):
+            websocket = await websockets.connect(ws_url, max_queue=None)
+            await websocket.send(json.dumps({"type": "subscribe_blood_type", "blood_type": "AB-"}))
+            reply = json.loads(await websocket.recv())
+            if reply.get("type") != "subscribed":
+                raise RuntimeError(f"Could not subscribe: {reply}")
+            sockets.append(websocket)
+        listeners = [asyncio.create_task(listen(websocket)) for websocket in sockets]
+
+        rng = random.Random(f"{seed_value}:ws_fanout")
+        start = time.perf_counter()
+        for event in range(events):
+            donor = synthetic_donor(rng, f"{REGISTER_PHONE_PREFIX}{run_id}9{event:03d}", blood_type="AB-")
+            donor["first_name"] = f"Fanout {run_id} {event}"
+            sent_at[donor["first_name"]] = time.perf_counter()
+            response = await client.post("/api/v1/donors", json=donor)
+            if response.status_code >= 400:
+                result.errors += 1
+        try:
+            await asyncio.wait_for(done.wait(), timeout=30)
+        except asyncio.TimeoutError:
+            pass
+        result.elapsed = time.perf_counter() - start
+        for listener in listeners:
+            listener.cancel()
+    finally:
+        await asyncio.gather(*(websocket.close() for websocket in sockets), return_exceptions=True)
+
+    result.extra = {"clients": clients, "events": events, "delivered": len(result.latencies), "expected": clients * events}
+    return result
+
+
+# Reports
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+async def run(args) -> dict:
+    run_id = f"{int(time.time()) % 100000:05d}"
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(unknown)}")
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        stats = (await client.get("/api/v1/admin/stats")).json()
+        report = {
+            "generatedAt": datetime.now(timezone.utc).isoformat(),
+            "gitCommit": git_commit(),
+            "python": platform.python_version(),
+            "baseUrl": args.base_url,
+            "donors": stats.get("totalDonors"),
+            "seed": args.seed,
+            "concurrency": args.concurrency,
+            "requestsPerScenario": args.requests,
+            "scenarios": {}
+        }
+
+        requests = http_scenarios(client, run_id)
+        for name in scenarios:
+            print(f"🧪 {name}...")
+            if name == "ws_fanout":
+                result = await ws_fanout(client, args.base_url, args.ws_clients, args.ws_events, run_id, args.seed)
+            else:
+                # Warm up connections and caches so every run measures steady state
+                await drive(name, requests[name], args.concurrency, args.concurrency, args.seed + 1)
+                result = await drive(name, requests[name], args.concurrency, args.requests, args.seed)
+            report["scenarios"][name] = result.report()
+            summary = report["scenarios"][name]
+            print(f"   p50 {summary['latencyMs']['p50']} ms, p95 {summary['latencyMs']['p95']} ms, "
+                  f"p99 {summary['latencyMs']['p99']} ms, {summary['throughputRps']} req/s, {summary['errors']} errors")
+    return report
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[str]:
+    """Regressions of report against baseline beyond threshold (a fraction)"""
+    regressions = []
+    for name, current in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        p95, baseline_p95 = current["latencyMs"]["p95"], previous["latencyMs"]["p95"]
+        if baseline_p95 and p95 > baseline_p95 * (1 + threshold):
+            regressions.append(f"{name}: p95 {p95} ms vs {baseline_p95} ms baseline")
+        throughput, baseline_throughput = current["throughputRps"], previous["throughputRps"]
+        if baseline_throughput and throughput < baseline_throughput * (1 - threshold):
+            regressions.append(f"{name}: {throughput} req/s vs {baseline_throughput} req/s baseline")
+        if current["errorRate"] > previous["errorRate"] + 0.01:
+            regressions.append(f"{name}: error rate {current['errorRate']} vs {previous['errorRate']} baseline")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test and benchmark the backend API")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="write synthetic donors to DATABASE_URL")
+    seed_parser.add_argument("--donors", type=int, default=10000)
+    seed_parser.add_argument("--seed", type=int, default=42)
+
+    commands.add_parser("cleanup", help="delete seeded and load-test donors from DATABASE_URL")
+
+    run_parser = commands.add_parser("run", help="drive a running server and report latencies")
+    run_parser.add_argument("--base-url", default="http://localhost:8000")
+    run_parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    run_parser.add_argument("--concurrency", type=int, default=20)
+    run_parser.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+    run_parser.add_argument("--ws-clients", type=int, default=200)
+    run_parser.add_argument("--ws-events", type=int, default=20)
+    run_parser.add_argument("--timeout", type=float, default=30)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    run_parser.add_argument("--compare", help="baseline report to check for regressions")
+    run_parser.add_argument("--threshold", type=float, default=0.25,
+                            help="allowed p95/throughput regression as a fraction (default 0.25)")
+    args = parser.parse_args()
+
+    if args.command == "seed":
+        print(f"🌱 Seeding {args.donors} donors (seed {args.seed})...")
+        print(f"✅ {asyncio.run(seed(args.donors, args.seed))} donors written")
+        return
+
+    if args.command == "cleanup":
+        print(f"🧹 Deleted {asyncio.run(cleanup())} load-test donors")
+        return
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+            output.write("\n")
+        print(f"📄 Report written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(report, json.load(baseline_file), args.threshold)
+        if regressions:
+            print(f"❌ Regressions beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Prometheus metrics in the text exposition format, without a client library.
+
+Request handling only touches histograms and a gauge: a histogram
+observation is a bisect into the bucket bounds and three additions under
+the GIL, so instrumentation can stay on in production. Everything the app
+already counts elsewhere (WebSocket connections, rate-limit rejections, the
+search-log writer, the connection pool, ...) is read by collectors when
+/metrics is scraped instead of being updated twice.
+
+RequestMetricsMiddleware records, per route template rather than raw path:
+- http_request_duration_seconds: total time to the end of the response
+- http_request_db_duration_seconds: time spent in named SQL statements
+- http_request_handler_duration_seconds: the rest (handler code, serialization)
+- http_requests_in_progress
+It must run inside QueryTimingMiddleware, which collects the statement
+timings of the request in the query_timings context variable.
+"""
+
+import bisect
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; from a cached search to a slow admin listing
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+# Starlette appends "; charset=utf-8"
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# (sample name suffix, labels, value)
+Sample = Tuple[str, Dict[str, str], float]
+# (metric name, type, help, samples)
+Family = Tuple[str, str, str, Iterable[Sample]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Histogram:
+    metric_type = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket (+Inf last), sum, count]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, label_values: tuple, value: float):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self) -> Iterable[Sample]:
+        for label_values, (bucket_counts, total, count) in sorted(self._series.items()):
+            labels = dict(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                yield "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield "_sum", labels, total
+            yield "_count", labels, count
+
+    def families(self) -> Iterable[Family]:
+        yield self.name, self.metric_type, self.help, self.samples()
+
+
+class Gauge:
+    metric_type = "gauge"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+
+    def families(self) -> Iterable[Family]:
+        yield self.name, self.metric_type, self.help, [("", {}, self.value)]
+
+
+class StatsCollector:
+    """Counters and gauges read from a stats() dict once per scrape
+
+    fields are (metric name, "counter" or "gauge", help, stats key); a
+    dict-valued key becomes one sample per entry, labelled with label_name.
+    """
+
+    def __init__(self, stats: Callable[[], dict], fields: Sequence[Tuple[str, str, str, str]],
+                 label_name: Optional[str] = None):
+        self.stats = stats
+        self.fields = fields
+        self.label_name = label_name
+
+    def families(self) -> Iterable[Family]:
+        snapshot = self.stats()
+        for name, metric_type, help_text, key in self.fields:
+            value = snapshot.get(key)
+            if value is None:
+                continue
+            if isinstance(value, dict):
+                samples = [("", {self.label_name: label}, item) for label, item in sorted(value.items())]
+            else:
+                samples = [("", {}, value)]
+            yield name, metric_type, help_text, samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: List[object] = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.add(Histogram(name, help_text, label_names, buckets))
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self.add(Gauge(name, help_text))
+
+    def collect(self, stats: Callable[[], dict], fields: Sequence[Tuple[str, str, str, str]],
+                label_name: Optional[str] = None) -> StatsCollector:
+        return self.add(StatsCollector(stats, fields, label_name))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            try:
+                families = [(name, metric_type, help_text, list(samples))
+                            for name, metric_type, help_text, samples in metric.families()]
+            except Exception as e:
+                # One broken collector should not take the whole scrape down
+                print(f"⚠️  Warning: Could not collect metrics: {e}")
+                continue
+            for name, metric_type, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for suffix, labels, value in samples:
+                    lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+request_db_duration = registry.histogram(
+    "http_request_db_duration_seconds", "Time per HTTP request spent in SQL statements", ("method", "route")
+)
+request_handler_duration = registry.histogram(
+    "http_request_handler_duration_seconds", "Time per HTTP request spent outside SQL statements",
+    ("method", "route")
+)
+requests_in_progress = registry.gauge("http_requests_in_progress", "HTTP requests currently being handled")
+query_duration = registry.histogram(
+    "db_query_duration_seconds", "Latency of named SQL statements", ("query",), QUERY_BUCKETS
+)
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording latency histograms per route template"""
+
+    def __init__(self, app, query_timings: ContextVar):
+        self.app = app
+        self.query_timings = query_timings
+        # Route endpoint -> path template, so /api/v1/donors/{donor_id} is one series
+        self._route_paths: Dict[object, str] = {}
+
+    def route_path(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            for route in scope["app"].routes:
+                if getattr(route, "endpoint", None) is not None:
+                    self._route_paths[route.endpoint] = route.path
+            path = self._route_paths.setdefault(endpoint, "unmatched")
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status: List[Optional[int]] = [None]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        requests_in_progress.value += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            requests_in_progress.value -= 1
+            timings = self.query_timings.get()
+            db_seconds = sum(seconds for _, seconds in timings) if timings else 0.0
+            method, route = scope["method"], self.route_path(scope)
+            request_duration.observe((method, route, str(status[0] or 500)), elapsed)
+            request_db_duration.observe((method, route), db_seconds)
+            request_handler_duration.observe((method, route), max(elapsed - db_seconds, 0.0))
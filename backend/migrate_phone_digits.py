@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+One-off migration adding public.blood.phone_digits for the admin donor search.
+
+phone_digits is a stored generated column (the digits of phone_number), so
+adding it rewrites the whole table under an ACCESS EXCLUSIVE lock: reads
+and writes of public.blood wait until it finishes. Run it once, at a quiet
+time, then restart the app so it switches phone searches to the indexes.
+The indexes are built CONCURRENTLY and do not block writes.
+
+Usage: DATABASE_URL=... python migrate_phone_digits.py
+"""
+
+from sqlalchemy import text
+
+from database import engine
+
+# Give up instead of queueing every other query behind the table lock
+LOCK_TIMEOUT = "10s"
+
+def migrate_phone_digits():
+    print("🔧 Adding phone_digits to public.blood...")
+    with engine.connect() as conn:
+        conn.execute(text(f"SET lock_timeout = '{LOCK_TIMEOUT}'"))
+        conn.execute(text("""
+            ALTER TABLE public.blood ADD COLUMN IF NOT EXISTS phone_digits VARCHAR(20)
+            GENERATED ALWAYS AS (regexp_replace(phone_number, '[^0-9]', '', 'g')) STORED
+        """))
+        conn.commit()
+    print("✅ phone_digits column ready")
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_blood_phone_digits ON public.blood (phone_digits text_pattern_ops)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_blood_phone_digits_reversed "
+            "ON public.blood (reverse(phone_digits) text_pattern_ops)"
+        ))
+    print("✅ phone_digits indexes ready")
+
+if __name__ == "__main__":
+    migrate_phone_digits()
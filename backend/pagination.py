@@ -0,0 +1,102 @@
+"""
+Keyset pagination for donor listings.
+
+Pages are ordered newest first on (created_at, id). The cursor is the
+(created_at, id) of the last row on the previous page, so fetching the next
+page is an index range scan starting right after it instead of an OFFSET
+that re-reads every earlier row.
+
+Listings can also have Postgres build each page as one JSON array with
+json_agg (see KeysetQuery's json_object), returning the page text together
+with the next cursor so no per-row work is left in Python.
+"""
+
+import base64
+import uuid
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from queries import NamedQuery, register
+
+KEYSET_ORDER = "ORDER BY created_at DESC, id DESC"
+KEYSET_FILTER = "(created_at, id) < (:cursor_created_at, CAST(:cursor_id AS uuid))"
+
+# Wraps a LIMIT :limit page query (page size + 1 rows): the first :limit - 1 rows
+# as a JSON array, the cursor of the last of them and whether more rows follow
+JSON_PAGE_QUERY = """
+    SELECT
+        CAST(COALESCE(json_agg({json_object} ORDER BY n) FILTER (WHERE n < :limit), '[]') AS text) AS page,
+        max(created_at) FILTER (WHERE n = :limit - 1) AS cursor_created_at,
+        max(CAST(id AS text)) FILTER (WHERE n = :limit - 1) AS cursor_id,
+        count(*) = :limit AS has_more
+    FROM (
+        SELECT page.*, row_number() OVER ({order}) AS n
+        FROM ({page_query}) AS page
+    ) AS page
+"""
+
+
+def encode_cursor(created_at: datetime, donor_id) -> str:
+    raw = f"{created_at.isoformat()}|{donor_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, donor_id = raw.split("|", 1)
+        # Checked here so a tampered cursor is a 400, not a database error
+        return datetime.fromisoformat(created_at), str(uuid.UUID(donor_id))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def page_size(limit: Optional[int], default: int, maximum: int) -> int:
+    """Clamp a requested page size to 1..maximum"""
+    if limit is None:
+        return default
+    return max(1, min(limit, maximum))
+
+
+class KeysetQuery:
+    """A listing query ending in a WHERE clause, compiled once for every
+    combination of cursor filter and LIMIT.
+
+    json_object is an optional SQL expression building one row's JSON object
+    from the query's columns, for the json_agg page variants.
+    """
+
+    def __init__(self, name: str, query_text: str, json_object: Optional[str] = None):
+        self.variants: Dict[Tuple[bool, bool], NamedQuery] = {}
+        self.json_variants: Dict[bool, NamedQuery] = {}
+        for after_cursor in (False, True):
+            for limited in (False, True):
+                sql = query_text
+                if after_cursor:
+                    sql += f" AND {KEYSET_FILTER}"
+                sql += f" {KEYSET_ORDER}"
+                if limited:
+                    sql += " LIMIT :limit"
+                variant_name = name + ("_after_cursor" if after_cursor else "") + ("" if limited else "_all")
+                self.variants[(after_cursor, limited)] = register(variant_name, sql)
+                if limited and json_object:
+                    self.json_variants[after_cursor] = register(
+                        variant_name + "_json",
+                        JSON_PAGE_QUERY.format(json_object=json_object, order=KEYSET_ORDER, page_query=sql)
+                    )
+
+    def select(self, params: dict, cursor: Optional[str], limit: Optional[int]) -> NamedQuery:
+        """The statement for a page, adding the cursor and LIMIT to params;
+        raises ValueError for malformed cursors"""
+        if cursor:
+            params["cursor_created_at"], params["cursor_id"] = decode_cursor(cursor)
+        if limit is not None:
+            # One extra row tells us whether there is a next page
+            params["limit"] = limit + 1
+        return self.variants[(bool(cursor), limit is not None)]
+
+    def select_json(self, params: dict, cursor: Optional[str], limit: int) -> NamedQuery:
+        """Like select() for the json_agg variant of a page"""
+        self.select(params, cursor, limit)
+        return self.json_variants[bool(cursor)]
@@ -0,0 +1,131 @@
+"""
+Named SQL statements and per-query timing.
+
+Request handlers run module-level NamedQuery objects compiled once at import
+instead of building SQL text per request. Optional filters are expressed
+with parameters, and structural variants (a keyset cursor, a phone-number
+search term) are separate statements picked by the handler, so every
+handler sends a small, fixed set of statement texts. asyncpg prepares each
+text once per connection and reuses the server-side prepared statement (see
+DB_PREPARED_STATEMENT_CACHE_SIZE), so Postgres skips the parse and plan work
+on repeated calls.
+
+execute() times every statement by name. The totals are kept in query_stats,
+the latencies in the db_query_duration_seconds histogram (see metrics.py),
+and QueryTimingMiddleware collects the statements each request ran. On the
+paths it is configured for it reports them in a Server-Timing header, e.g.
+"get_donor;dur=0.84"; statement names describe the schema and search
+internals, so the header is off unless enabled. Each statement also carries
+its name as the query_name execution option, which a SlowQueryLog attached
+to the engine lists slow calls under (see slow_queries.py).
+"""
+
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from metrics import query_duration
+
+# (name, seconds) of the statements run by the current request
+request_queries: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_queries", default=None)
+
+
+class NamedQuery:
+    __slots__ = ("name", "statement")
+
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.statement = text(sql).execution_options(query_name=name)
+
+    @property
+    def text(self) -> str:
+        return self.statement.text
+
+
+# Every registered statement by name
+QUERIES: Dict[str, NamedQuery] = {}
+
+
+def register(name: str, sql: str) -> NamedQuery:
+    query = NamedQuery(name, sql)
+    QUERIES[name] = query
+    return query
+
+
+class QueryStats:
+    """Running count, total and maximum duration per statement name"""
+
+    def __init__(self):
+        self.totals: Dict[str, List[float]] = {}
+
+    def record(self, name: str, seconds: float):
+        total = self.totals.get(name)
+        if total is None:
+            self.totals[name] = [1, seconds, seconds]
+            return
+        total[0] += 1
+        total[1] += seconds
+        if seconds > total[2]:
+            total[2] = seconds
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "calls": int(calls),
+                "totalMs": round(total_seconds * 1000, 3),
+                "avgMs": round(total_seconds / calls * 1000, 3),
+                "maxMs": round(max_seconds * 1000, 3)
+            }
+            for name, (calls, total_seconds, max_seconds) in sorted(self.totals.items())
+        }
+
+
+query_stats = QueryStats()
+
+def record(query: NamedQuery, seconds: float):
+    query_stats.record(query.name, seconds)
+    query_duration.observe((query.name,), seconds)
+    timings = request_queries.get()
+    if timings is not None:
+        timings.append((query.name, seconds))
+
+
+async def execute(db, query: NamedQuery, params: Optional[dict] = None):
+    """db.execute() a named statement on a session or connection, timing it"""
+    start = time.perf_counter()
+    try:
+        return await db.execute(query.statement, params or {})
+    finally:
+        record(query, time.perf_counter() - start)
+
+
+class QueryTimingMiddleware:
+    """ASGI middleware collecting the statements each request ran into request_queries,
+    and adding them to the Server-Timing header of requests under header_paths"""
+
+    def __init__(self, app, header_paths: Tuple[str, ...] = ()):
+        self.app = app
+        # Path prefixes whose responses get the header, e.g. ("/api/v1/admin/",); empty for none
+        self.header_paths = tuple(header_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: List[Tuple[str, float]] = []
+        token = request_queries.set(timings)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and timings:
+                header = ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings)
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode())]
+            await send(message)
+
+        with_header = self.header_paths and scope["path"].startswith(self.header_paths)
+        try:
+            await self.app(scope, receive, send_with_timing if with_header else send)
+        finally:
+            request_queries.reset(token)
@@ -0,0 +1,166 @@
+"""
+Sliding-window-counter rate limiting with pluggable storage.
+
+Each key keeps only two counters: requests in the current fixed window and in
+the previous one. The previous window's count is weighted by how much of it
+still overlaps the sliding window, which approximates a true sliding log in
+constant time and memory per key.
+
+Backends:
+- MemoryRateLimitBackend: per-process, evicts idle keys
+- RedisRateLimitBackend:  shared by every worker and replica; works with any
+                          Redis-compatible asyncio client (redis.asyncio,
+                          fakeredis.aioredis for local tests)
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+PERIODS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+
+# Routes that check a limit (see main.py); limits for anything else would never apply
+ROUTES = ("search", "register")
+
+
+class RateLimit:
+    def __init__(self, requests: int, period: str):
+        if period not in PERIODS:
+            raise ValueError(f"Unknown rate limit period '{period}'")
+        self.requests = requests
+        self.period = period
+        self.period_seconds = PERIODS[period]
+
+    def __repr__(self) -> str:
+        return f"{self.requests}/{self.period}"
+
+
+def parse_rate_limits(spec: str) -> Dict[str, RateLimit]:
+    """Parse "search=5/hour,register=20/minute" into per-route limits"""
+    limits = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        route, limit = item.split("=", 1)
+        route = route.strip()
+        if route not in ROUTES:
+            raise ValueError(f"Unknown rate limit route '{route}' (expected one of {', '.join(ROUTES)})")
+        requests, period = limit.strip().split("/", 1)
+        limits[route] = RateLimit(int(requests), period.strip())
+    return limits
+
+
+def sliding_window_estimate(previous: int, current: int, limit: RateLimit, now: float) -> float:
+    """Requests in the sliding window ending at now"""
+    elapsed_fraction = (now % limit.period_seconds) / limit.period_seconds
+    return previous * (1 - elapsed_fraction) + current
+
+
+class MemoryRateLimitBackend:
+    """In-process counters; idle keys are evicted once their windows expire"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # key -> [window_index, current_count, previous_count, expires_at], least recently used first
+        self._counters: "OrderedDict[str, list]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def _evict(self, now: float):
+        while self._counters:
+            key, counter = next(iter(self._counters.items()))
+            if counter[3] > now and len(self._counters) <= self.max_keys:
+                break
+            del self._counters[key]
+
+    async def hit(self, key: str, limit: RateLimit, now: float) -> bool:
+        self._evict(now)
+        window_index = int(now // limit.period_seconds)
+        counter = self._counters.get(key)
+
+        if counter is None or counter[0] < window_index - 1:
+            counter = [window_index, 0, 0, 0.0]
+        elif counter[0] == window_index - 1:
+            counter = [window_index, 0, counter[1], 0.0]
+
+        # Keep the key until the current window stops affecting the estimate
+        counter[3] = (window_index + 2) * limit.period_seconds
+        self._counters[key] = counter
+        self._counters.move_to_end(key)
+
+        if sliding_window_estimate(counter[2], counter[1], limit, now) >= limit.requests:
+            return False
+        counter[1] += 1
+        return True
+
+
+class RedisRateLimitBackend:
+    """Counters shared through a Redis-compatible server, expired by Redis TTLs"""
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = "ratelimit:"):
+        import redis.asyncio as redis
+        return cls(redis.from_url(url), prefix=prefix)
+
+    async def hit(self, key: str, limit: RateLimit, now: float) -> bool:
+        window_index = int(now // limit.period_seconds)
+        current_key = f"{self.prefix}{key}:{window_index}"
+        previous_key = f"{self.prefix}{key}:{window_index - 1}"
+
+        # Count this request first so concurrent callers can't all slip under the limit
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.incr(current_key)
+            pipe.expire(current_key, 2 * limit.period_seconds)
+            pipe.get(previous_key)
+            current, _, previous = await pipe.execute()
+
+        estimate = sliding_window_estimate(int(previous or 0), int(current) - 1, limit, now)
+        if estimate >= limit.requests:
+            # Rejected requests don't count against the client
+            await self.client.decr(current_key)
+            return False
+        return True
+
+
+class RateLimiter:
+    def __init__(self, backend, limits: Dict[str, RateLimit]):
+        self.backend = backend
+        self.limits = limits
+        self.rejections: Dict[str, int] = {}
+
+    async def hit(self, route: str, client_id: str, now: Optional[float] = None) -> bool:
+        """Record a request; False if the client is over the route's limit"""
+        limit = self.limits.get(route)
+        if limit is None:
+            return True
+        if now is None:
+            now = time.time()
+        try:
+            allowed = await self.backend.hit(f"{route}:{client_id}", limit, now)
+        except Exception as e:
+            # Fail open: a rate limiter outage should not take search down
+            print(f"⚠️  Warning: Rate limiter unavailable: {e}")
+            return True
+        if not allowed:
+            self.rejections[route] = self.rejections.get(route, 0) + 1
+        return allowed
+
+
+def create_rate_limiter(backend: str, limits_spec: str, redis_url: Optional[str] = None) -> RateLimiter:
+    limits = parse_rate_limits(limits_spec)
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("RATE_LIMIT_BACKEND=redis requires REDIS_URL")
+        return RateLimiter(RedisRateLimitBackend.from_url(redis_url), limits)
+    return RateLimiter(MemoryRateLimitBackend(), limits)
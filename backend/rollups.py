@@ -0,0 +1,301 @@
+"""
+Materialized donor supply and search demand summaries for the admin dashboard.
+
+Donors and searches are counted per grid cell of cell_degrees (a cell is
+named by its south-west corner), so supply-vs-demand heatmaps read a few
+thousand summary rows instead of scanning public.blood and
+public.search_logs:
+
+- donor_supply_summary: materialized view of the current donors per cell,
+  city, blood type and availability, refreshed CONCURRENTLY so dashboard
+  reads never wait for a refresh
+- donor_supply_hourly / donor_supply_daily: the view as of the latest
+  refresh in each hour and day, for supply over time
+- search_rollup_hourly / search_rollup_daily: searches and misses
+  (results_count = 0) per blood type searched and cell. A refresh only
+  recomputes the hours since the newest rolled-up hour (one hour back, for
+  log rows written late) through the searched_at index, then the days
+  those hours fall in.
+
+Hourly rows older than hourly_retention_days are pruned; daily rows are
+kept. A refresh runs in one transaction under an advisory lock, so with
+several workers only one refreshes at a time and the others skip their
+turn. The grid is part of the view and table contents: after changing
+ROLLUP_CELL_DEGREES drop the view and tables so they are rebuilt.
+"""
+
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from queries import NamedQuery, execute, register
+
+# pg_try_advisory_xact_lock key held while a worker refreshes the rollups
+REFRESH_LOCK_KEY = 2502051
+
+GRAINS = ("hour", "day")
+
+
+def cell_expression(column: str, cell_degrees: float) -> str:
+    """SQL for the south-west corner of the grid cell of a latitude or longitude column"""
+    return f"CAST(floor({column} / {cell_degrees!r}) * {cell_degrees!r} AS numeric(7, 3))"
+
+
+class Rollups:
+    def __init__(self, cell_degrees: float = 0.1, hourly_retention_days: int = 14):
+        self.cell_degrees = cell_degrees
+        self.hourly_retention_days = hourly_retention_days
+        self.last_refresh: Optional[dict] = None
+
+        latitude_cell = cell_expression("latitude", cell_degrees)
+        longitude_cell = cell_expression("longitude", cell_degrees)
+        self.schema = [
+            # NULL city and availability are folded into '' and FALSE: the concurrent refresh
+            # matches rows on the unique index, which treats NULLs as distinct
+            f"""
+            CREATE MATERIALIZED VIEW IF NOT EXISTS public.donor_supply_summary AS
+                SELECT {latitude_cell} AS cell_lat, {longitude_cell} AS cell_lon,
+                       COALESCE(city, '') AS city, blood_type, COALESCE(is_available, FALSE) AS is_available,
+                       COUNT(*) AS donors
+                FROM public.blood
+                GROUP BY 1, 2, 3, 4, 5
+            WITH NO DATA
+            """,
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_donor_supply_summary_key
+                ON public.donor_supply_summary (cell_lat, cell_lon, city, blood_type, is_available)
+            """,
+            *(f"""
+            CREATE TABLE IF NOT EXISTS public.donor_supply_{table} (
+                bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+                cell_lat NUMERIC(7, 3) NOT NULL,
+                cell_lon NUMERIC(7, 3) NOT NULL,
+                city VARCHAR(100) NOT NULL,
+                blood_type VARCHAR(5) NOT NULL,
+                is_available BOOLEAN NOT NULL,
+                donors INTEGER NOT NULL,
+                PRIMARY KEY (bucket, cell_lat, cell_lon, city, blood_type, is_available)
+            )
+            """ for table in ("hourly", "daily")),
+            *(f"""
+            CREATE TABLE IF NOT EXISTS public.search_rollup_{table} (
+                bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+                blood_type VARCHAR(5) NOT NULL,
+                cell_lat NUMERIC(7, 3) NOT NULL,
+                cell_lon NUMERIC(7, 3) NOT NULL,
+                searches INTEGER NOT NULL,
+                misses INTEGER NOT NULL,
+                PRIMARY KEY (bucket, blood_type, cell_lat, cell_lon)
+            )
+            """ for table in ("hourly", "daily")),
+        ]
+
+        self.refresh_statements = {
+            "lock": text("SELECT pg_try_advisory_xact_lock(:key)"),
+            "populated": text("""
+                SELECT ispopulated FROM pg_matviews
+                WHERE schemaname = 'public' AND matviewname = 'donor_supply_summary'
+            """),
+            "refresh": text("REFRESH MATERIALIZED VIEW public.donor_supply_summary"),
+            "refresh_concurrently": text("REFRESH MATERIALIZED VIEW CONCURRENTLY public.donor_supply_summary"),
+            # Recompute from the newest rolled-up hour, or from the first search
+            "search_since": text("""
+                SELECT COALESCE(
+                    (SELECT MAX(bucket) - INTERVAL '1 hour' FROM public.search_rollup_hourly),
+                    (SELECT date_trunc('hour', MIN(searched_at)) FROM public.search_logs)
+                )
+            """),
+        }
+        for grain, table in (("hour", "hourly"), ("day", "daily")):
+            self.refresh_statements[f"snapshot_{grain}_delete"] = text(
+                f"DELETE FROM public.donor_supply_{table} WHERE bucket = date_trunc('{grain}', now())"
+            )
+            self.refresh_statements[f"snapshot_{grain}"] = text(f"""
+                INSERT INTO public.donor_supply_{table}
+                SELECT date_trunc('{grain}', now()), cell_lat, cell_lon, city, blood_type, is_available, donors
+                FROM public.donor_supply_summary
+            """)
+        self.refresh_statements.update({
+            "searches_hour_delete": text(
+                "DELETE FROM public.search_rollup_hourly WHERE bucket >= CAST(:since AS timestamptz)"
+            ),
+            "searches_hour": text(f"""
+                INSERT INTO public.search_rollup_hourly
+                SELECT date_trunc('hour', searched_at), blood_type, {latitude_cell}, {longitude_cell},
+                       COUNT(*), COUNT(*) FILTER (WHERE results_count = 0)
+                FROM public.search_logs
+                WHERE searched_at >= CAST(:since AS timestamptz)
+                GROUP BY 1, 2, 3, 4
+            """),
+            "searches_day_delete": text(
+                "DELETE FROM public.search_rollup_daily WHERE bucket >= date_trunc('day', CAST(:since AS timestamptz))"
+            ),
+            "searches_day": text("""
+                INSERT INTO public.search_rollup_daily
+                SELECT date_trunc('day', bucket), blood_type, cell_lat, cell_lon, SUM(searches), SUM(misses)
+                FROM public.search_rollup_hourly
+                WHERE bucket >= date_trunc('day', CAST(:since AS timestamptz))
+                GROUP BY 1, 2, 3, 4
+            """),
+            "prune_searches": text(
+                "DELETE FROM public.search_rollup_hourly WHERE bucket < now() - make_interval(days => :days)"
+            ),
+            "prune_supply": text(
+                "DELETE FROM public.donor_supply_hourly WHERE bucket < now() - make_interval(days => :days)"
+            ),
+        })
+
+        # Reads for the admin endpoints; unset filters are passed as NULL
+        filters = """
+            (CAST(:blood_type AS varchar) IS NULL OR blood_type = :blood_type)
+        """
+        time_filters = filters + """
+            AND (CAST(:date_from AS timestamptz) IS NULL OR bucket >= :date_from)
+            AND (CAST(:date_to AS timestamptz) IS NULL OR bucket <= :date_to)
+        """
+        self.donor_queries = {}
+        for grain, source in (("current", "donor_supply_summary"), ("hour", "donor_supply_hourly"),
+                              ("day", "donor_supply_daily")):
+            bucket = "" if grain == "current" else "bucket, "
+            where = filters if grain == "current" else time_filters
+            self.donor_queries[(grain, "cell")] = register(f"rollup_donors_{grain}_by_cell", f"""
+                SELECT {bucket}CAST(cell_lat AS float8), CAST(cell_lon AS float8), blood_type,
+                       SUM(donors) FILTER (WHERE is_available), SUM(donors) FILTER (WHERE NOT is_available)
+                FROM public.{source}
+                WHERE {where}
+                GROUP BY {bucket}cell_lat, cell_lon, blood_type
+                ORDER BY {bucket}cell_lat, cell_lon, blood_type
+            """)
+            self.donor_queries[(grain, "city")] = register(f"rollup_donors_{grain}_by_city", f"""
+                SELECT {bucket}NULLIF(city, ''), blood_type,
+                       SUM(donors) FILTER (WHERE is_available), SUM(donors) FILTER (WHERE NOT is_available)
+                FROM public.{source}
+                WHERE {where}
+                GROUP BY {bucket}city, blood_type
+                ORDER BY {bucket}city, blood_type
+            """)
+        self.search_queries = {
+            grain: register(f"rollup_searches_{grain}", f"""
+                SELECT bucket, blood_type, CAST(cell_lat AS float8), CAST(cell_lon AS float8), searches, misses
+                FROM public.search_rollup_{table}
+                WHERE {time_filters}
+                ORDER BY bucket, blood_type, cell_lat, cell_lon
+            """) for grain, table in (("hour", "hourly"), ("day", "daily"))
+        }
+        # Available donors against searches and misses per cell over the last days
+        self.supply_demand_query = register("rollup_supply_demand", """
+            WITH supply AS (
+                SELECT cell_lat, cell_lon, SUM(donors) AS available
+                FROM public.donor_supply_summary
+                WHERE is_available AND (CAST(:blood_type AS varchar) IS NULL OR blood_type = :blood_type)
+                GROUP BY cell_lat, cell_lon
+            ), demand AS (
+                SELECT cell_lat, cell_lon, SUM(searches) AS searches, SUM(misses) AS misses
+                FROM public.search_rollup_daily
+                WHERE bucket >= date_trunc('day', now()) - make_interval(days => :days)
+                  AND (CAST(:blood_type AS varchar) IS NULL OR blood_type = :blood_type)
+                GROUP BY cell_lat, cell_lon
+            )
+            SELECT CAST(COALESCE(supply.cell_lat, demand.cell_lat) AS float8),
+                   CAST(COALESCE(supply.cell_lon, demand.cell_lon) AS float8),
+                   COALESCE(supply.available, 0), COALESCE(demand.searches, 0), COALESCE(demand.misses, 0)
+            FROM supply FULL OUTER JOIN demand
+                ON supply.cell_lat = demand.cell_lat AND supply.cell_lon = demand.cell_lon
+            ORDER BY 4 DESC, 3 DESC
+        """)
+
+    def create_schema(self, conn):
+        """Create the view and tables (synchronous connection, like the rest of init_database)"""
+        for statement in self.schema:
+            conn.execute(text(statement))
+
+    async def refresh(self, conn) -> dict:
+        """Refresh every rollup in conn's transaction; skipped while another worker refreshes"""
+        start = time.perf_counter()
+        statements = self.refresh_statements
+        if not (await conn.execute(statements["lock"], {"key": REFRESH_LOCK_KEY})).scalar():
+            return {"refreshed": False, "reason": "another worker is refreshing"}
+
+        populated = (await conn.execute(statements["populated"])).scalar()
+        # CONCURRENTLY needs the view populated once; the first refresh blocks readers instead
+        await conn.execute(statements["refresh_concurrently" if populated else "refresh"])
+        for grain in GRAINS:
+            await conn.execute(statements[f"snapshot_{grain}_delete"])
+            await conn.execute(statements[f"snapshot_{grain}"])
+        supply_seconds = time.perf_counter() - start
+
+        since = (await conn.execute(statements["search_since"])).scalar()
+        search_hours = 0
+        if since is not None:
+            await conn.execute(statements["searches_hour_delete"], {"since": since})
+            search_hours = (await conn.execute(statements["searches_hour"], {"since": since})).rowcount
+            await conn.execute(statements["searches_day_delete"], {"since": since})
+            await conn.execute(statements["searches_day"], {"since": since})
+
+        retention = {"days": self.hourly_retention_days}
+        pruned = (await conn.execute(statements["prune_searches"], retention)).rowcount
+        pruned += (await conn.execute(statements["prune_supply"], retention)).rowcount
+
+        self.last_refresh = {
+            "refreshed": True,
+            "refreshedAt": datetime.now().astimezone(),
+            "supplyMs": round(supply_seconds * 1000, 3),
+            "totalMs": round((time.perf_counter() - start) * 1000, 3),
+            "searchesSince": since,
+            "searchRowsRolledUp": search_hours,
+            "hourlyRowsPruned": pruned
+        }
+        return self.last_refresh
+
+    async def donors(self, db, grain: str, group_by: str, blood_type: Optional[str],
+                     date_from: Optional[datetime], date_to: Optional[datetime]) -> List[dict]:
+        query: NamedQuery = self.donor_queries[(grain, group_by)]
+        params = {"blood_type": blood_type}
+        if grain != "current":
+            params.update(date_from=date_from, date_to=date_to)
+        rows = (await execute(db, query, params)).fetchall()
+        results = []
+        for row in rows:
+            bucket, row = (row[0], row[1:]) if grain != "current" else (None, row)
+            if group_by == "cell":
+                result = {**self.cell(row[0], row[1]), "blood_type": row[2]}
+            else:
+                result = {"city": row[0], "blood_type": row[1]}
+            result.update(available=int(row[-2] or 0), unavailable=int(row[-1] or 0))
+            if bucket is not None:
+                result = {"bucket": bucket, **result}
+            results.append(result)
+        return results
+
+    async def searches(self, db, grain: str, blood_type: Optional[str], date_from: Optional[datetime],
+                       date_to: Optional[datetime]) -> List[dict]:
+        rows = (await execute(db, self.search_queries[grain], {
+            "blood_type": blood_type, "date_from": date_from, "date_to": date_to
+        })).fetchall()
+        return [
+            {"bucket": row[0], "blood_type": row[1], **self.cell(row[2], row[3]), "searches": row[4], "misses": row[5]}
+            for row in rows
+        ]
+
+    async def supply_demand(self, db, blood_type: Optional[str], days: int) -> List[dict]:
+        rows = (await execute(db, self.supply_demand_query, {"blood_type": blood_type, "days": days})).fetchall()
+        return [
+            {
+                **self.cell(row[0], row[1]),
+                "availableDonors": int(row[2]),
+                "searches": int(row[3]),
+                "misses": int(row[4]),
+                "missRate": round(row[4] / row[3], 4) if row[3] else 0.0
+            } for row in rows
+        ]
+
+    def cell(self, cell_lat: float, cell_lon: float) -> dict:
+        """A cell's corner and centre, for plotting"""
+        return {
+            "cellLat": cell_lat,
+            "cellLon": cell_lon,
+            "latitude": round(cell_lat + self.cell_degrees / 2, 6),
+            "longitude": round(cell_lon + self.cell_degrees / 2, 6)
+        }
@@ -0,0 +1,53 @@
+"""
+Pydantic request and response models for the API.
+"""
+
+from typing import Optional
+
+from pydantic import BaseModel
+
+# Allowed values of public.blood.blood_type
+BLOOD_TYPES = ('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-')
+
+class DonorCreate(BaseModel):
+    first_name: str
+    phone_number: str
+    blood_type: str
+    latitude: float
+    longitude: float
+    address: Optional[str] = None
+    city: Optional[str] = None
+    country: str = "Kenya"
+    is_verified: bool = False
+    is_available: bool = True
+
+class DonorResponse(BaseModel):
+    id: str
+    first_name: str
+    phone_number: str
+    blood_type: str
+    latitude: float
+    longitude: float
+    address: Optional[str]
+    city: Optional[str]
+    country: str
+    is_verified: bool
+    is_available: bool
+    created_at: str
+
+class DonorSearchRequest(BaseModel):
+    blood_type: str
+    latitude: float
+    longitude: float
+    radius_km: float = 50
+    # Treat blood_type as the recipient's and return donors of every compatible type
+    compatible: bool = False
+
+class DonorSearchResponse(BaseModel):
+    id: str
+    first_name: str
+    phone_number: str
+    blood_type: str
+    city: Optional[str]
+    is_verified: bool
+    distance_km: float
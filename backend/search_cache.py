@@ -0,0 +1,200 @@
+"""
+Short-lived cache of donor search candidates.
+
+Searches are keyed on the blood type filter, the grid cell the searcher is
+in and the radius rounded up to a bucket. An entry holds the unmasked
+candidates (id, first_name, phone_number, blood_type, city, is_verified,
+latitude, longitude) of every available donor within the bucket radius of
+anywhere in the cell, so each request can recompute its own exact distances
+on top of it. Areas with more than max_candidates donors are remembered as
+too dense to cache and searched the normal way.
+
+Entries expire after ttl seconds and the least recently used ones are
+evicted beyond max_entries. They are also indexed per blood type on a
+lat/lon grid under every cell their candidate circle overlaps, so a donor
+write only drops the entries that could contain that donor. Writers also
+publish their invalidations on the event bus under SEARCH_CACHE_TOPIC so
+other workers drop the same entries.
+"""
+
+import heapq
+import math
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Set, Tuple, Union
+
+from geo import covering_cells, grid_cell, haversine_km
+
+# Event bus topic for invalidations: message is the blood type and location the
+# donor's position, or no location to clear the whole cache
+SEARCH_CACHE_TOPIC = "search_cache_invalidate"
+
+# Kilometres per degree of latitude
+KM_PER_DEGREE = 111.2
+
+CacheKey = Tuple[Hashable, Tuple[int, int], float]
+
+
+class CachedSearch:
+    __slots__ = ("key", "latitude", "longitude", "radius_km", "candidates", "expires_at", "cells", "stale",
+                 "__weakref__")
+
+    def __init__(self, key: CacheKey, latitude: float, longitude: float, radius_km: float):
+        self.key = key
+        # Centre of the searchers' cell and the radius the candidates cover
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius_km = radius_km
+        # None when the area had too many donors to cache
+        self.candidates: Optional[List[tuple]] = None
+        self.expires_at = 0.0
+        self.cells: List[Tuple[int, int]] = []
+        # Set when a donor write hits the area while the candidates are being fetched
+        self.stale = False
+
+
+class SearchResultCache:
+    def __init__(self, ttl: float = 60, max_entries: int = 1000, cell_degrees: float = 0.05,
+                 radius_bucket_km: float = 10, max_candidates: int = 2000, index_cell_degrees: float = 0.5):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cell_degrees = cell_degrees
+        self.radius_bucket_km = radius_bucket_km
+        self.max_candidates = max_candidates
+        self.index_cell_degrees = index_cell_degrees
+        self._entries: "OrderedDict[CacheKey, CachedSearch]" = OrderedDict()
+        # blood type (None for ANY searches) -> grid cell -> keys of entries overlapping it
+        self._index: Dict[Optional[str], Dict[Tuple[int, int], Set[CacheKey]]] = {}
+        # Entries missed by get() whose candidates are still being fetched
+        self._filling: "weakref.WeakSet[CachedSearch]" = weakref.WeakSet()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.too_dense = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def entry(self, blood_type: Union[str, Tuple[str, ...], None], latitude: float, longitude: float,
+              radius_km: float) -> CachedSearch:
+        """The (possibly not yet filled) cache entry covering a search"""
+        cell = grid_cell(latitude, longitude, self.cell_degrees)
+        bucket = math.ceil(radius_km / self.radius_bucket_km) * self.radius_bucket_km
+        key = (blood_type, cell, bucket)
+        # A searcher anywhere in the cell is at most half its diagonal from the centre
+        center_lat = (cell[0] + 0.5) * self.cell_degrees
+        center_lon = (cell[1] + 0.5) * self.cell_degrees
+        half_diagonal_km = self.cell_degrees * KM_PER_DEGREE * math.sqrt(2) / 2
+        return CachedSearch(key, center_lat, center_lon, bucket + half_diagonal_km)
+
+    def get(self, entry: CachedSearch) -> Optional[CachedSearch]:
+        """The live cached entry for a search, or None on a miss"""
+        cached = self._entries.get(entry.key)
+        if cached is not None and cached.expires_at <= time.monotonic():
+            self._remove(cached)
+            self.expired += 1
+            cached = None
+        if cached is None:
+            self.misses += 1
+            self._filling.add(entry)
+            return None
+        self._entries.move_to_end(entry.key)
+        self.hits += 1
+        return cached
+
+    def put(self, entry: CachedSearch, candidates: List[tuple]):
+        """Store the candidates fetched for an entry (at most max_candidates + 1 of them)"""
+        self._filling.discard(entry)
+        if entry.stale:
+            # Fetched before a write that may have changed them; the next search refetches
+            return
+        if len(candidates) > self.max_candidates:
+            self.too_dense += 1
+            entry.candidates = None
+        else:
+            entry.candidates = candidates
+        old = self._entries.get(entry.key)
+        if old is not None:
+            self._remove(old)
+        entry.expires_at = time.monotonic() + self.ttl
+        entry.cells = covering_cells(entry.latitude, entry.longitude, entry.radius_km, self.index_cell_degrees)
+        self._entries[entry.key] = entry
+        for blood_type in self._blood_types(entry):
+            grid = self._index.setdefault(blood_type, {})
+            for cell in entry.cells:
+                grid.setdefault(cell, set()).add(entry.key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries.values())))
+            self.evictions += 1
+
+    def invalidate(self, blood_type: str, latitude: float, longitude: float):
+        """Drop entries that could include a donor of blood_type at this location"""
+        cell = grid_cell(latitude, longitude, self.index_cell_degrees)
+        for indexed_type in (blood_type, None):
+            for key in list(self._index.get(indexed_type, {}).get(cell, ())):
+                entry = self._entries.get(key)
+                if entry is not None and self._covers(entry, latitude, longitude):
+                    self._remove(entry)
+                    self.invalidations += 1
+        for entry in list(self._filling):
+            blood_types = self._blood_types(entry)
+            if (blood_type in blood_types or None in blood_types) and self._covers(entry, latitude, longitude):
+                entry.stale = True
+
+    def clear(self):
+        self._entries.clear()
+        self._index.clear()
+        for entry in list(self._filling):
+            entry.stale = True
+
+    def _remove(self, entry: CachedSearch):
+        self._entries.pop(entry.key, None)
+        for blood_type in self._blood_types(entry):
+            grid = self._index.get(blood_type, {})
+            for cell in entry.cells:
+                keys = grid.get(cell)
+                if keys is not None:
+                    keys.discard(entry.key)
+                    if not keys:
+                        del grid[cell]
+            if not grid:
+                self._index.pop(blood_type, None)
+
+    @staticmethod
+    def _covers(entry: CachedSearch, latitude: float, longitude: float) -> bool:
+        return haversine_km(entry.latitude, entry.longitude, latitude, longitude) <= entry.radius_km
+
+    @staticmethod
+    def _blood_types(entry: CachedSearch) -> Tuple[Optional[str], ...]:
+        blood_type = entry.key[0]
+        return (blood_type,) if blood_type is None or isinstance(blood_type, str) else blood_type
+
+    @staticmethod
+    def nearest(candidates: List[tuple], latitude: float, longitude: float, radius_km: float,
+                limit: int) -> List[tuple]:
+        """Search rows (id, first_name, phone_number, blood_type, city, is_verified, distance_km)
+        for the closest candidates within radius_km of the exact search point"""
+        matches = []
+        for candidate in candidates:
+            distance = haversine_km(latitude, longitude, candidate[6], candidate[7])
+            if distance <= radius_km:
+                matches.append((*candidate[:6], distance))
+        return heapq.nsmallest(limit, matches, key=lambda match: match[6])
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "tooDense": self.too_dense,
+            "ttlSeconds": self.ttl
+        }
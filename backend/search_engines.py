@@ -0,0 +1,286 @@
+"""
+Pluggable SQL engines for donor search.
+
+Every engine returns rows of (id, first_name, phone_number, blood_type, city,
+is_verified, distance_km) for available donors within radius_km, nearest
+first, so search_donors can build DonorSearchResponse objects the same way
+whichever engine is active.
+
+- haversine:     bounding-box prefilter on the lat/lon B-tree indexes plus the
+                 exact Haversine distance (works everywhere)
+- earthdistance: cube/earthdistance GiST index on ll_to_earth(lat, lon)
+- postgis:       geography GiST index with KNN (<->) ordering
+"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple, Union
+
+from sqlalchemy import text
+
+from geo import bounding_box
+from queries import execute, register
+
+SEARCH_COLUMNS = """
+    b.id,
+    b.first_name,
+    b.phone_number,
+    b.blood_type,
+    b.city,
+    b.is_verified
+"""
+
+# Bounding-box prefilter on donors aliased b, with the parameters from bounding_box_params().
+# The second longitude range is where a box crossing the antimeridian continues.
+BOUNDING_BOX_FILTER = """
+    b.latitude BETWEEN :min_lat AND :max_lat
+    AND (b.longitude BETWEEN :min_lon AND :max_lon OR b.longitude BETWEEN :wrap_min_lon AND :wrap_max_lon)
+"""
+
+
+def bounding_box_params(latitude: float, longitude: float, radius_km: float) -> dict:
+    """Parameters for BOUNDING_BOX_FILTER; the wrapped range repeats the first when there is none"""
+    min_lat, max_lat, lon_ranges = bounding_box(latitude, longitude, radius_km)
+    (min_lon, max_lon), (wrap_min_lon, wrap_max_lon) = lon_ranges[0], lon_ranges[-1]
+    return {
+        "min_lat": min_lat,
+        "max_lat": max_lat,
+        "min_lon": min_lon,
+        "max_lon": max_lon,
+        "wrap_min_lon": wrap_min_lon,
+        "wrap_max_lon": wrap_max_lon
+    }
+
+# Haversine formula for distance calculation in PostgreSQL.
+# LEAST() guards acos() against rounding just above 1 for identical points.
+DISTANCE_FORMULA = """
+    6371 * acos(LEAST(1,
+        cos(radians(:latitude)) * cos(radians(b.latitude)) *
+        cos(radians(b.longitude) - radians(:longitude)) +
+        sin(radians(:latitude)) * sin(radians(b.latitude))
+    ))
+"""
+
+
+class SearchEngine(ABC):
+    name = ""
+    # Extensions that must be installed for this engine
+    extensions = ()
+
+    def __init__(self, extension_schemas: Optional[Dict[str, str]] = None):
+        # Schemas the extensions live in, used to qualify their functions
+        self.extension_schemas = extension_schemas or {}
+        self.any_query = register(f"search_{self.name}_any", self.build_query(""))
+        self.blood_type_query = register(f"search_{self.name}_blood_type", self.build_query("AND b.blood_type = :blood_type"))
+        # Several blood types at once (compatibility search)
+        self.blood_types_query = register(
+            f"search_{self.name}_blood_types",
+            self.build_query("AND b.blood_type = ANY(CAST(:blood_types AS varchar[]))")
+        )
+
+    @abstractmethod
+    def build_query(self, blood_type_filter: str) -> str:
+        """Search SQL with blood_type_filter (an extra AND condition, or "") applied"""
+
+    def schema(self, extension: str) -> str:
+        return self.extension_schemas.get(extension, "public")
+
+    def create_indexes(self, conn):
+        """Create the indexes this engine relies on"""
+
+    def query_params(self, latitude: float, longitude: float, radius_km: float) -> dict:
+        return {"latitude": latitude, "longitude": longitude, "radius_km": radius_km}
+
+    async def search(self, db, blood_type: Union[str, Tuple[str, ...], None], latitude: float, longitude: float,
+                     radius_km: float, limit: int):
+        """Nearest available donors within radius_km; blood_type None matches every type
+        and a tuple matches any of the listed types"""
+        params = self.query_params(latitude, longitude, radius_km)
+        params["limit"] = limit
+        if blood_type is None:
+            return await execute(db, self.any_query, params)
+        if not isinstance(blood_type, str):
+            params["blood_types"] = list(blood_type)
+            return await execute(db, self.blood_types_query, params)
+        params["blood_type"] = blood_type
+        return await execute(db, self.blood_type_query, params)
+
+
+class HaversineSearchEngine(SearchEngine):
+    name = "haversine"
+
+    def build_query(self, blood_type_filter: str) -> str:
+        # The lat/lon bounding box lets idx_blood_location (latitude, longitude)
+        # cut the table down before the exact distance is computed on the survivors.
+        return f"""
+            SELECT id, first_name, phone_number, blood_type, city, is_verified, distance_km
+            FROM (
+                SELECT
+                    {SEARCH_COLUMNS},
+                    {DISTANCE_FORMULA} AS distance_km
+                FROM
+                    public.blood AS b
+                WHERE
+                    b.is_available = TRUE
+                    AND {BOUNDING_BOX_FILTER}
+                    {blood_type_filter}
+            ) AS candidates
+            WHERE
+                distance_km <= :radius_km
+            ORDER BY
+                distance_km
+            LIMIT :limit
+        """
+
+    def query_params(self, latitude: float, longitude: float, radius_km: float) -> dict:
+        params = super().query_params(latitude, longitude, radius_km)
+        params.update(bounding_box_params(latitude, longitude, radius_km))
+        return params
+
+
+class EarthdistanceSearchEngine(SearchEngine):
+    """Uses earthdistance's own Earth radius, so distances differ from Haversine by ~0.1%"""
+    name = "earthdistance"
+    extensions = ("cube", "earthdistance")
+
+    def earth_point(self, latitude: str, longitude: str) -> str:
+        return f"{self.schema('earthdistance')}.ll_to_earth(CAST({latitude} AS float8), CAST({longitude} AS float8))"
+
+    def build_query(self, blood_type_filter: str) -> str:
+        earthdistance = self.schema("earthdistance")
+        cube = self.schema("cube")
+        donor_point = self.earth_point("b.latitude", "b.longitude")
+        search_point = self.earth_point(":latitude", ":longitude")
+        return f"""
+            SELECT
+                {SEARCH_COLUMNS},
+                {earthdistance}.earth_distance({search_point}, {donor_point}) / 1000 AS distance_km
+            FROM
+                public.blood AS b
+            WHERE
+                b.is_available = TRUE
+                AND {earthdistance}.earth_box({search_point}, :radius_m) OPERATOR({cube}.@>) {donor_point}
+                AND {earthdistance}.earth_distance({search_point}, {donor_point}) <= :radius_m
+                {blood_type_filter}
+            ORDER BY
+                distance_km
+            LIMIT :limit
+        """
+
+    def create_indexes(self, conn):
+        conn.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS idx_blood_earth ON public.blood
+            USING GIST ({self.earth_point("latitude", "longitude")})
+            WHERE is_available = TRUE
+        """))
+
+    def query_params(self, latitude: float, longitude: float, radius_km: float) -> dict:
+        params = super().query_params(latitude, longitude, radius_km)
+        params["radius_m"] = radius_km * 1000
+        return params
+
+
+class PostgisSearchEngine(SearchEngine):
+    """Geography KNN search; distances are measured on the WGS84 spheroid"""
+    name = "postgis"
+    extensions = ("postgis",)
+
+    def geography(self, latitude: str, longitude: str) -> str:
+        schema = self.schema("postgis")
+        return (
+            f"{schema}.ST_SetSRID({schema}.ST_MakePoint(CAST({longitude} AS float8), CAST({latitude} AS float8)), 4326)"
+            f"::{schema}.geography"
+        )
+
+    def build_query(self, blood_type_filter: str) -> str:
+        postgis = self.schema("postgis")
+        donor_point = self.geography("b.latitude", "b.longitude")
+        search_point = self.geography(":latitude", ":longitude")
+        # ORDER BY <-> walks the GiST index nearest-first instead of sorting
+        return f"""
+            SELECT
+                {SEARCH_COLUMNS},
+                {postgis}.ST_Distance({donor_point}, {search_point}) / 1000 AS distance_km
+            FROM
+                public.blood AS b
+            WHERE
+                b.is_available = TRUE
+                AND {postgis}.ST_DWithin({donor_point}, {search_point}, :radius_m)
+                {blood_type_filter}
+            ORDER BY
+                {donor_point} OPERATOR({postgis}.<->) {search_point}
+            LIMIT :limit
+        """
+
+    def create_indexes(self, conn):
+        conn.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS idx_blood_geography ON public.blood
+            USING GIST (({self.geography("latitude", "longitude")}))
+            WHERE is_available = TRUE
+        """))
+
+    def query_params(self, latitude: float, longitude: float, radius_km: float) -> dict:
+        params = super().query_params(latitude, longitude, radius_km)
+        params["radius_m"] = radius_km * 1000
+        return params
+
+
+SEARCH_ENGINES = {
+    engine.name: engine
+    for engine in (PostgisSearchEngine, EarthdistanceSearchEngine, HaversineSearchEngine)
+}
+
+# Preference order when SEARCH_ENGINE is "auto"
+AUTO_ENGINE_ORDER = ("postgis", "earthdistance", "haversine")
+
+
+def installed_extensions(conn) -> dict:
+    """Installed extensions mapped to the schema they live in"""
+    rows = conn.execute(text("""
+        SELECT e.extname, n.nspname
+        FROM pg_extension AS e
+        JOIN pg_namespace AS n ON n.oid = e.extnamespace
+    """)).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def select_search_engine(conn, configured: str = "auto") -> SearchEngine:
+    """Pick the search engine for this database and make sure its indexes exist.
+
+    "auto" uses the best engine whose extensions are already installed. An
+    explicitly configured engine tries to install its extensions and falls
+    back to Haversine if that is not possible.
+    """
+    configured = configured.lower()
+    if configured != "auto" and configured not in SEARCH_ENGINES:
+        print(f"⚠️  Unknown SEARCH_ENGINE '{configured}', using auto-detection")
+        configured = "auto"
+
+    if configured != "auto":
+        for extension in SEARCH_ENGINES[configured].extensions:
+            try:
+                conn.execute(text(f'CREATE EXTENSION IF NOT EXISTS "{extension}"'))
+                conn.commit()
+            except Exception as e:
+                print(f"⚠️  Could not create extension {extension}: {e}")
+                conn.rollback()
+
+    extensions = installed_extensions(conn)
+    candidates = AUTO_ENGINE_ORDER if configured == "auto" else (configured, "haversine")
+
+    for name in candidates:
+        engine_class = SEARCH_ENGINES[name]
+        if not all(extension in extensions for extension in engine_class.extensions):
+            if configured == name:
+                print(f"⚠️  Search engine '{name}' needs {', '.join(engine_class.extensions)}, falling back")
+            continue
+        search_engine = engine_class({extension: extensions[extension] for extension in engine_class.extensions})
+        try:
+            search_engine.create_indexes(conn)
+            conn.commit()
+        except Exception as e:
+            print(f"⚠️  Could not create indexes for search engine '{name}': {e}")
+            conn.rollback()
+            continue
+        return search_engine
+
+    return HaversineSearchEngine()
@@ -0,0 +1,232 @@
+"""
+Background writer for public.search_logs.
+
+search_donors only puts a row on a bounded in-memory queue. A worker task
+drains the queue and inserts rows in batches, once a batch is full or the
+flush interval has passed, so search responses never wait on log writes.
+When the queue is full new rows are dropped and counted instead of slowing
+searches down.
+
+blood_type and client_ip come from the client, so they are cut to their
+column widths when queued. If a batch is still rejected for its data, its
+rows are retried one at a time so a single bad row does not cost the rest of
+the batch. Any other failure (usually the database being unreachable) is
+retried for the whole batch with exponential backoff, then the batch is
+dropped and counted.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DataError, IntegrityError
+
+from metrics import registry
+
+# Widths of the client-supplied VARCHAR columns of public.search_logs
+BLOOD_TYPE_LENGTH = 5
+CLIENT_IP_LENGTH = 45
+
+# SQLSTATE classes of rows Postgres rejected: data exceptions and integrity constraint violations
+DATA_ERROR_SQLSTATE_CLASSES = ("22", "23")
+
+# Seconds between a search and its log row being committed, observed for the oldest row of each batch
+write_lag = registry.histogram(
+    "search_log_write_lag_seconds", "Delay between a search and its search_logs row being committed", (),
+    (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+
+# One multi-row INSERT per batch: every column is sent as an array and unnested
+INSERT_SEARCH_LOGS = text("""
+    INSERT INTO public.search_logs (
+        blood_type, latitude, longitude, radius_km, results_count, client_ip, searched_at
+    )
+    SELECT * FROM unnest(
+        CAST(:blood_types AS varchar[]),
+        CAST(:latitudes AS numeric[]),
+        CAST(:longitudes AS numeric[]),
+        CAST(:radii AS numeric[]),
+        CAST(:results_counts AS integer[]),
+        CAST(:client_ips AS varchar[]),
+        CAST(:searched_ats AS timestamptz[])
+    )
+""")
+
+
+def is_data_error(error: Exception) -> bool:
+    """Whether the database rejected the rows themselves, as opposed to not being reachable"""
+    if isinstance(error, (DataError, IntegrityError)):
+        return True
+    # The asyncpg dialect raises a plain DBAPIError; its driver error carries the SQLSTATE
+    orig = getattr(error, "orig", None)
+    sqlstate = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+    return isinstance(sqlstate, str) and sqlstate[:2] in DATA_ERROR_SQLSTATE_CLASSES
+
+
+class SearchLogWriter:
+    def __init__(self, engine, max_queue_size: int = 10000, batch_size: int = 500, flush_interval: float = 1.0,
+                 on_written: Optional[Callable[[int], None]] = None, max_retries: int = 3,
+                 retry_interval: float = 1.0):
+        self.engine = engine
+        # Attempts after the first for a batch that failed for a reason other than its data,
+        # waiting retry_interval, then twice as long each time
+        self.max_retries = max_retries
+        self.retry_interval = retry_interval
+        # Called with the row count after every batch that was written
+        self.on_written = on_written
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        # Batch taken off the queue but not written yet
+        self._pending: List[tuple] = []
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        # Seconds between a search and its log row being committed
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+
+    def enqueue(self, blood_type: str, latitude: float, longitude: float, radius_km: float,
+                results_count: int, client_ip: Optional[str]) -> bool:
+        """Queue a search log row without waiting; False if it was dropped"""
+        row = (
+            blood_type[:BLOOD_TYPE_LENGTH] if blood_type else blood_type, latitude, longitude, radius_km,
+            results_count, client_ip[:CLIENT_IP_LENGTH] if client_ip else client_ip,
+            datetime.now(timezone.utc), time.monotonic()
+        )
+        try:
+            self.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def start(self):
+        if self._task is None:
+            # A queue binds to the event loop it first waits on, so start each loop with a fresh one
+            queue = asyncio.Queue(maxsize=self.max_queue_size)
+            while not self.queue.empty():
+                queue.put_nowait(self.queue.get_nowait())
+            self.queue = queue
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the worker and flush everything still queued (without retrying failed batches)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        batch = self._pending
+        self._pending = []
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+            if len(batch) >= self.batch_size:
+                await self._write(batch, retries=0)
+                batch = []
+        if batch:
+            await self._write(batch, retries=0)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._pending = [await self.queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(self._pending) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self._pending.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._write(self._pending)
+            self._pending = []
+
+    async def _insert(self, batch: List[tuple]):
+        columns = list(zip(*batch))
+        async with self.engine.begin() as conn:
+            await conn.execute(INSERT_SEARCH_LOGS, {
+                "blood_types": list(columns[0]),
+                "latitudes": list(columns[1]),
+                "longitudes": list(columns[2]),
+                "radii": list(columns[3]),
+                "results_counts": list(columns[4]),
+                "client_ips": list(columns[5]),
+                "searched_ats": list(columns[6])
+            })
+
+    async def _write(self, batch: List[tuple], retries: Optional[int] = None):
+        retries = self.max_retries if retries is None else retries
+        for attempt in range(retries + 1):
+            try:
+                await self._insert(batch)
+                break
+            except Exception as e:
+                if is_data_error(e):
+                    if len(batch) == 1:
+                        # Dropped rather than retried: search logs are not worth stalling the queue for
+                        self.failed += 1
+                        print(f"Warning: Failed to write a search log: {e}")
+                        return
+                    print(f"Warning: Failed to write {len(batch)} search logs, retrying them one by one: {e}")
+                    batch = await self._insert_rows(batch)
+                    if not batch:
+                        return
+                    break
+                if attempt == retries:
+                    self.failed += len(batch)
+                    print(f"Warning: Dropped {len(batch)} search logs after {attempt + 1} attempts: {e}")
+                    return
+                delay = self.retry_interval * 2 ** attempt
+                print(f"Warning: Failed to write {len(batch)} search logs, retrying in {delay:g}s: {e}")
+                await asyncio.sleep(delay)
+
+        self.written += len(batch)
+        self.batches += 1
+        self.last_lag_seconds = time.monotonic() - min(row[7] for row in batch)
+        self.max_lag_seconds = max(self.max_lag_seconds, self.last_lag_seconds)
+        write_lag.observe((), self.last_lag_seconds)
+        if self.on_written is not None:
+            self.on_written(len(batch))
+
+    async def _insert_rows(self, batch: List[tuple]) -> List[tuple]:
+        """Insert rows one at a time, skipping bad ones; returns the rows written"""
+        written = []
+        for index, row in enumerate(batch):
+            try:
+                await self._insert([row])
+                written.append(row)
+            except Exception as e:
+                if is_data_error(e):
+                    self.failed += 1
+                    print(f"Warning: Failed to write a search log: {e}")
+                    continue
+                # Not this row's fault: give up on the rest instead of failing them one by one
+                self.failed += len(batch) - index
+                print(f"Warning: Dropped {len(batch) - index} search logs: {e}")
+                break
+        return written
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "lastLagMs": round(self.last_lag_seconds * 1000, 3),
+            "maxLagMs": round(self.max_lag_seconds * 1000, 3)
+        }
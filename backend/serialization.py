@@ -0,0 +1,49 @@
+"""
+Fast JSON serialization for API responses.
+
+orjson writes UUIDs and timezone-aware datetimes natively (same text as
+str() and isoformat()), so rows can be mapped straight to dicts without
+per-field conversions. List endpoints return those dicts in a
+FastJSONResponse themselves, which skips building Pydantic models and
+FastAPI's response_model validation; the models stay on the routes for the
+OpenAPI docs. Without orjson installed the standard json module is used with
+the same conversions.
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """A body that is already JSON text, e.g. built by Postgres with json_agg"""
+    media_type = "application/json"
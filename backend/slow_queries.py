@@ -0,0 +1,191 @@
+"""
+Opt-in capture of slow SQL statements with sampled EXPLAIN plans.
+
+A SlowQueryLog attached to an engine times every statement sent through it
+(before_cursor_execute / after_cursor_execute), whether it came from
+queries.execute(), a plain db.execute(text(...)) or the ORM, and keeps
+those slower than the threshold. The newest entries are kept in a ring
+buffer with the statement name, duration and bound parameters. Named
+statements (see queries.py) carry their name as the query_name execution
+option; anything else is named after the start of its SQL. Phone
+numbers are redacted: any parameter named like one, and any value or plan
+literal made only of digits and phone punctuation.
+
+A sample of the slow text() statements is explained again in a background
+task on its own connection, so the slow request itself does not wait for it.
+Read-only statements get EXPLAIN (ANALYZE, BUFFERS), which runs them a
+second time; writes only get EXPLAIN. The explain transaction is always
+rolled back and has a statement timeout. At most one EXPLAIN runs at a time,
+so a database that is already struggling sees at most one extra query.
+The plan is for committed data and a freshly planned statement, which can
+differ from the generic plan a prepared statement was using.
+"""
+
+import asyncio
+import random
+import re
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import event, text
+from sqlalchemy.sql.elements import TextClause
+
+REDACTED = "[redacted]"
+
+# Execution option set to False on statements the log must not capture (its own EXPLAINs)
+CAPTURE_OPTION = "slow_query_log"
+# Length of the SQL prefix unnamed statements are listed under
+UNNAMED_LENGTH = 60
+
+# Only digits and what people type around phone numbers (plus LIKE wildcards), with 4+ digits
+PHONE_LIKE = re.compile(r"^[\s+\-()%.]*(?:\d[\s\-()%.]*){4,}$")
+QUOTED_LITERAL = re.compile(r"'((?:[^']|'')*)'")
+WRITE_STATEMENT = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        UUID(value)
+        return True
+    except ValueError:
+        return False
+
+
+def redact_value(name: str, value):
+    if isinstance(value, (list, tuple)):
+        return [redact_value(name, item) for item in value]
+    if value is None:
+        return None
+    if "phone" in name.lower():
+        return REDACTED
+    if isinstance(value, str) and PHONE_LIKE.match(value) and not _is_uuid(value):
+        return REDACTED
+    return value
+
+
+def redact_params(params: Optional[dict]) -> Dict[str, object]:
+    return {name: redact_value(name, value) for name, value in (params or {}).items()}
+
+
+def redact_plan_line(line: str) -> str:
+    return QUOTED_LITERAL.sub(
+        lambda match: f"'{REDACTED}'" if PHONE_LIKE.match(match.group(1)) else match.group(0), line
+    )
+
+
+def statement_name(sql: str) -> str:
+    """Name for a statement that was not registered in queries.py: the start of its SQL"""
+    return "sql: " + " ".join(sql.split())[:UNNAMED_LENGTH]
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms: float = 200, sample_rate: float = 0.1, max_entries: int = 100,
+                 explain_timeout_ms: int = 10000, engine=None):
+        self.threshold_seconds = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.explain_timeout_ms = explain_timeout_ms
+        # Async engine the EXPLAINs run on; without one nothing is explained
+        self.engine = engine
+        self.entries: deque = deque(maxlen=max_entries)
+        self._explaining: Optional[asyncio.Task] = None
+
+        self.captured = 0
+        self.explained = 0
+        # Sampled while another EXPLAIN was still running
+        self.explain_skipped = 0
+        self.explain_failures = 0
+
+    def attach(self, engine):
+        """Capture slow statements run on a sync Engine (for an AsyncEngine pass its sync_engine)"""
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.slow_query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "slow_query_started", None)
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        if seconds < self.threshold_seconds or context.execution_options.get(CAPTURE_OPTION) is False:
+            return
+        compiled = context.compiled
+        if compiled is not None and isinstance(compiled.statement, TextClause):
+            # The statement as written, with the parameters it was called with, can be explained again
+            sql = compiled.statement.text
+            params = context.compiled_parameters[0] if context.compiled_parameters else {}
+            explain_sql = sql
+        else:
+            sql = statement
+            params = parameters if isinstance(parameters, dict) else {
+                f"${position}": value for position, value in enumerate(parameters or (), 1)
+            }
+            explain_sql = None
+        name = context.execution_options.get("query_name") or statement_name(sql)
+        self.observe(name, explain_sql, params, seconds)
+
+    def observe(self, name: str, sql: Optional[str], params: Optional[dict], seconds: float):
+        """Record a statement's call if it was slow, maybe sampling its plan (when sql is given)"""
+        if seconds < self.threshold_seconds:
+            return
+        entry = {
+            "query": name,
+            "durationMs": round(seconds * 1000, 3),
+            "at": datetime.now(timezone.utc),
+            "params": redact_params(params),
+            "plan": None
+        }
+        self.entries.append(entry)
+        self.captured += 1
+
+        if self.engine is None or sql is None or random.random() >= self.sample_rate:
+            return
+        if self._explaining is not None and not self._explaining.done():
+            self.explain_skipped += 1
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Not on an event loop (a sync script or worker thread); keep the entry without a plan
+            return
+        entry["plan"] = "pending"
+        # A copy: callers may reuse the dict for their next statement
+        self._explaining = loop.create_task(self._explain(entry, sql, dict(params or {})))
+
+    async def _explain(self, entry: dict, sql: str, params: dict):
+        analyze = not WRITE_STATEMENT.search(sql)
+        options = "ANALYZE, BUFFERS" if analyze else "COSTS"
+        try:
+            async with self.engine.connect() as conn:
+                conn = await conn.execution_options(**{CAPTURE_OPTION: False})
+                await conn.execute(text(f"SET LOCAL statement_timeout = {int(self.explain_timeout_ms)}"))
+                result = await conn.execute(text(f"EXPLAIN ({options}) {sql}"), params)
+                plan = [row[0] for row in result]
+                await conn.rollback()
+        except Exception as e:
+            self.explain_failures += 1
+            entry["plan"] = None
+            entry["explainError"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+            return
+        self.explained += 1
+        entry["analyzed"] = analyze
+        entry["plan"] = [redact_plan_line(line) for line in plan]
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "thresholdMs": round(self.threshold_seconds * 1000, 3),
+            "explainSampleRate": self.sample_rate,
+            "captured": self.captured,
+            "explained": self.explained,
+            "explainSkipped": self.explain_skipped,
+            "explainFailures": self.explain_failures
+        }
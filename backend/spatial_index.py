@@ -0,0 +1,127 @@
+"""
+In-memory spatial index of available donors.
+
+Donors are bucketed per blood type into a regular lat/lon grid. A radius
+search only visits the grid cells overlapping the search circle's bounding
+box, so the database is only needed to hydrate the winning rows.
+
+Refreshes only see rows that still exist: a donor deleted by another worker
+stays in this index until the next full load() (DONOR_INDEX_RELOAD_SECONDS
+in main.py). Such matches are dropped when the rows are hydrated.
+"""
+
+import heapq
+import math
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from geo import bounding_box, grid_cell, haversine_km
+
+Cell = Tuple[int, int]
+
+
+class DonorSpatialIndex:
+    def __init__(self, cell_degrees: float = 0.1):
+        self.cell_degrees = cell_degrees
+        # blood_type -> cell -> donor_id -> (latitude, longitude)
+        self._grids: Dict[str, Dict[Cell, Dict[str, Tuple[float, float]]]] = {}
+        # donor_id -> (blood_type, cell)
+        self._entries: Dict[str, Tuple[str, Cell]] = {}
+        self.ready = False
+        # Highest updated_at seen so far, used for incremental refreshes
+        self.watermark: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self, rows: Iterable[tuple]):
+        """Replace the index contents with (id, blood_type, latitude, longitude, is_available, updated_at) rows"""
+        self._grids = {}
+        self._entries = {}
+        self.watermark = None
+        self.apply(rows)
+        self.ready = True
+
+    def apply(self, rows: Iterable[tuple]):
+        """Apply changed (id, blood_type, latitude, longitude, is_available, updated_at) rows"""
+        for donor_id, blood_type, latitude, longitude, is_available, updated_at in rows:
+            self.upsert(str(donor_id), blood_type, float(latitude), float(longitude), is_available)
+            if updated_at is not None and (self.watermark is None or updated_at > self.watermark):
+                self.watermark = updated_at
+
+    def upsert(self, donor_id: str, blood_type: str, latitude: float, longitude: float, is_available: bool = True):
+        """Add or move a donor; unavailable donors are removed from the index"""
+        self.remove(donor_id)
+        if not is_available:
+            return
+        cell = grid_cell(latitude, longitude, self.cell_degrees)
+        grid = self._grids.setdefault(blood_type, {})
+        grid.setdefault(cell, {})[donor_id] = (latitude, longitude)
+        self._entries[donor_id] = (blood_type, cell)
+
+    def remove(self, donor_id: str):
+        entry = self._entries.pop(donor_id, None)
+        if entry is None:
+            return
+        blood_type, cell = entry
+        grid = self._grids[blood_type]
+        bucket = grid[cell]
+        del bucket[donor_id]
+        if not bucket:
+            del grid[cell]
+
+    def _candidate_cells(self, grid: Dict[Cell, dict], latitude: float, longitude: float, radius_km: float):
+        min_lat, max_lat, lon_ranges = bounding_box(latitude, longitude, radius_km)
+        lat_lo = math.floor(min_lat / self.cell_degrees)
+        lat_hi = math.floor(max_lat / self.cell_degrees)
+        lon_cells = [
+            (math.floor(lo / self.cell_degrees), math.floor(hi / self.cell_degrees)) for lo, hi in lon_ranges
+        ]
+
+        # For very large radii it is cheaper to filter the occupied cells
+        if (lat_hi - lat_lo + 1) * sum(hi - lo + 1 for lo, hi in lon_cells) > len(grid):
+            for (cell_lat, cell_lon), bucket in grid.items():
+                if lat_lo <= cell_lat <= lat_hi and any(lo <= cell_lon <= hi for lo, hi in lon_cells):
+                    yield bucket
+            return
+
+        for lon_lo, lon_hi in lon_cells:
+            for cell_lat in range(lat_lo, lat_hi + 1):
+                for cell_lon in range(lon_lo, lon_hi + 1):
+                    bucket = grid.get((cell_lat, cell_lon))
+                    if bucket:
+                        yield bucket
+
+    def nearest(
+        self,
+        blood_type: Union[str, Tuple[str, ...], None],
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        limit: int,
+    ) -> List[Tuple[str, float]]:
+        """Closest donors within radius_km as (donor_id, distance_km), nearest first.
+
+        A blood_type of None searches every blood type and a tuple searches
+        all the listed types at once, merging them into one ranking.
+        """
+        if blood_type is None:
+            grids = list(self._grids.values())
+        else:
+            blood_types = (blood_type,) if isinstance(blood_type, str) else blood_type
+            grids = [self._grids[each] for each in blood_types if each in self._grids]
+
+        # Max-heap (by negated distance) holding the best `limit` matches
+        best: List[Tuple[float, str]] = []
+        for grid in grids:
+            for bucket in self._candidate_cells(grid, latitude, longitude, radius_km):
+                for donor_id, (donor_lat, donor_lon) in bucket.items():
+                    distance = haversine_km(latitude, longitude, donor_lat, donor_lon)
+                    if distance > radius_km:
+                        continue
+                    if len(best) < limit:
+                        heapq.heappush(best, (-distance, donor_id))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, donor_id))
+
+        return [(donor_id, -neg_distance) for neg_distance, donor_id in sorted(best, reverse=True)]
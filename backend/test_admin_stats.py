@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test that the incrementally maintained admin dashboard counters agree with
+a full recount.
+
+Donors are registered, updated and deleted and searches are run through the
+real API endpoints, then GET /api/v1/admin/stats is compared with a fresh
+reconcile() and COUNT(*) of the tables. The test donors (phone prefix
++25596) and their search logs are deleted afterwards. Runs against
+DATABASE_URL and is skipped if it is unset.
+"""
+
+import asyncio
+import os
+
+from admin_stats import AdminStats
+
+TEST_PHONE_PREFIX = "+25596"
+# Searches are logged (and rate limited) under this client address
+TEST_CLIENT_IP = "192.0.2.96"
+
+def counters(snapshot: dict) -> dict:
+    return {
+        "totalDonors": snapshot["totalDonors"],
+        "donorsByBloodType": snapshot["donorsByBloodType"],
+        "recentDonors": [donor["id"] for donor in snapshot["recentDonors"]],
+        "searchCount": snapshot["searchCount"],
+        "todayRegistrations": snapshot["todayRegistrations"]
+    }
+
+def registration(i: int, blood_type: str, city, is_available: bool = True) -> dict:
+    return {
+        "first_name": f"Stats {i}",
+        "phone_number": f"{TEST_PHONE_PREFIX}{i:07d}",
+        "blood_type": blood_type,
+        "latitude": -1.29,
+        "longitude": 36.82,
+        "city": city,
+        "is_available": is_available
+    }
+
+def test_counters_match_recount():
+    if not os.getenv("DATABASE_URL"):
+        print("⚠️  DATABASE_URL not set, skipping admin stats test")
+        return
+    print("🧪 Testing admin stats counters against a recount...")
+    import httpx
+    from sqlalchemy import text
+    import main
+
+    def delete_test_rows():
+        with main.engine.begin() as conn:
+            conn.execute(text("DELETE FROM public.blood WHERE phone_number LIKE :prefix"),
+                         {"prefix": TEST_PHONE_PREFIX + "%"})
+            conn.execute(text("DELETE FROM public.search_logs WHERE client_ip = :ip"), {"ip": TEST_CLIENT_IP})
+
+    async def recount() -> dict:
+        fresh = AdminStats(cache_seconds=0)
+        async with main.async_engine.connect() as conn:
+            await fresh.reconcile(conn)
+            donors = (await conn.execute(text("SELECT COUNT(*) FROM public.blood"))).scalar()
+            searches = (await conn.execute(text("SELECT COUNT(*) FROM public.search_logs"))).scalar()
+        snapshot = fresh.snapshot()
+        assert (snapshot["totalDonors"], snapshot["searchCount"]) == (donors, searches)
+        return {**counters(snapshot), "cities": dict(fresh.city_counts)}
+
+    async def check_stats(client):
+        response = await client.get("/api/v1/admin/stats")
+        assert response.status_code == 200, response.text
+        assert {**counters(response.json()), "cities": dict(main.admin_stats.city_counts)} == await recount()
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        main.search_log_writer.start()
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                # Loads the counters from the database
+                await check_stats(client)
+
+                donors = []
+                for i, (blood_type, city) in enumerate((("O+", "Stats Town"), ("A-", "Stats Town"), ("B+", None))):
+                    response = await client.post("/api/v1/donors", json=registration(i, blood_type, city))
+                    assert response.status_code == 201, response.text
+                    donors.append(response.json()["id"])
+
+                # Re-registering a phone number and toggling availability change no counter
+                response = await client.post("/api/v1/donors", json=registration(0, "O+", "Stats Town", False))
+                assert response.status_code == 200, response.text
+                # A new blood type and city move the donor between counters
+                response = await client.put(f"/api/v1/donors/{donors[1]}", json=registration(1, "AB-", "Other Town"))
+                assert response.status_code == 200, response.text
+
+                written = main.search_log_writer.written
+                for blood_type in ("O+", "A-"):
+                    response = await client.post("/api/v1/donors/search", headers={"X-Forwarded-For": TEST_CLIENT_IP},
+                                                 json={"blood_type": blood_type, "latitude": -1.29,
+                                                       "longitude": 36.82, "radius_km": 10})
+                    assert response.status_code == 200, response.text
+                # Search logs are counted once the background writer has committed them
+                for _ in range(100):
+                    if main.search_log_writer.written >= written + 2:
+                        break
+                    await asyncio.sleep(0.05)
+                assert main.search_log_writer.written == written + 2, main.search_log_writer.stats()
+                await check_stats(client)
+
+                # Deleting a recent donor makes the counters recount on the next request
+                response = await client.delete(f"/api/v1/donors/{donors[2]}")
+                assert response.status_code == 200, response.text
+                assert main.admin_stats.needs_reconcile()
+                await check_stats(client)
+        finally:
+            await main.search_log_writer.stop()
+            # Pooled asyncpg connections are bound to this event loop
+            await main.async_engine.dispose()
+
+    delete_test_rows()
+    try:
+        asyncio.run(run())
+    finally:
+        delete_test_rows()
+        main.admin_stats.invalidate()
+    print("✅ Admin stats counters: PASSED")
+
+def test_snapshot_cache():
+    print("🧪 Testing admin stats snapshot cache...")
+    stats = AdminStats(cache_seconds=60)
+    stats.ready = True
+    first = stats.snapshot()
+    assert stats.snapshot() is first
+    # Any change rebuilds the snapshot even inside the cache window
+    stats.searches_logged(3)
+    assert stats.snapshot()["searchCount"] == 3
+    stats.donor_changed("x", None, None, "X", "O+", None, 0, 0)
+    assert stats.needs_reconcile()
+    print("✅ Admin stats snapshot cache: PASSED")
+
+if __name__ == "__main__":
+    test_snapshot_cache()
+    test_counters_match_recount()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Test the blood compatibility table and the merged compatibility search
+over the in-memory donor index (no database needed).
+"""
+
+from blood_compatibility import compatible_donor_types, is_compatible
+from spatial_index import DonorSpatialIndex
+
+NAIROBI = (-1.2921, 36.8219)
+
+def test_compatibility_table():
+    print("🧪 Testing blood compatibility table...")
+    assert set(compatible_donor_types("A+")) == {"A+", "A-", "O+", "O-"}
+    assert set(compatible_donor_types("AB+")) == {"A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-"}
+    assert compatible_donor_types("O-") == ("O-",)
+    assert is_compatible("B-", "O-") and not is_compatible("B-", "B+")
+    assert not is_compatible("O+", "unknown")
+    print("✅ Blood compatibility table: PASSED")
+
+def test_compatible_index_search():
+    print("🧪 Testing compatibility search over the donor index...")
+    index = DonorSpatialIndex()
+    # Increasingly far north of Nairobi, cycling through every blood type
+    for i, blood_type in enumerate(("O-", "B+", "A-", "AB+", "O+", "A+", "B-", "AB-")):
+        index.upsert(str(i), blood_type, NAIROBI[0] + i * 0.01, NAIROBI[1])
+
+    matches = index.nearest(compatible_donor_types("A+"), *NAIROBI, radius_km=50, limit=3)
+    # One merged ranking by distance across the compatible types only
+    assert [match[0] for match in matches] == ["0", "2", "4"], matches
+    print("✅ Compatibility index search: PASSED")
+
+if __name__ == "__main__":
+    test_compatibility_table()
+    test_compatible_index_search()
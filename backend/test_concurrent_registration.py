@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Fire many parallel registrations for a handful of overlapping phone numbers.
+
+Every request must succeed, exactly one registration per phone number must
+be reported as new (201) and the table must end up with one row per number.
+The test donors are deleted afterwards. Runs against DATABASE_URL and is
+skipped if it is unset.
+"""
+
+import asyncio
+import os
+
+import httpx
+from sqlalchemy import text
+
+PHONE_NUMBERS = [f"+25591{i:07d}" for i in range(10)]
+REGISTRATIONS_PER_PHONE = 20
+
+
+def registration(phone_number: str, attempt: int) -> dict:
+    return {
+        "first_name": f"Concurrent {attempt}",
+        "phone_number": phone_number,
+        "blood_type": ["A+", "B+", "O+", "O-"][attempt % 4],
+        "latitude": -1.2921,
+        "longitude": 36.8219,
+        "city": "Concurrency Test"
+    }
+
+
+def delete_test_donors(engine):
+    with engine.connect() as conn:
+        conn.execute(text("DELETE FROM public.blood WHERE phone_number = ANY(:phones)"), {"phones": PHONE_NUMBERS})
+        conn.commit()
+
+
+async def register_concurrently(app, async_engine):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        requests = [
+            client.post("/api/v1/donors", json=registration(phone, attempt))
+            for attempt in range(REGISTRATIONS_PER_PHONE)
+            for phone in PHONE_NUMBERS
+        ]
+        responses = await asyncio.gather(*requests)
+    # Pooled asyncpg connections are bound to this event loop
+    await async_engine.dispose()
+    return responses
+
+
+def test_concurrent_registrations():
+    if not os.getenv("DATABASE_URL"):
+        print("⚠️  DATABASE_URL not set, skipping concurrent registration test")
+        return
+    print(f"🧪 Registering {len(PHONE_NUMBERS)} phone numbers {REGISTRATIONS_PER_PHONE} times each in parallel...")
+    from main import app, async_engine, engine
+
+    delete_test_donors(engine)
+    try:
+        responses = asyncio.run(register_concurrently(app, async_engine))
+
+        statuses = [response.status_code for response in responses]
+        assert all(status in (200, 201) for status in statuses), [r.text for r in responses if r.status_code >= 300]
+        assert statuses.count(201) == len(PHONE_NUMBERS), statuses.count(201)
+
+        # Every response for a phone number reports the same donor
+        donor_ids = {}
+        for response in responses:
+            donor = response.json()
+            donor_ids.setdefault(donor["phone_number"], set()).add(donor["id"])
+        assert all(len(ids) == 1 for ids in donor_ids.values()), donor_ids
+
+        with engine.connect() as conn:
+            count = conn.execute(
+                text("SELECT COUNT(*) FROM public.blood WHERE phone_number = ANY(:phones)"),
+                {"phones": PHONE_NUMBERS}
+            ).scalar()
+        assert count == len(PHONE_NUMBERS), count
+    finally:
+        delete_test_donors(engine)
+
+    print("✅ Concurrent registrations: PASSED")
+
+
+if __name__ == "__main__":
+    test_concurrent_registrations()
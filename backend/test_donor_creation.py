@@ -34,8 +34,10 @@ def test_donor_creation():
         print(f"Status Code: {response.status_code}")
         print(f"Response: {response.text}")
         
-        if response.status_code == 200:
-            print("✅ Donor creation: SUCCESS")
+        # 201 for a new donor, 200 when the phone number was already registered
+        if response.status_code in (200, 201):
+            outcome = "created" if response.status_code == 201 else "updated existing registration"
+            print(f"✅ Donor creation: SUCCESS ({outcome})")
         else:
             print(f"❌ Donor creation: FAILED ({response.status_code})")
             
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test the synthetic donor generator (no database needed).
+"""
+
+from collections import Counter
+from datetime import date
+
+from donor_generator import BLOOD_TYPE_SHARES, CHUNK_SIZE, DEFERRAL_DAYS, DonorGenerator
+
+END = date(2026, 1, 1)
+
+def test_deterministic_and_unique():
+    print("🧪 Testing generator determinism...")
+    rows = list(DonorGenerator(7, END).rows(CHUNK_SIZE + 10))
+    assert rows == list(DonorGenerator(7, END).rows(CHUNK_SIZE + 10))
+    # A later chunk can be regenerated on its own
+    assert DonorGenerator(7, END).chunk(1, 10) == rows[CHUNK_SIZE:]
+    assert rows != list(DonorGenerator(8, END).rows(CHUNK_SIZE + 10))
+    assert len({row[0] for row in rows}) == len(rows)
+    assert len({row[2] for row in rows}) == len(rows)
+    print("✅ Generator determinism: PASSED")
+
+def test_distributions():
+    print("🧪 Testing generated distributions...")
+    rows = DonorGenerator(7, END).chunk(0)
+    blood_types = Counter(row[3] for row in rows)
+    for blood_type, share in BLOOD_TYPE_SHARES.items():
+        assert abs(blood_types[blood_type] / len(rows) - share) < 0.01, (blood_type, blood_types[blood_type])
+    assert 0.3 < sum(row[6] == "Nairobi" for row in rows) / len(rows) < 0.42
+    assert all(-6 < row[4] < 6 and 32 < row[5] < 43 for row in rows)
+    # Recent donors are deferred, and registrations grow towards the end date
+    assert not any(row[9] for row in rows if row[10] and (END - row[10]).days < DEFERRAL_DAYS)
+    assert sum(row[11].year == 2025 for row in rows) > sum(row[11].year == 2023 for row in rows)
+    print("✅ Generated distributions: PASSED")
+
+def test_phone_capacity():
+    print("🧪 Testing phone number capacity...")
+    generator = DonorGenerator(phone_prefix="+2559999999")
+    assert generator.chunk(0, 100)[-1][2] == "+255999999999"
+    try:
+        generator.chunk(0, 101)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print("✅ Phone number capacity: PASSED")
+
+if __name__ == "__main__":
+    test_deterministic_and_unique()
+    test_distributions()
+    test_phone_capacity()
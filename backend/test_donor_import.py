@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test parsing and validation for the bulk donor import (no database needed).
+"""
+
+import asyncio
+
+from donor_import import DonorImport, parse_csv, parse_ndjson
+
+CSV_UPLOAD = (
+    b"first_name,phone_number,blood_type,latitude,longitude,address,city\r\n"
+    b'Jane,+254700000001,O+,-1.29,36.82,"12 Moi Ave,\nApartment 4",Nairobi\r\n'
+    b"Bad,+254700000002,Z+,-1.29,36.82,,\r\n"
+    b"Far,+254700000003,A-,123,36.82,,\r\n"
+    b"Short,row\r\n"
+)
+
+async def chunked(data: bytes, size: int = 7):
+    # Small chunks so rows and quoted fields are split across reads
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+async def collect(donor_import: DonorImport, rows):
+    return [record async for record in donor_import.records(rows)]
+
+def test_csv_import_validation():
+    print("🧪 Testing CSV import parsing...")
+    donor_import = DonorImport()
+    records = asyncio.run(collect(donor_import, parse_csv(chunked(CSV_UPLOAD), donor_import)))
+
+    assert len(records) == 1, records
+    assert records[0][0] == 2
+    assert records[0][6] == "12 Moi Ave,\nApartment 4"
+    assert records[0][8] == "Kenya"
+
+    assert donor_import.received == 4
+    assert [error["line"] for error in donor_import.errors] == [4, 5, 6], donor_import.errors
+    print("✅ CSV import parsing: PASSED")
+
+def test_ndjson_import_validation():
+    print("🧪 Testing NDJSON import parsing...")
+    upload = (
+        b'{"first_name": "Ann", "phone_number": "+254700000004", "blood_type": "AB-", "latitude": 0, "longitude": 37}\n'
+        b"\n"
+        b"not json\n"
+        b'{"first_name": "Tom", "phone_number": "+254700000005", "blood_type": "B+"}\n'
+    )
+    donor_import = DonorImport()
+    records = asyncio.run(collect(donor_import, parse_ndjson(chunked(upload), donor_import)))
+
+    assert [record[1] for record in records] == ["Ann"]
+    assert [error["line"] for error in donor_import.errors] == [3, 4], donor_import.errors
+    print("✅ NDJSON import parsing: PASSED")
+
+if __name__ == "__main__":
+    test_csv_import_validation()
+    test_ndjson_import_validation()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test the donor event bus: batching and coalescing in process, and delivery
+between two "workers" over Redis (fakeredis) and Postgres LISTEN/NOTIFY.
+
+The Postgres test runs against DATABASE_URL and is skipped if it is unset
+or unreachable.
+"""
+
+import asyncio
+import os
+
+from event_bus import InProcessEventBus, PostgresEventBus, RedisEventBus
+
+def collector(bus):
+    received = []
+    bus.subscribe(lambda topic, message, location: received.append((topic, message)))
+    return received
+
+def test_in_process_bus():
+    print("🧪 Testing in-process event bus...")
+
+    async def run():
+        bus = InProcessEventBus(flush_interval=0.01)
+        received = collector(bus)
+        await bus.start()
+        bus.publish("O+", "donor 1 created", key="1")
+        bus.publish("O+", "donor 1 updated", key="1")
+        bus.publish("A-", "donor 2 created", key="2")
+        # Nothing is delivered until the batch is flushed
+        assert received == []
+        await asyncio.sleep(0.05)
+        await bus.stop()
+        return bus, received
+
+    bus, received = asyncio.run(run())
+    assert received == [("O+", "donor 1 updated"), ("A-", "donor 2 created")], received
+    assert bus.coalesced == 1
+    print("✅ In-process event bus: PASSED")
+
+def test_unreachable_transport():
+    print("🧪 Testing event bus with an unreachable transport...")
+
+    class FlakyBus(InProcessEventBus):
+        """Fails to connect until the transport comes back"""
+        reachable = False
+        connected = False
+        connects = 0
+
+        async def connect(self):
+            self.connects += 1
+            if not self.reachable:
+                raise OSError("connection refused")
+            self.connected = True
+
+        async def check_connection(self):
+            if not self.connected:
+                await self.connect()
+
+    async def run():
+        bus = FlakyBus(flush_interval=0.01, reconnect_interval=0.02)
+        received = collector(bus)
+        try:
+            await bus.start()
+            assert False, "start() should report the failed connect"
+        except OSError:
+            pass
+        for i in range(3):
+            bus.publish("O+", f"donor {i} created", key=str(i))
+        await asyncio.sleep(0.05)
+        # Local subscribers are not held up by the transport
+        assert len(received) == 3 and bus.stats()["pending"] == 0, received
+        assert bus.reconnect_failures >= 1
+        bus.reachable = True
+        await asyncio.sleep(0.1)
+        retries = bus.connects
+        await asyncio.sleep(0.05)
+        await bus.stop()
+        return bus, retries
+
+    bus, retries = asyncio.run(run())
+    # Reconnected in the background, and no more retries after that
+    assert bus.connected and bus.connects == retries, (bus.connects, retries)
+    print("✅ Unreachable transport: PASSED")
+
+def test_postgres_bus_unreachable():
+    print("🧪 Testing Postgres event bus that cannot connect...")
+
+    async def run():
+        # Nothing listens on port 1
+        bus = PostgresEventBus("postgresql://postgres@127.0.0.1:1/none", flush_interval=0.01, reconnect_interval=60)
+        received = collector(bus)
+        try:
+            await bus.start()
+        except OSError:
+            pass
+        bus.publish("O+", "donor 1 created", key="1")
+        await asyncio.sleep(0.05)
+        await bus.stop()
+        return bus, received
+
+    bus, received = asyncio.run(run())
+    assert received == [("O+", "donor 1 created")], received
+    assert bus.send_failures == 1
+    print("✅ Postgres event bus that cannot connect: PASSED")
+
+async def exercise_two_workers(worker_a, worker_b):
+    received_a, received_b = collector(worker_a), collector(worker_b)
+    await worker_a.start()
+    await worker_b.start()
+    try:
+        worker_a.publish("O+", "from a", key="1")
+        worker_b.publish("B-", "from b", key="2")
+        for _ in range(100):
+            if len(received_a) == 2 and len(received_b) == 2:
+                break
+            await asyncio.sleep(0.02)
+        # Everyone sees every event exactly once, including the publisher
+        assert sorted(received_a) == [("B-", "from b"), ("O+", "from a")], received_a
+        assert sorted(received_b) == [("B-", "from b"), ("O+", "from a")], received_b
+    finally:
+        await worker_a.stop()
+        await worker_b.stop()
+
+def test_redis_bus():
+    try:
+        import fakeredis
+        from fakeredis import aioredis
+    except ImportError:
+        print("⚠️  fakeredis not installed, skipping Redis event bus test")
+        return
+    print("🧪 Testing Redis event bus...")
+    server = fakeredis.FakeServer()
+    asyncio.run(exercise_two_workers(
+        RedisEventBus(aioredis.FakeRedis(server=server), flush_interval=0.01),
+        RedisEventBus(aioredis.FakeRedis(server=server), flush_interval=0.01)
+    ))
+    print("✅ Redis event bus: PASSED")
+
+def test_postgres_bus():
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("⚠️  DATABASE_URL not set, skipping Postgres event bus test")
+        return
+    print("🧪 Testing Postgres LISTEN/NOTIFY event bus...")
+    channel = "donor_events_test"
+    try:
+        asyncio.run(exercise_two_workers(
+            PostgresEventBus(database_url, channel=channel, flush_interval=0.01),
+            PostgresEventBus(database_url, channel=channel, flush_interval=0.01)
+        ))
+    except OSError as e:
+        print(f"⚠️  Database unreachable, skipping Postgres event bus test: {e}")
+        return
+    print("✅ Postgres event bus: PASSED")
+
+def test_notify_payload_split():
+    bus = PostgresEventBus("postgresql://unused")
+    events = [{"id": str(i), "topic": "O+", "message": "x" * 1000} for i in range(20)]
+    payloads = list(bus._payloads(events))
+    assert len(payloads) > 1
+    assert all(len(payload.encode()) <= 7900 for payload in payloads)
+    print("✅ NOTIFY payload split: PASSED")
+
+if __name__ == "__main__":
+    test_in_process_bus()
+    test_unreachable_transport()
+    test_postgres_bus_unreachable()
+    test_notify_payload_split()
+    test_redis_bus()
+    test_postgres_bus()
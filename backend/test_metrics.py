@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test the Prometheus exposition and the request metrics middleware (no
+database needed).
+"""
+
+import asyncio
+from contextvars import ContextVar
+
+from metrics import MetricsRegistry, RequestMetricsMiddleware, request_db_duration, request_duration
+from queries import QueryTimingMiddleware, request_queries
+
+def test_exposition_format():
+    print("🧪 Testing Prometheus exposition format...")
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency", ("route",), (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(("/a",), value)
+    rejections = {"search": 3}
+    registry.collect(lambda: {"queued": 2, "rejections": rejections}, [
+        ("queue_rows", "gauge", "Queued rows", "queued"),
+        ("rejections_total", "counter", "Rejections", "rejections"),
+        ("missing_total", "counter", "Not in the stats", "missing"),
+    ], label_name="route")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE latency_seconds histogram" in lines
+    # Buckets are cumulative, upper bounds inclusive
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{route="/a"} 3.65' in lines
+    assert 'latency_seconds_count{route="/a"} 4' in lines
+    assert "queue_rows 2" in lines
+    assert 'rejections_total{route="search"} 3' in lines
+    assert not any(line.startswith("missing_total") or "missing_total " in line for line in lines)
+    print("✅ Exposition format: PASSED")
+
+def test_request_middleware():
+    print("🧪 Testing request metrics middleware...")
+    timings = ContextVar("timings", default=None)
+
+    async def endpoint():
+        pass
+
+    class Route:
+        def __init__(self, path, endpoint):
+            self.path = path
+            self.endpoint = endpoint
+
+    class App:
+        routes = [Route("/api/v1/donors/{donor_id}", endpoint)]
+
+    async def app(scope, receive, send):
+        # What the router and QueryTimingMiddleware leave behind
+        scope["endpoint"] = endpoint
+        timings.get().append(("get_donor", 0.002))
+        await send({"type": "http.response.start", "status": 404, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    async def request():
+        timings.set([])
+        await RequestMetricsMiddleware(app, timings)({"type": "http", "method": "GET", "app": App()}, None, send)
+
+    asyncio.run(request())
+    series = request_duration._series[("GET", "/api/v1/donors/{donor_id}", "404")]
+    assert series[2] == 1
+    db_series = request_db_duration._series[("GET", "/api/v1/donors/{donor_id}")]
+    assert abs(db_series[1] - 0.002) < 1e-9
+    print("✅ Request metrics middleware: PASSED")
+
+def test_server_timing_paths():
+    print("🧪 Testing Server-Timing header paths...")
+    collected = []
+
+    async def app(scope, receive, send):
+        request_queries.get().append(("search_donors", 0.0042))
+        collected.append(list(request_queries.get()))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def request(middleware, path):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await middleware({"type": "http", "method": "GET", "path": path}, None, send)
+        return dict(messages[0]["headers"]).get(b"server-timing")
+
+    async def run():
+        default = QueryTimingMiddleware(app)
+        admin_only = QueryTimingMiddleware(app, header_paths=("/api/v1/admin/",))
+        return [
+            await request(default, "/api/v1/admin/queries"),
+            await request(admin_only, "/api/v1/search"),
+            await request(admin_only, "/api/v1/admin/queries"),
+        ]
+
+    headers = asyncio.run(run())
+    # Off unless enabled, and then only on the configured paths
+    assert headers == [None, None, b"search_donors;dur=4.20"], headers
+    # The statements are collected for the request metrics either way
+    assert collected == [[("search_donors", 0.0042)]] * 3
+    print("✅ Server-Timing header paths: PASSED")
+
+if __name__ == "__main__":
+    test_exposition_format()
+    test_request_middleware()
+    test_server_timing_paths()
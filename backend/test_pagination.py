@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test keyset pagination of the admin donor listing.
+
+The cursor tests need no database. The listing tests seed a few donors
+sharing one created_at (so pages break inside a tie), page through
+/api/v1/admin/donors and its NDJSON stream mode, and delete the donors
+afterwards. They run against DATABASE_URL and are skipped if it is unset.
+"""
+
+import asyncio
+import base64
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+
+from pagination import decode_cursor, encode_cursor
+
+TEST_PHONE_PREFIX = "+25591"
+TEST_BLOOD_TYPE = "AB-"
+
+def test_cursor_round_trip():
+    print("🧪 Testing cursor round trip...")
+    created_at = datetime(2026, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    donor_id = uuid.uuid4()
+    assert decode_cursor(encode_cursor(created_at, donor_id)) == (created_at, str(donor_id))
+
+    def encoded(raw: str) -> str:
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    # Tampered cursors are rejected before they reach Postgres
+    for cursor in ("not base64!", encoded("no separator"), encoded(f"yesterday|{donor_id}"),
+                   encoded(f"{created_at.isoformat()}|1' OR '1'='1")):
+        try:
+            decode_cursor(cursor)
+            assert False, f"accepted {cursor}"
+        except ValueError:
+            pass
+    print("✅ Cursor round trip: PASSED")
+
+def test_listing_pages():
+    if not os.getenv("DATABASE_URL"):
+        print("⚠️  DATABASE_URL not set, skipping admin donor listing test")
+        return
+    print("🧪 Testing admin donor listing pages...")
+    import httpx
+    from sqlalchemy import text
+    import main
+
+    tied_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    with main.engine.begin() as conn:
+        conn.execute(text("DELETE FROM public.blood WHERE phone_number LIKE :prefix"), {"prefix": TEST_PHONE_PREFIX + "%"})
+        for i in range(5):
+            conn.execute(text("""
+                INSERT INTO public.blood (first_name, phone_number, blood_type, latitude, longitude, city, created_at)
+                VALUES ('Page Test', :phone, :blood_type, -1.29, 36.82, 'Nairobi', :created_at)
+            """), {"phone": f"{TEST_PHONE_PREFIX}{i:07d}", "blood_type": TEST_BLOOD_TYPE, "created_at": tied_at})
+
+    try:
+        with main.engine.connect() as conn:
+            expected = [str(row[0]) for row in conn.execute(text("""
+                SELECT id FROM public.blood WHERE blood_type = :blood_type ORDER BY created_at DESC, id DESC
+            """), {"blood_type": TEST_BLOOD_TYPE})]
+
+        async def run():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                pages, cursor = [], None
+                while True:
+                    params = {"blood_type": TEST_BLOOD_TYPE, "limit": 2}
+                    if cursor:
+                        params["cursor"] = cursor
+                    response = await client.get("/api/v1/admin/donors", params=params)
+                    assert response.status_code == 200, response.text
+                    pages.append([donor["id"] for donor in response.json()])
+                    cursor = response.headers.get("X-Next-Cursor")
+                    if not cursor:
+                        break
+                streamed = await client.get("/api/v1/admin/donors", params={"blood_type": TEST_BLOOD_TYPE, "stream": "true"})
+                tampered = await client.get("/api/v1/admin/donors", params={
+                    "cursor": encode_cursor(tied_at, "not-a-uuid")
+                })
+            # Pooled asyncpg connections are bound to this event loop
+            await main.async_engine.dispose()
+            return pages, streamed, tampered
+
+        pages, streamed, tampered = asyncio.run(run())
+        listed = [donor_id for page in pages for donor_id in page]
+        # Every donor exactly once, in order, with no empty page at the end
+        assert listed == expected, (listed, expected)
+        assert all(len(page) == 2 for page in pages[:-1]) and 1 <= len(pages[-1]) <= 2
+        assert streamed.headers["content-type"].startswith("application/x-ndjson")
+        assert [json.loads(line)["id"] for line in streamed.text.splitlines()] == expected
+        assert tampered.status_code == 400, tampered.text
+    finally:
+        with main.engine.begin() as conn:
+            conn.execute(text("DELETE FROM public.blood WHERE phone_number LIKE :prefix"), {"prefix": TEST_PHONE_PREFIX + "%"})
+    print("✅ Admin donor listing pages: PASSED")
+
+if __name__ == "__main__":
+    test_cursor_round_trip()
+    test_listing_pages()
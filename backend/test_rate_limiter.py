@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test the sliding-window rate limiter against the in-memory and Redis backends.
+
+The Redis backend runs against fakeredis, so no server is needed.
+"""
+
+import asyncio
+
+from rate_limiter import MemoryRateLimitBackend, RateLimiter, RedisRateLimitBackend, parse_rate_limits
+
+LIMITS = parse_rate_limits("search=5/hour")
+
+async def exercise_backend(backend):
+    limiter = RateLimiter(backend, LIMITS)
+    start = 3600 * 1000  # start of an hour window
+
+    # Five searches are allowed, the sixth is rejected
+    results = [await limiter.hit("search", "client-a", now=start + i) for i in range(6)]
+    assert results == [True] * 5 + [False], results
+    assert limiter.rejections["search"] == 1
+
+    # Other clients and unlimited routes are unaffected
+    assert await limiter.hit("search", "client-b", now=start + 10)
+    assert await limiter.hit("register", "client-a", now=start + 10)
+
+    # Halfway through the next window half of the previous count (2.5) still applies
+    results = [await limiter.hit("search", "client-a", now=start + 5400) for _ in range(4)]
+    assert results == [True] * 3 + [False], results
+
+    # Two windows later the client starts fresh
+    assert await limiter.hit("search", "client-a", now=start + 3 * 3600)
+
+def test_memory_backend():
+    print("🧪 Testing in-memory rate limiter...")
+    asyncio.run(exercise_backend(MemoryRateLimitBackend()))
+    print("✅ In-memory rate limiter: PASSED")
+
+def test_memory_backend_evicts_idle_clients():
+    backend = MemoryRateLimitBackend()
+    limiter = RateLimiter(backend, LIMITS)
+
+    async def run():
+        for i in range(1000):
+            await limiter.hit("search", f"client-{i}", now=0)
+        await limiter.hit("search", "late-client", now=3 * 3600)
+
+    asyncio.run(run())
+    assert len(backend) == 1, len(backend)
+    print("✅ Idle clients evicted: PASSED")
+
+def test_parse_rate_limits():
+    limits = parse_rate_limits("search=5/hour, register=20/minute")
+    assert (limits["search"].requests, limits["search"].period) == (5, "hour")
+    assert (limits["register"].requests, limits["register"].period) == (20, "minute")
+    # A limit for a route that never checks one is a configuration mistake, not a no-op
+    try:
+        parse_rate_limits("search=5/hour,login=3/minute")
+        assert False, "accepted an unknown route"
+    except ValueError:
+        pass
+    print("✅ Rate limit parsing: PASSED")
+
+def test_redis_backend():
+    try:
+        from fakeredis import aioredis
+    except ImportError:
+        print("⚠️  fakeredis not installed, skipping Redis backend test")
+        return
+    print("🧪 Testing Redis rate limiter...")
+    asyncio.run(exercise_backend(RedisRateLimitBackend(aioredis.FakeRedis())))
+    print("✅ Redis rate limiter: PASSED")
+
+if __name__ == "__main__":
+    test_memory_backend()
+    test_memory_backend_evicts_idle_clients()
+    test_parse_rate_limits()
+    test_redis_backend()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test the admin dashboard rollups.
+
+The grid and query tests need no database. The refresh tests run against
+DATABASE_URL (skipped if it is unset): they empty the search logs and
+rollups inside a transaction, log searches at known times, refresh, and
+roll everything back. The endpoint test refreshes the real rollups, which
+only hold derived data.
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+from queries import QUERIES
+from rollups import REFRESH_LOCK_KEY, Rollups, cell_expression
+
+def test_grid_cells():
+    print("🧪 Testing rollup grid cells...")
+    assert cell_expression("latitude", 0.1) == "CAST(floor(latitude / 0.1) * 0.1 AS numeric(7, 3))"
+    rollups = Rollups(cell_degrees=0.1)
+    # Cells are named by their south-west corner; the centre is what gets plotted
+    assert rollups.cell(-1.3, 36.8) == {"cellLat": -1.3, "cellLon": 36.8, "latitude": -1.25, "longitude": 36.85}
+    for query in [*rollups.donor_queries.values(), *rollups.search_queries.values(), rollups.supply_demand_query]:
+        assert QUERIES[query.name] is query
+    print("✅ Rollup grid cells: PASSED")
+
+def with_empty_rollups(test):
+    """Run test(rollups, conn, log_search) in a transaction that starts with no searches or rollups"""
+    from sqlalchemy import text
+    from database import async_engine
+
+    async def run():
+        rollups = Rollups(cell_degrees=0.1)
+        async with async_engine.connect() as conn:
+            transaction = await conn.begin()
+            try:
+                for table in ("search_logs", "search_rollup_hourly", "search_rollup_daily"):
+                    await conn.execute(text(f"DELETE FROM public.{table}"))
+
+                async def log_search(searched_at, blood_type="O+", latitude=-1.29, results_count=3):
+                    await conn.execute(text("""
+                        INSERT INTO public.search_logs (blood_type, latitude, longitude, radius_km, results_count, searched_at)
+                        VALUES (:blood_type, :latitude, 36.82, 10, :results_count, :searched_at)
+                    """), {"blood_type": blood_type, "latitude": latitude, "results_count": results_count,
+                           "searched_at": searched_at})
+
+                await test(rollups, conn, log_search)
+            finally:
+                await transaction.rollback()
+        await async_engine.dispose()
+
+    asyncio.run(run())
+
+def test_hourly_and_daily_buckets():
+    if not os.getenv("DATABASE_URL"):
+        print("⚠️  DATABASE_URL not set, skipping rollup refresh tests")
+        return
+    print("🧪 Testing hourly and daily search rollups...")
+    day = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=2)
+
+    async def test(rollups, conn, log_search):
+        await log_search(day + timedelta(hours=10, minutes=15))
+        await log_search(day + timedelta(hours=10, minutes=45), results_count=0)
+        await log_search(day + timedelta(hours=11, minutes=30), latitude=-1.21)
+        await log_search(day + timedelta(days=1, hours=9), blood_type="A-", results_count=0)
+        result = await rollups.refresh(conn)
+        assert result["refreshed"] and result["searchesSince"] == day + timedelta(hours=10), result
+
+        hourly = [(row["bucket"], row["blood_type"], row["cellLat"], row["searches"], row["misses"])
+                  for row in await rollups.searches(conn, "hour", None, None, None)]
+        assert hourly == [
+            (day + timedelta(hours=10), "O+", -1.3, 2, 1),
+            (day + timedelta(hours=11), "O+", -1.3, 1, 0),
+            (day + timedelta(days=1, hours=9), "A-", -1.3, 1, 1),
+        ], hourly
+        daily = [(row["bucket"], row["blood_type"], row["searches"], row["misses"])
+                 for row in await rollups.searches(conn, "day", None, None, None)]
+        assert daily == [(day, "O+", 3, 1), (day + timedelta(days=1), "A-", 1, 1)], daily
+
+        # A search logged late in the newest hour is picked up by the next refresh, hourly and daily
+        await log_search(day + timedelta(days=1, hours=9, minutes=50), blood_type="A-")
+        result = await rollups.refresh(conn)
+        assert result["searchesSince"] == day + timedelta(days=1, hours=8)
+        daily = await rollups.searches(conn, "day", "A-", day, None)
+        assert [(row["searches"], row["misses"]) for row in daily] == [(2, 1)]
+
+        cells = await rollups.supply_demand(conn, "A-", 7)
+        cell = next(cell for cell in cells if cell["cellLat"] == -1.3 and cell["cellLon"] == 36.8)
+        assert cell["searches"] == 2 and cell["misses"] == 1 and cell["missRate"] == 0.5
+
+    with_empty_rollups(test)
+    print("✅ Hourly and daily search rollups: PASSED")
+
+def test_refresh_skipped_while_locked():
+    if not os.getenv("DATABASE_URL"):
+        return
+    print("🧪 Testing rollup refresh while another worker holds the lock...")
+    from sqlalchemy import text
+    from database import async_engine
+
+    async def test(rollups, conn, log_search):
+        await log_search(datetime.now(timezone.utc))
+        async with async_engine.connect() as other_worker:
+            async with other_worker.begin():
+                await other_worker.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": REFRESH_LOCK_KEY})
+                result = await rollups.refresh(conn)
+        assert result == {"refreshed": False, "reason": "another worker is refreshing"}, result
+        assert rollups.last_refresh is None
+        assert await rollups.searches(conn, "hour", None, None, None) == []
+
+    with_empty_rollups(test)
+    print("✅ Rollup refresh while locked: PASSED")
+
+def test_supply_demand_endpoint():
+    if not os.getenv("DATABASE_URL"):
+        print("⚠️  DATABASE_URL not set, skipping supply and demand endpoint test")
+        return
+    print("🧪 Testing supply and demand endpoint...")
+    import httpx
+    import main
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            refreshed = await client.post("/api/v1/admin/rollups/refresh")
+            response = await client.get("/api/v1/admin/supply-demand", params={"blood_type": "O+", "days": 30})
+            invalid = await client.get("/api/v1/admin/supply-demand", params={"days": 0})
+        await main.async_engine.dispose()
+        return refreshed, response, invalid
+
+    refreshed, response, invalid = asyncio.run(run())
+    assert refreshed.status_code == 200 and refreshed.json()["refreshed"], refreshed.text
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert set(body) == {"cellDegrees", "days", "lastRefresh", "cells"} and body["days"] == 30
+    assert body["lastRefresh"]["refreshed"]
+    for cell in body["cells"]:
+        assert set(cell) == {"cellLat", "cellLon", "latitude", "longitude", "availableDonors", "searches",
+                             "misses", "missRate"}, cell
+        assert 0 <= cell["missRate"] <= 1 and cell["misses"] <= cell["searches"]
+    assert invalid.status_code == 400
+    print("✅ Supply and demand endpoint: PASSED")
+
+if __name__ == "__main__":
+    test_grid_cells()
+    test_hourly_and_daily_buckets()
+    test_refresh_skipped_while_locked()
+    test_supply_demand_endpoint()
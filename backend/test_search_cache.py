@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test the donor search result cache: hits and misses, precise invalidation
+by blood type and location, and LRU eviction (no database needed).
+"""
+
+from search_cache import SearchResultCache
+
+NAIROBI = (-1.2921, 36.8219)
+MOMBASA = (-4.0435, 39.6682)
+
+# (id, first_name, phone_number, blood_type, city, is_verified, latitude, longitude)
+CANDIDATES = [
+    ("1", "Near", "+254700000001", "O+", "Nairobi", True, -1.29, 36.83),
+    ("2", "Far", "+254700000002", "O+", "Nairobi", False, -1.10, 36.95),
+]
+
+def test_cache_hits_and_ranking():
+    print("🧪 Testing search cache lookups...")
+    cache = SearchResultCache()
+    entry = cache.entry("O+", *NAIROBI, 30)
+    assert cache.get(entry) is None
+    cache.put(entry, CANDIDATES)
+
+    # A colleague in the same building with a slightly smaller radius shares the entry
+    cached = cache.get(cache.entry("O+", NAIROBI[0] + 0.001, NAIROBI[1], 25))
+    assert cached is entry
+    rows = cache.nearest(cached.candidates, *NAIROBI, radius_km=10, limit=10)
+    assert [row[0] for row in rows] == ["1"], rows
+    assert cache.hits == 1 and cache.misses == 1
+    print("✅ Search cache lookups: PASSED")
+
+def test_precise_invalidation():
+    print("🧪 Testing search cache invalidation...")
+    cache = SearchResultCache()
+    nairobi_o, nairobi_a, any_type = (cache.entry(blood_type, *NAIROBI, 30) for blood_type in ("O+", "A-", None))
+    for entry in (nairobi_o, nairobi_a, any_type):
+        cache.get(entry)
+        cache.put(entry, [])
+
+    # A donor far away leaves every entry alone
+    cache.invalidate("O+", *MOMBASA)
+    assert len(cache) == 3
+    # A nearby B+ donor only affects searches that could return B+ donors
+    cache.invalidate("B+", -1.30, 36.80)
+    assert cache.get(any_type) is None and len(cache) == 2
+    cache.invalidate("O+", -1.30, 36.80)
+    assert cache.get(nairobi_a) is nairobi_a and cache.get(nairobi_o) is None
+
+    # A write landing while an entry is being fetched keeps it out of the cache
+    cache.invalidate("A-", -1.30, 36.80)
+    pending = cache.entry("A-", *NAIROBI, 30)
+    assert cache.get(pending) is None
+    cache.invalidate("A-", -1.30, 36.80)
+    cache.put(pending, CANDIDATES)
+    assert cache.get(cache.entry("A-", *NAIROBI, 30)) is None
+    print("✅ Search cache invalidation: PASSED")
+
+def test_lru_eviction():
+    print("🧪 Testing search cache eviction...")
+    cache = SearchResultCache(max_entries=2)
+    first, second, third = (cache.entry("O+", *NAIROBI, radius) for radius in (10, 20, 30))
+    for entry in (first, second):
+        cache.put(entry, [])
+    cache.get(first)
+    cache.put(third, [])
+    assert cache.get(second) is None and cache.get(first) is first
+    assert cache.evictions == 1
+    print("✅ Search cache eviction: PASSED")
+
+if __name__ == "__main__":
+    test_cache_hits_and_ranking()
+    test_precise_invalidation()
+    test_lru_eviction()
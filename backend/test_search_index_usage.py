@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Check that the SQL donor search is driven by the location indexes.
+
+Seeds a synthetic donor population inside a transaction, runs EXPLAIN on
+both search queries and rolls everything back afterwards. Depending on the
+statistics Postgres may combine idx_blood_latitude/idx_blood_longitude with
+idx_blood_search instead of using idx_blood_location; either way the bounding
+box must come from an index and public.blood must not be sequentially scanned.
+Runs against DATABASE_URL and is skipped if it is unset.
+"""
+
+import json
+import os
+
+from sqlalchemy import text
+
+from search_engines import HaversineSearchEngine
+
+SEED_DONORS = 20000
+
+LOCATION_INDEXES = ("idx_blood_location", "idx_blood_latitude", "idx_blood_longitude")
+
+# Donors spread over Kenya's bounding box
+SEED_QUERY = text("""
+    INSERT INTO public.blood (first_name, phone_number, blood_type, latitude, longitude, city)
+    SELECT
+        'Index Test',
+        '+25590' || lpad(g::text, 8, '0'),
+        (ARRAY['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-'])[1 + g % 8],
+        -4.7 + random() * 9.2,
+        33.9 + random() * 8.0,
+        'Index Test'
+    FROM generate_series(1, :count) AS g
+""")
+
+def explain(conn, query, params) -> str:
+    result = conn.execute(text("EXPLAIN (FORMAT JSON) " + query.text), params)
+    return json.dumps(result.scalar())
+
+def uses_location_index(plan: str) -> bool:
+    return '"Seq Scan"' not in plan and any(index in plan for index in LOCATION_INDEXES)
+
+def test_search_uses_location_index():
+    if not os.getenv("DATABASE_URL"):
+        print("⚠️  DATABASE_URL not set, skipping search query plan test")
+        return
+    print("🧪 Testing donor search query plans...")
+    from main import engine
+    print("-" * 50)
+
+    search_engine = HaversineSearchEngine()
+    params = search_engine.query_params(latitude=-1.286389, longitude=36.817223, radius_km=50)
+    params["limit"] = 10
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            conn.execute(SEED_QUERY, {"count": SEED_DONORS})
+            conn.execute(text("ANALYZE public.blood"))
+
+            any_plan = explain(conn, search_engine.any_query, params)
+            print(f"   ANY plan uses location index: {uses_location_index(any_plan)}")
+            assert uses_location_index(any_plan), any_plan
+
+            params["blood_type"] = "O+"
+            blood_type_plan = explain(conn, search_engine.blood_type_query, params)
+            print(f"   O+ plan uses location index: {uses_location_index(blood_type_plan)}")
+            assert uses_location_index(blood_type_plan), blood_type_plan
+        finally:
+            trans.rollback()
+
+    print("✅ Search queries use the location index")
+
+if __name__ == "__main__":
+    test_search_uses_location_index()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test the batched search log writer against a stand-in engine (no database
+needed).
+"""
+
+import asyncio
+
+from sqlalchemy.exc import DataError, OperationalError
+
+from search_log_writer import SearchLogWriter
+
+class FakeEngine:
+    """Records each INSERT's rows; a batch with a negative results_count fails like a bad row would,
+    and the first `outages` INSERTs fail like an unreachable database"""
+
+    def __init__(self, outages: int = 0):
+        self.batches = []
+        self.attempts = 0
+        self.outages = outages
+
+    def begin(self):
+        engine = self
+
+        class Connection:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def execute(self, statement, params):
+                engine.attempts += 1
+                if engine.attempts <= engine.outages:
+                    raise OperationalError("INSERT", {}, ConnectionRefusedError("connection refused"))
+                if any(count < 0 for count in params["results_counts"]):
+                    raise DataError("INSERT", {}, ValueError("value too long for type character varying(5)"))
+                engine.batches.append(list(zip(params["blood_types"], params["results_counts"])))
+
+        return Connection()
+
+def enqueue(writer, count, blood_type="O+", results_count=1):
+    for _ in range(count):
+        writer.enqueue(blood_type, -1.29, 36.82, 10, results_count, "10.0.0.1")
+
+def test_batching():
+    print("🧪 Testing search log batching...")
+
+    async def run():
+        engine = FakeEngine()
+        written = []
+        writer = SearchLogWriter(engine, batch_size=3, flush_interval=0.05, on_written=written.append)
+        writer.start()
+        enqueue(writer, 7)
+        await asyncio.sleep(0.2)
+        await writer.stop()
+        return engine, writer, written
+
+    engine, writer, written = asyncio.run(run())
+    # Full batches go out straight away, the remainder after the flush interval
+    assert [len(batch) for batch in engine.batches] == [3, 3, 1], engine.batches
+    assert written == [3, 3, 1] and writer.written == 7 and writer.batches == 3
+    print("✅ Search log batching: PASSED")
+
+def test_flush_on_stop():
+    print("🧪 Testing search log flush on stop...")
+
+    async def run():
+        engine = FakeEngine()
+        writer = SearchLogWriter(engine, batch_size=4, flush_interval=60)
+        writer.start()
+        enqueue(writer, 10)
+        # Let the worker take a partial batch off the queue, then stop before the interval passes
+        await asyncio.sleep(0.01)
+        await writer.stop()
+        return engine, writer
+
+    engine, writer = asyncio.run(run())
+    assert sum(len(batch) for batch in engine.batches) == 10, engine.batches
+    assert writer.written == 10 and writer.stats()["queued"] == 0
+    print("✅ Search log flush on stop: PASSED")
+
+def test_failures():
+    print("🧪 Testing search log failure handling...")
+
+    async def run():
+        engine = FakeEngine()
+        writer = SearchLogWriter(engine, max_queue_size=5, batch_size=5, flush_interval=60)
+        enqueue(writer, 2)
+        enqueue(writer, 1, results_count=-1)
+        enqueue(writer, 2)
+        # Over the queue size: dropped, not queued
+        assert not writer.enqueue("O+", 0, 0, 10, 1, None)
+        writer.start()
+        await asyncio.sleep(0.01)
+        await writer.stop()
+        return engine, writer
+
+    engine, writer = asyncio.run(run())
+    # The failed batch is retried row by row, so only the bad row is lost
+    assert writer.failed == 1 and writer.written == 4 and writer.dropped == 1, writer.stats()
+    assert [len(batch) for batch in engine.batches] == [1, 1, 1, 1]
+    print("✅ Search log failure handling: PASSED")
+
+def test_outage():
+    print("🧪 Testing search log writes during a database outage...")
+
+    async def write(outages):
+        engine = FakeEngine(outages=outages)
+        writer = SearchLogWriter(engine, batch_size=5, flush_interval=60, max_retries=2, retry_interval=0.001)
+        enqueue(writer, 5)
+        writer.start()
+        await asyncio.sleep(0.05)
+        await writer.stop()
+        return engine, writer
+
+    # A short outage: the whole batch is retried and written in one INSERT
+    engine, writer = asyncio.run(write(outages=2))
+    assert engine.attempts == 3 and writer.written == 5 and writer.failed == 0, writer.stats()
+    assert [len(batch) for batch in engine.batches] == [5]
+
+    # A long one: the batch is dropped after its retries, never tried row by row
+    engine, writer = asyncio.run(write(outages=100))
+    assert engine.attempts == 3 and writer.written == 0 and writer.failed == 5, (engine.attempts, writer.stats())
+    print("✅ Search log writes during a database outage: PASSED")
+
+def test_client_values_truncated():
+    print("🧪 Testing client-supplied search log values...")
+    writer = SearchLogWriter(FakeEngine())
+    writer.enqueue("O+" * 10, 0, 0, 10, 1, "1.2.3.4, " * 20)
+    row = writer.queue.get_nowait()
+    assert row[0] == "O+O+O" and len(row[5]) == 45
+    print("✅ Client-supplied search log values: PASSED")
+
+if __name__ == "__main__":
+    test_batching()
+    test_flush_on_stop()
+    test_failures()
+    test_outage()
+    test_client_values_truncated()
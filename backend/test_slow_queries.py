@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test slow query capture and phone number redaction. The engine capture test
+runs against DATABASE_URL (skipped if it is unset).
+"""
+
+import asyncio
+import os
+
+from queries import NamedQuery
+from slow_queries import REDACTED, SlowQueryLog, redact_params, redact_plan_line
+
+def test_redaction():
+    print("🧪 Testing phone number redaction...")
+    params = redact_params({
+        "phone_number": "+254712345678",
+        "search": "0712 345",
+        "search_pattern": "%0712%",
+        "first_name": "Wanjiku",
+        "donor_id": "12345678-1234-1234-1234-123456789012",
+        "blood_types": ["O+", "O-"],
+        "radius_km": 20,
+        "city": None
+    })
+    assert params["phone_number"] == params["search"] == params["search_pattern"] == REDACTED
+    assert params["first_name"] == "Wanjiku"
+    assert params["donor_id"] == "12345678-1234-1234-1234-123456789012"
+    assert params["blood_types"] == ["O+", "O-"] and params["radius_km"] == 20 and params["city"] is None
+
+    line = "Filter: ((phone_digits)::text ~~ '254712%'::text) AND (created_at > '2026-01-01 00:00:00+00'::timestamptz)"
+    assert redact_plan_line(line) == (
+        "Filter: ((phone_digits)::text ~~ '[redacted]'::text) AND (created_at > '2026-01-01 00:00:00+00'::timestamptz)"
+    )
+    print("✅ Phone number redaction: PASSED")
+
+def test_ring_buffer():
+    print("🧪 Testing slow query ring buffer...")
+    log = SlowQueryLog(threshold_ms=100, max_entries=3)
+    query = NamedQuery("get_donor", "SELECT * FROM public.blood WHERE id = CAST(:donor_id AS uuid)")
+    log.observe(query.name, query.text, {"donor_id": "x"}, 0.05)
+    assert log.captured == 0
+    for i in range(5):
+        log.observe(query.name, query.text, {"donor_id": str(i)}, 0.2 + i)
+    # Only the newest entries are kept, and nothing is explained without an engine
+    assert [entry["params"]["donor_id"] for entry in log.entries] == ["2", "3", "4"]
+    assert log.captured == 5 and all(entry["plan"] is None for entry in log.entries)
+    assert log.stats()["thresholdMs"] == 100
+    print("✅ Slow query ring buffer: PASSED")
+
+def test_engine_capture():
+    if not os.getenv("DATABASE_URL"):
+        print("⚠️  DATABASE_URL not set, skipping slow query engine capture test")
+        return
+    print("🧪 Testing slow query capture from engine events...")
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from database import DATABASE_URL, async_database_url
+    from queries import execute
+
+    # Engines of its own, so the capture does not stay attached to the app's
+    engine = create_engine(DATABASE_URL)
+    async_engine = create_async_engine(async_database_url(DATABASE_URL))
+    log = SlowQueryLog(threshold_ms=0, sample_rate=1, engine=async_engine)
+    log.attach(engine)
+    log.attach(async_engine.sync_engine)
+    named = NamedQuery("slow_query_capture_test", "SELECT pg_sleep(0.01), CAST(:phone AS text)")
+
+    async def run():
+        async with async_engine.connect() as conn:
+            # A plain text() statement that never goes through queries.execute()
+            await conn.execute(text("SELECT pg_sleep(0.01), CAST(:phone_number AS text)"), {"phone_number": "+254712345678"})
+            await execute(conn, named, {"phone": "0712345678"})
+        await log._explaining
+        await async_engine.dispose()
+
+    asyncio.run(run())
+    with engine.connect() as conn:
+        conn.execute(text("SELECT count(*) FROM public.blood"))
+    engine.dispose()
+
+    names = [entry["query"] for entry in log.entries]
+    assert names[0] == "sql: SELECT pg_sleep(0.01), CAST(:phone_number AS text)", names
+    assert names[1] == "slow_query_capture_test" and names[2].startswith("sql: SELECT count(*)"), names
+    assert log.entries[0]["params"] == {"phone_number": REDACTED}
+    # Named and counted once each; the log's own EXPLAIN and SET LOCAL are not captured
+    assert len(names) == log.captured == 3 and not any("EXPLAIN" in name or "SET LOCAL" in name for name in names)
+    assert log.explained == 1 and log.entries[0]["analyzed"] and log.entries[0]["plan"]
+    print("✅ Slow query capture from engine events: PASSED")
+
+if __name__ == "__main__":
+    test_redaction()
+    test_ring_buffer()
+    test_engine_capture()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test the in-memory donor spatial index against brute-force distances (no
+database needed).
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from geo import bounding_box, covering_cells, haversine_km
+from spatial_index import DonorSpatialIndex
+
+def brute_force(donors, latitude, longitude, radius_km, limit):
+    distances = sorted(
+        (haversine_km(latitude, longitude, donor_lat, donor_lon), donor_id)
+        for donor_id, (donor_lat, donor_lon) in donors.items()
+    )
+    return [donor_id for distance, donor_id in distances if distance <= radius_km][:limit]
+
+def test_nearest_ordering():
+    print("🧪 Testing nearest-k ordering...")
+    rng = random.Random(7)
+    index = DonorSpatialIndex(cell_degrees=0.1)
+    donors = {}
+    for i in range(2000):
+        donors[str(i)] = (-1.3 + rng.uniform(-0.5, 0.5), 36.8 + rng.uniform(-0.5, 0.5))
+        index.upsert(str(i), "O+", *donors[str(i)])
+
+    for radius_km, limit in ((1, 5), (10, 20), (50, 100), (500, 3000)):
+        matches = index.nearest("O+", -1.3, 36.8, radius_km, limit)
+        distances = [distance for _, distance in matches]
+        assert distances == sorted(distances) and all(distance <= radius_km for distance in distances)
+        assert [donor_id for donor_id, _ in matches] == brute_force(donors, -1.3, 36.8, radius_km, limit)
+    assert index.nearest("A-", -1.3, 36.8, 50, 10) == []
+    print("✅ Nearest-k ordering: PASSED")
+
+def test_cell_and_antimeridian_edges():
+    print("🧪 Testing cell and antimeridian edges...")
+    index = DonorSpatialIndex(cell_degrees=0.1)
+    # Just across a cell boundary from the search point, and on either side of the antimeridian
+    index.upsert("next_cell", "O+", 0.1000001, 36.8)
+    index.upsert("east", "O+", -16.5, 179.98)
+    index.upsert("west", "O+", -16.5, -179.98)
+    index.upsert("far_west", "O+", -16.5, -179.5)
+
+    assert [donor_id for donor_id, _ in index.nearest("O+", 0.0999999, 36.8, 1, 10)] == ["next_cell"]
+    # 0.04 degrees of longitude is about 4.3 km at this latitude
+    assert sorted(donor_id for donor_id, _ in index.nearest("O+", -16.5, 179.99, 10, 10)) == ["east", "west"]
+    assert sorted(donor_id for donor_id, _ in index.nearest("O+", -16.5, -179.99, 10, 10)) == ["east", "west"]
+    assert [donor_id for donor_id, _ in index.nearest("O+", -16.5, 180.0, 60, 10)] in (
+        ["east", "west", "far_west"], ["west", "east", "far_west"]
+    )
+    print("✅ Cell and antimeridian edges: PASSED")
+
+def test_bounding_box_wraps():
+    print("🧪 Testing bounding boxes across the antimeridian...")
+    # Fiji: the box continues past 180 on the western side
+    min_lat, max_lat, lon_ranges = bounding_box(-16.5, 179.9, 50)
+    assert min_lat < -16.5 < max_lat
+    assert len(lon_ranges) == 2 and lon_ranges[0][1] == 180.0 and lon_ranges[1][0] == -180.0
+    assert all(-180 <= lo <= hi <= 180 for lo, hi in lon_ranges)
+    # The mirror image from the western side
+    _, _, west_ranges = bounding_box(-16.5, -179.9, 50)
+    mirrored = sorted((-hi, -lo) for lo, hi in lon_ranges)
+    assert all(abs(a - b) < 1e-9 for pair in zip(sorted(west_ranges), mirrored) for a, b in zip(*pair))
+    # Away from it there is one range, and around a pole every longitude
+    assert len(bounding_box(-1.3, 36.8, 50)[2]) == 1
+    assert bounding_box(89.9, 0, 50)[2] == [(-180.0, 180.0)]
+
+    cells = covering_cells(-16.5, 179.9, 50, 0.5)
+    assert (-33, 359) in cells and (-33, -360) in cells
+    print("✅ Bounding boxes across the antimeridian: PASSED")
+
+def test_maintenance():
+    print("🧪 Testing index maintenance...")
+    now = datetime(2026, 5, 1, 12, 0)
+    index = DonorSpatialIndex(cell_degrees=0.1)
+    index.load([
+        ("a", "O+", -1.3, 36.8, True, now),
+        ("b", "O+", -1.31, 36.8, True, now - timedelta(minutes=5)),
+        ("c", "A-", -1.3, 36.81, False, now),
+    ])
+    assert index.ready and len(index) == 2 and index.watermark == now
+
+    # A donor who becomes unavailable leaves the index, and a move changes their cell
+    index.apply([
+        ("a", "O+", -1.3, 36.8, False, now + timedelta(minutes=1)),
+        ("b", "B+", -4.05, 39.66, True, now + timedelta(minutes=2)),
+    ])
+    assert len(index) == 1 and index.watermark == now + timedelta(minutes=2)
+    assert index.nearest("O+", -1.3, 36.8, 10, 10) == []
+    assert [donor_id for donor_id, _ in index.nearest("B+", -4.05, 39.66, 1, 10)] == ["b"]
+
+    # load() replaces everything, including the watermark
+    index.load([("d", "O+", 0.5, 35.0, True, now - timedelta(days=1))])
+    assert len(index) == 1 and index.watermark == now - timedelta(days=1)
+    assert index.nearest("B+", -4.05, 39.66, 1, 10) == []
+    assert [donor_id for donor_id, _ in index.nearest(None, 0.5, 35.0, 1, 10)] == ["d"]
+    print("✅ Index maintenance: PASSED")
+
+if __name__ == "__main__":
+    test_nearest_ordering()
+    test_cell_and_antimeridian_edges()
+    test_bounding_box_wraps()
+    test_maintenance()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Test that WebSocket broadcasts return immediately and that slow subscribers
+only hold up themselves. Uses fake sockets, so no server is needed.
+"""
+
+import asyncio
+import time
+
+from broadcast import ConnectionManager
+
+class FakeWebSocket:
+    def __init__(self, send_delay: float = 0):
+        self.send_delay = send_delay
+        self.received = []
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        await asyncio.sleep(self.send_delay)
+        self.received.append(message)
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.closed = True
+
+async def fan_out(subscribers: int) -> float:
+    manager = ConnectionManager()
+    for _ in range(subscribers):
+        websocket = FakeWebSocket(send_delay=0.01)
+        await manager.connect(websocket)
+
+    start = time.perf_counter()
+    queued = manager.broadcast_to_all('{"type": "new_donor"}')
+    elapsed = time.perf_counter() - start
+    assert queued == subscribers, queued
+
+    # Sends run in parallel: 10,000 sequential 10 ms sends would take 100 seconds
+    deadline = time.perf_counter() + 10
+    while manager.sent < subscribers and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    assert manager.sent == subscribers, manager.sent
+    await manager.close_all()
+    return elapsed
+
+def test_broadcast_returns_immediately():
+    print("🧪 Testing broadcast fan-out latency...")
+    small = asyncio.run(fan_out(10))
+    large = asyncio.run(fan_out(10000))
+    print(f"   10 subscribers: {small * 1000:.2f} ms, 10000 subscribers: {large * 1000:.2f} ms")
+    # Queuing 10,000 messages must not wait on any of the 10 ms sends
+    assert large < 0.5, large
+    print("✅ Broadcast fan-out: PASSED")
+
+async def slow_consumer(policy: str):
+    manager = ConnectionManager(queue_size=3, slow_consumer_policy=policy)
+    fast, slow = FakeWebSocket(), FakeWebSocket(send_delay=10)
+    for websocket in (fast, slow):
+        await manager.connect(websocket)
+    await asyncio.sleep(0)
+
+    for i in range(10):
+        manager.broadcast_to_all(str(i))
+        # Let the fast socket's writer keep up
+        await asyncio.sleep(0.001)
+
+    assert fast.received == [str(i) for i in range(10)], fast.received
+    result = (manager, slow, list(manager.subscribers.get(slow).queue._queue) if slow in manager.subscribers else None)
+    await manager.close_all()
+    return result
+
+def test_slow_consumer_policies():
+    print("🧪 Testing slow consumer policies...")
+    manager, slow, queued = asyncio.run(slow_consumer("drop_oldest"))
+    # The slow socket is stuck sending "0"; only the newest three wait behind it
+    assert queued == ["7", "8", "9"], queued
+    assert manager.dropped == 6, manager.dropped
+
+    manager, slow, queued = asyncio.run(slow_consumer("drop_new"))
+    assert queued == ["1", "2", "3"], queued
+
+    manager, slow, queued = asyncio.run(slow_consumer("disconnect"))
+    assert queued is None and slow.closed
+    assert manager.slow_disconnects == 1
+    print("✅ Slow consumer policies: PASSED")
+
+async def reconnect_storm(connections: int):
+    manager = ConnectionManager()
+    topics = ["O+", "O-", "A+"]
+    websockets = [FakeWebSocket() for _ in range(connections)]
+    for count, websocket in enumerate(websockets, 1):
+        await manager.connect(websocket)
+        manager.subscribe(websocket, topics)
+        # Each subscription lands in exactly its topics' sets, nowhere else
+        assert set(manager.blood_type_subscriptions) == set(topics)
+        assert all(len(manager.blood_type_subscriptions[topic]) == count for topic in topics)
+    for remaining, websocket in reversed(list(enumerate(websockets))):
+        subscriber = manager.subscribers[websocket]
+        manager.disconnect(websocket)
+        # Disconnecting removes that one subscriber from its topics and leaves the rest
+        assert websocket not in manager.subscribers and len(manager.subscribers) == remaining
+        assert all(subscriber not in manager.blood_type_subscriptions.get(topic, ()) for topic in topics)
+        assert all(len(manager.blood_type_subscriptions.get(topic, ())) == remaining for topic in topics)
+    assert not manager.subscribers and not manager.blood_type_subscriptions
+    await asyncio.sleep(0)
+
+def test_subscription_registry():
+    print("🧪 Testing subscription registry...")
+
+    async def run():
+        manager = ConnectionManager()
+        first, second = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(first)
+        await manager.connect(second)
+        assert manager.subscribe(first, ["O+", "A-"]) == {"O+", "A-"}
+        manager.subscribe(second, ["O+"])
+        assert manager.unsubscribe(first, ["A-", "B+"]) == {"O+"}
+        assert "A-" not in manager.blood_type_subscriptions
+        assert manager.broadcast_to_blood_type("O+", "x") == 2
+
+        manager.disconnect(first)
+        assert manager.broadcast_to_blood_type("O+", "y") == 1
+        await manager.close_all()
+
+    asyncio.run(run())
+
+    # Registry entries track every connect/subscribe/disconnect and empty out afterwards
+    asyncio.run(reconnect_storm(1000))
+    print("✅ Subscription registry: PASSED")
+
+NAIROBI = (-1.2921, 36.8219)
+MOMBASA = (-4.0435, 39.6682)
+KISUMU = (-0.0917, 34.7680)
+
+def test_geofenced_subscriptions():
+    print("🧪 Testing geofenced subscriptions...")
+
+    async def run():
+        manager = ConnectionManager()
+        nairobi, mombasa, everywhere = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        for websocket in (nairobi, mombasa, everywhere):
+            await manager.connect(websocket)
+        manager.subscribe(nairobi, ["O+"], (*NAIROBI, 10))
+        manager.subscribe(mombasa, ["O+"], (*MOMBASA, 50))
+        manager.subscribe(everywhere, ["O+"])
+
+        assert manager.broadcast_to_blood_type("O+", "nairobi", location=(-1.30, 36.80)) == 2
+        assert manager.broadcast_to_blood_type("O+", "kisumu", location=KISUMU) == 1
+        # Events without a location still reach everyone
+        assert manager.broadcast_to_blood_type("O+", "unknown") == 3
+        await asyncio.sleep(0.01)
+        assert nairobi.received == ["nairobi", "unknown"], nairobi.received
+        assert mombasa.received == ["unknown"], mombasa.received
+        assert everywhere.received == ["nairobi", "kisumu", "unknown"], everywhere.received
+
+        # Re-subscribing moves the geofence; unsubscribing clears the index
+        manager.subscribe(nairobi, ["O+"], (*KISUMU, 10))
+        assert manager.broadcast_to_blood_type("O+", "nairobi again", location=NAIROBI) == 1
+        manager.unsubscribe(nairobi, ["O+"])
+        manager.disconnect(mombasa)
+        assert all(not cell for grid in manager.geofence_index.values() for cell in grid.values())
+
+        # A geofence on one side of the antimeridian covers donors just across it
+        manager.subscribe(everywhere, ["O+"], (-16.5, 179.95, 20))
+        assert manager.broadcast_to_blood_type("O+", "fiji", location=(-16.5, -179.95)) == 1
+        await manager.close_all()
+
+        # 10,000 subscribers spread over Kenya: an event only reaches the nearby ones
+        manager = ConnectionManager()
+        for i in range(10000):
+            websocket = FakeWebSocket()
+            await manager.connect(websocket)
+            manager.subscribe(websocket, ["A+"], (-4.5 + (i % 100) * 0.09, 34.0 + (i // 100) * 0.07, 5))
+        start = time.perf_counter()
+        queued = manager.broadcast_to_blood_type("A+", "donor", location=NAIROBI)
+        elapsed = time.perf_counter() - start
+        await manager.close_all()
+        return queued, elapsed
+
+    queued, elapsed = asyncio.run(run())
+    print(f"   10000 geofenced subscribers: {queued} matched in {elapsed * 1000:.2f} ms")
+    assert 0 < queued < 50, queued
+    print("✅ Geofenced subscriptions: PASSED")
+
+if __name__ == "__main__":
+    test_broadcast_returns_immediately()
+    test_slow_consumer_policies()
+    test_subscription_registry()
+    test_geofenced_subscriptions()
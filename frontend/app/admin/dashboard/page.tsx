@@ -3,8 +3,8 @@ import { cookies } from "next/headers"
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card"
 import { Button } from "@/components/ui/button"
 import Link from "next/link"
-import { Users, Search, Activity, Droplet } from "lucide-react"
-import { getDonorStats } from "@/lib/db"
+import { Users, Search, Activity, Droplet, MapPin } from "lucide-react"
+import { getDonorStats, getSupplyDemand } from "@/lib/db"
 
 async function logout() {
   "use server"
@@ -21,7 +21,9 @@ export default async function AdminDashboard() {
     redirect("/admin")
   }
 
-  const stats = await getDonorStats()
+  const [stats, supplyDemand] = await Promise.all([getDonorStats(), getSupplyDemand({ days: 7 })])
+  // Busiest areas first
+  const demandCells = supplyDemand.cells.slice(0, 8)
 
   // Transform blood type data for display
   const bloodTypeMap: Record<string, number> = {}
@@ -122,6 +124,49 @@ export default async function AdminDashboard() {
           </CardContent>
         </Card>
 
+        {/* Supply vs Demand */}
+        <Card className="mb-8">
+          <CardHeader>
+            <CardTitle>Supply vs Demand</CardTitle>
+            <CardDescription>Available donors against searches in the last 7 days, busiest areas first</CardDescription>
+          </CardHeader>
+          <CardContent>
+            {demandCells.length === 0 ? (
+              <p className="text-sm text-muted-foreground">No search activity yet</p>
+            ) : (
+              <div className="space-y-3">
+                {demandCells.map((cell: any) => (
+                  <div
+                    key={`${cell.cellLat},${cell.cellLon}`}
+                    className="flex items-center justify-between p-3 border rounded-lg"
+                  >
+                    <div className="flex items-center gap-3">
+                      <MapPin className="h-5 w-5 text-primary" />
+                      <div className="text-sm">
+                        {cell.latitude.toFixed(2)}, {cell.longitude.toFixed(2)}
+                      </div>
+                    </div>
+                    <div className="flex gap-6 text-right text-sm">
+                      <div>
+                        <div className="font-medium">{cell.availableDonors}</div>
+                        <div className="text-muted-foreground">available</div>
+                      </div>
+                      <div>
+                        <div className="font-medium">{cell.searches}</div>
+                        <div className="text-muted-foreground">searches</div>
+                      </div>
+                      <div>
+                        <div className="font-medium">{Math.round(cell.missRate * 100)}%</div>
+                        <div className="text-muted-foreground">no results</div>
+                      </div>
+                    </div>
+                  </div>
+                ))}
+              </div>
+            )}
+          </CardContent>
+        </Card>
+
         {/* Recent Registrations */}
         <Card>
           <CardHeader>
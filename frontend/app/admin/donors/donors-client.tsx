@@ -1,10 +1,11 @@
 "use client"
 
 import { useState } from "react"
+import { useRouter } from "next/navigation"
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card"
 import { Button } from "@/components/ui/button"
 import { Input } from "@/components/ui/input"
-import { Search, Download } from "lucide-react"
+import { Search, Download, ChevronRight } from "lucide-react"
 
 interface Donor {
   id: number
@@ -16,9 +17,21 @@ interface Donor {
   created_at: string
 }
 
-export default function DonorsClient({ donors }: { donors: Donor[] }) {
-  const [searchTerm, setSearchTerm] = useState("")
-  const [bloodTypeFilter, setBloodTypeFilter] = useState("all")
+export default function DonorsClient({
+  donors,
+  search,
+  bloodType,
+  isFirstPage,
+  nextCursor,
+}: {
+  donors: Donor[]
+  search: string
+  bloodType: string
+  isFirstPage: boolean
+  nextCursor: string | null
+}) {
+  const router = useRouter()
+  const [searchTerm, setSearchTerm] = useState(search)
 
   const handleExport = async () => {
     const response = await fetch("/api/admin/export-donors")
@@ -30,14 +43,15 @@ export default function DonorsClient({ donors }: { donors: Donor[] }) {
     a.click()
   }
 
-  const filteredDonors = donors.filter((donor) => {
-    const matchesSearch =
-      donor.first_name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      donor.phone.includes(searchTerm) ||
-      donor.location.toLowerCase().includes(searchTerm.toLowerCase())
-    const matchesBloodType = bloodTypeFilter === "all" || donor.blood_type === bloodTypeFilter
-    return matchesSearch && matchesBloodType
-  })
+  // Filtering and paging happen on the server; changing a filter starts again from the first page
+  const showPage = (filters: { search: string; bloodType: string; cursor?: string | null }) => {
+    const params = new URLSearchParams()
+    if (filters.search.trim()) params.set("search", filters.search.trim())
+    if (filters.bloodType !== "all") params.set("blood_type", filters.bloodType)
+    if (filters.cursor) params.set("cursor", filters.cursor)
+    const query = params.toString()
+    router.push(query ? `/admin/donors?${query}` : "/admin/donors")
+  }
 
   return (
     <Card>
@@ -56,7 +70,13 @@ export default function DonorsClient({ donors }: { donors: Donor[] }) {
       <CardContent>
         {/* Filters */}
         <div className="flex flex-col md:flex-row gap-4 mb-6">
-          <div className="flex-1 relative">
+          <form
+            className="flex-1 relative"
+            onSubmit={(e) => {
+              e.preventDefault()
+              showPage({ search: searchTerm, bloodType })
+            }}
+          >
             <Search className="absolute left-3 top-1/2 transform -translate-y-1/2 h-4 w-4 text-muted-foreground" />
             <Input
               placeholder="Search by name, phone, or location..."
@@ -64,10 +84,10 @@ export default function DonorsClient({ donors }: { donors: Donor[] }) {
               onChange={(e) => setSearchTerm(e.target.value)}
               className="pl-10"
             />
-          </div>
+          </form>
           <select
-            value={bloodTypeFilter}
-            onChange={(e) => setBloodTypeFilter(e.target.value)}
+            value={bloodType}
+            onChange={(e) => showPage({ search: searchTerm, bloodType: e.target.value })}
             className="px-3 py-2 border rounded-md bg-background"
           >
             <option value="all">All Blood Types</option>
@@ -84,7 +104,7 @@ export default function DonorsClient({ donors }: { donors: Donor[] }) {
 
         {/* Results count */}
         <p className="text-sm text-muted-foreground mb-4">
-          Showing {filteredDonors.length} of {donors.length} donors
+          {search ? `Showing the ${donors.length} best matches` : `Showing ${donors.length} donors`}
         </p>
 
         {/* Table */}
@@ -101,7 +121,7 @@ export default function DonorsClient({ donors }: { donors: Donor[] }) {
                 </tr>
               </thead>
               <tbody>
-                {filteredDonors.map((donor) => (
+                {donors.map((donor) => (
                   <tr key={donor.id} className="border-t hover:bg-muted/50">
                     <td className="p-3">{donor.first_name}</td>
                     <td className="p-3">{donor.phone}</td>
@@ -118,6 +138,23 @@ export default function DonorsClient({ donors }: { donors: Donor[] }) {
             </table>
           </div>
         </div>
+
+        {/* Pagination */}
+        {(!isFirstPage || nextCursor) && (
+          <div className="flex justify-end gap-2 mt-4">
+            {!isFirstPage && (
+              <Button variant="outline" size="sm" onClick={() => showPage({ search, bloodType })}>
+                First page
+              </Button>
+            )}
+            {nextCursor && (
+              <Button variant="outline" size="sm" onClick={() => showPage({ search, bloodType, cursor: nextCursor })}>
+                Next page
+                <ChevronRight className="h-4 w-4 ml-2" />
+              </Button>
+            )}
+          </div>
+        )}
       </CardContent>
     </Card>
   )
@@ -12,7 +12,11 @@ async function logout() {
   redirect("/admin")
 }
 
-export default async function DonorsPage() {
+export default async function DonorsPage({
+  searchParams,
+}: {
+  searchParams: { search?: string; blood_type?: string; cursor?: string }
+}) {
   const cookieStore = await cookies()
   const session = cookieStore.get("admin_session")
 
@@ -20,7 +24,14 @@ export default async function DonorsPage() {
     redirect("/admin")
   }
 
-  const donors = await getDonors()
+  // One page at a time; the filters and cursor live in the URL
+  const search = searchParams.search || ""
+  const bloodType = searchParams.blood_type || "all"
+  const { donors, nextCursor } = await getDonors({
+    search: search || undefined,
+    bloodType: bloodType === "all" ? undefined : bloodType,
+    cursor: searchParams.cursor,
+  })
 
   return (
     <div className="min-h-screen bg-background">
@@ -58,7 +69,13 @@ export default async function DonorsPage() {
 
       {/* Main Content */}
       <main className="container mx-auto px-4 py-8">
-        <DonorsClient donors={donors} />
+        <DonorsClient
+          donors={donors}
+          search={search}
+          bloodType={bloodType}
+          isFirstPage={!searchParams.cursor}
+          nextCursor={nextCursor}
+        />
       </main>
     </div>
   )
@@ -1,6 +1,6 @@
 import { NextResponse } from "next/server"
 import { cookies } from "next/headers"
-import { getDonors } from "@/lib/db"
+import { streamDonors } from "@/lib/db"
 
 export async function GET() {
   const cookieStore = await cookies()
@@ -10,22 +10,49 @@ export async function GET() {
     return NextResponse.json({ error: "Unauthorized" }, { status: 401 })
   }
 
-  const donors = await getDonors()
+  let lines: ReadableStream<string>
+  try {
+    lines = await streamDonors()
+  } catch (error) {
+    console.error("Error exporting donors:", error)
+    return NextResponse.json({ error: "Could not export donors" }, { status: 502 })
+  }
 
-  // Generate CSV
+  // Generate CSV, one row per NDJSON line, without holding every donor in memory
   const headers = ["Name", "Phone", "Blood Type", "Location", "City", "Registered"]
-  const rows = donors.map((donor: any) => [
-    donor.first_name,
-    donor.phone,
-    donor.blood_type,
-    donor.location,
-    donor.city || "",
-    new Date(donor.created_at).toLocaleDateString(),
-  ])
+  const toRow = (donor: any) =>
+    [
+      donor.first_name,
+      donor.phone,
+      donor.blood_type,
+      donor.location,
+      donor.city || "",
+      new Date(donor.created_at).toLocaleDateString(),
+    ]
+      .map((cell) => `"${cell}"`)
+      .join(",")
 
-  const csv = [headers.join(","), ...rows.map((row) => row.map((cell) => `"${cell}"`).join(","))].join("\n")
+  let buffered = ""
+  const csv = lines.pipeThrough(
+    new TransformStream<string, string>({
+      start(controller) {
+        controller.enqueue(headers.join(","))
+      },
+      transform(chunk, controller) {
+        buffered += chunk
+        const complete = buffered.split("\n")
+        buffered = complete.pop() ?? ""
+        for (const line of complete) {
+          if (line.trim()) controller.enqueue("\n" + toRow(JSON.parse(line)))
+        }
+      },
+      flush(controller) {
+        if (buffered.trim()) controller.enqueue("\n" + toRow(JSON.parse(buffered)))
+      },
+    }),
+  )
 
-  return new NextResponse(csv, {
+  return new NextResponse(csv.pipeThrough(new TextEncoderStream()), {
     headers: {
       "Content-Type": "text/csv",
       "Content-Disposition": 'attachment; filename="donors.csv"',
@@ -60,16 +60,20 @@ export async function getDonorStats() {
   }
 }
 
-// Helper function to get all donors with optional filters
+// One page of donors with optional filters. nextCursor (the X-Next-Cursor
+// header) fetches the page after it and is null on the last page; searches
+// return their best matches as a single page.
 export async function getDonors(filters?: {
   search?: string
   bloodType?: string
-}) {
+  cursor?: string
+}): Promise<{ donors: any[]; nextCursor: string | null }> {
   const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'https://blood-donor-app-production-aa1d.up.railway.app'
   
   const params = new URLSearchParams()
   if (filters?.search) params.append('search', filters.search)
   if (filters?.bloodType) params.append('blood_type', filters.bloodType)
+  if (filters?.cursor) params.append('cursor', filters.cursor)
   
   try {
     const response = await fetch(`${apiUrl}/api/v1/admin/donors?${params.toString()}`, {
@@ -80,13 +84,36 @@ export async function getDonors(filters?: {
       throw new Error(`API returned ${response.status}`)
     }
     
-    return await response.json()
+    return {
+      donors: await response.json(),
+      nextCursor: response.headers.get('X-Next-Cursor')
+    }
   } catch (error) {
     console.error('Error fetching donors from API:', error)
     throw error
   }
 }
 
+// Every donor as a stream of NDJSON lines, for exports too large to page through
+export async function streamDonors(filters?: {
+  bloodType?: string
+}) {
+  const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'https://blood-donor-app-production-aa1d.up.railway.app'
+  
+  const params = new URLSearchParams({ stream: 'true' })
+  if (filters?.bloodType) params.append('blood_type', filters.bloodType)
+  
+  const response = await fetch(`${apiUrl}/api/v1/admin/donors?${params.toString()}`, {
+    cache: 'no-store'
+  })
+  
+  if (!response.ok || !response.body) {
+    throw new Error(`API returned ${response.status}`)
+  }
+  
+  return response.body.pipeThrough(new TextDecoderStream())
+}
+
 // Helper function to get search activity
 export async function getSearchActivity(filters?: {
   bloodType?: string
@@ -115,3 +142,29 @@ export async function getSearchActivity(filters?: {
     return []
   }
 }
+
+export async function getSupplyDemand(filters?: {
+  bloodType?: string
+  days?: number
+}) {
+  const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'https://blood-donor-app-production-aa1d.up.railway.app'
+  
+  const params = new URLSearchParams()
+  if (filters?.bloodType) params.append('blood_type', filters.bloodType)
+  if (filters?.days) params.append('days', String(filters.days))
+  
+  try {
+    const response = await fetch(`${apiUrl}/api/v1/admin/supply-demand?${params.toString()}`, {
+      cache: 'no-store'
+    })
+    
+    if (!response.ok) {
+      throw new Error(`API returned ${response.status}`)
+    }
+    
+    return await response.json()
+  } catch (error) {
+    console.error('Error fetching supply and demand from API:', error)
+    return { cells: [] }
+  }
+}